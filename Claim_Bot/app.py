@@ -1,24 +1,17 @@
-import os
+import hashlib
 import streamlit as st
-import pandas as pd
-import pdfplumber
-from dotenv import load_dotenv
-from openai import AzureOpenAI
-from datetime import datetime
-from pandas.errors import EmptyDataError
-
-# =========================================================
-# ENVIRONMENT
-# =========================================================
-load_dotenv()
-
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION")
+from openai import APITimeoutError
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from claims_core import (
+    CLAIM_TYPES, LANGUAGES, DECISIONS,
+    extract_pdf, detect_claim_decision, domain_bot_prompt, stream_llm,
+    run_claim_pipeline, log_event, set_review, get_audit_store,
+    migrate_legacy_audit_log, stage_timings
 )
-
-MODEL = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+from common import tracing
+from report_index import ReportIndex, format_passages
+from api import client as api
 
 # =========================================================
 # CONFIGURATION
@@ -28,152 +21,54 @@ st.set_page_config(
     layout="wide"
 )
 
-LOG_DIR = "logs"
-LOG_FILE = os.path.join(LOG_DIR, "audit_logs.csv")
-os.makedirs(LOG_DIR, exist_ok=True)
-
-REQUIRED_COLUMNS = {
-    "timestamp", "claim_type", "decision",
-    "appeal_score", "human_review"
-}
+AUDIT_PAGE_SIZE = 50
+# Claim explanations kept per session for redisplay on rerun
+RESULT_HISTORY = 8
 
-CLAIM_TYPES = [
-    "Health", "Motor", "Life", "Travel",
-    "Home / Property", "Commercial",
-    "Personal Accident"
-]
 
-LANGUAGES = ["English", "Hindi", "Marathi"]
-
-# =========================================================
-# DOCUMENT EXTRACTION
-# =========================================================
-def extract_text_from_pdf(file):
-    text = ""
-    with pdfplumber.open(file) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-    return text.strip()
-
-# =========================================================
-# CLAIM DECISION DETECTION
-# =========================================================
-def detect_claim_decision(report):
-    r = report.lower()
-    if "rejected" in r or "not payable" in r:
-        return "Denied"
-    if "partially approved" in r or "partial approval" in r:
-        return "Partially Approved"
-    if "approved" in r:
-        return "Approved"
-    return "Unclear"
-
-# =========================================================
-# PROMPTS
-# =========================================================
-def explanation_prompt(claim_type, decision, report, language):
-    return f"""
-You are an insurance claims explanation assistant.
+def input_key(*parts):
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
 
-Claim Type: {claim_type}
-Decision (as stated in document): {decision}
-Language: {language}
 
-RULES:
-- Use ONLY information present in the claim report.
-- Do NOT invent policy rules.
-- Do NOT promise outcomes or approvals.
-- If information is missing, say so clearly.
+@st.cache_resource(max_entries=32)
+def report_index(report_key, _report):
+    """
+    One index per report, shared by every session and question.
+    """
+    return ReportIndex(_report)
 
-FORMAT:
 
-1. Claim Decision
-2. Why This Decision Was Made
-3. What This Means for You
-4. What You Can Do Next
+def keep_result(results, key, result):
+    results[key] = result
+    while len(results) > RESULT_HISTORY:
+        results.pop(next(iter(results)))
 
-Claim Report:
-\"\"\"{report}\"\"\"
-"""
-
-def domain_bot_prompt(report, question):
-    return f"""
-You are an insurance domain assistant.
-
-PRIORITY RULES:
-1. First use the uploaded claim report.
-2. If the answer is not in the report, you MAY use general insurance knowledge.
-3. Clearly say when general knowledge is used.
-4. Do NOT provide legal or financial advice.
-
-Claim Report:
-\"\"\"{report}\"\"\"
-
-User Question:
-{question}
-"""
-
-def hallucination_guard(report, explanation):
-    return f"""
-Check whether the explanation is fully supported by the claim report.
-Reply strictly YES or NO.
-
-Report:
-{report}
-
-Explanation:
-{explanation}
-"""
-
-def appeal_score_prompt(report):
-    return f"""
-Based ONLY on the claim report,
-estimate appeal success likelihood between 0 and 1.
-Return only a numeric value.
-
-{report}
-"""
-
-# =========================================================
-# LLM CALL
-# =========================================================
-def call_llm(prompt):
-    response = client.chat.completions.create(
-        model=MODEL,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
-
-# =========================================================
-# GOVERNANCE FUNCTIONS
-# =========================================================
-def hallucination_check(report, explanation):
-    result = call_llm(hallucination_guard(report, explanation))
-    return "YES" in result.upper()
 
-def appeal_score(report):
+def record_review(result, key):
+    """
+    Checkbox callback: stores the review flag on the result's audit row.
+    """
+    event_id = result.get("event_id")
+    if event_id is None:
+        return
+    reviewed = st.session_state[key]
+    if not api.API_URL:
+        set_review(event_id, reviewed)
+        return
     try:
-        return float(call_llm(appeal_score_prompt(report)))
-    except:
-        return 0.0
-
-def log_event(claim_type, decision, score, reviewed):
-    row = {
-        "timestamp": datetime.now(),
-        "claim_type": claim_type,
-        "decision": decision,
-        "appeal_score": score,
-        "human_review": reviewed
-    }
-    df = pd.DataFrame([row])
+        api.set_review(event_id, reviewed)
+    except api.ApiError as e:
+        st.error(e.describe("Saving the review flag"))
 
-    if not os.path.exists(LOG_FILE) or os.stat(LOG_FILE).st_size == 0:
-        df.to_csv(LOG_FILE, index=False)
-    else:
-        df.to_csv(LOG_FILE, mode="a", header=False, index=False)
+
+def show_decision(decision):
+    """
+    Renders the detected decision; returns the slot for the explanation.
+    """
+    st.subheader("Detected Claim Decision")
+    st.write(decision)
+    st.subheader("Explanation")
+    return st.empty()
 
 # =========================================================
 # UI
@@ -196,41 +91,112 @@ with tab1:
     report = st.text_area("Paste Claim Report", height=220)
     pdf = st.file_uploader("Upload Claim PDF", type=["pdf"])
 
+    extraction = None
     if pdf:
-        report = extract_text_from_pdf(pdf)
-        st.info("Claim report extracted successfully.")
-
-    if st.button("Generate Claim Explanation"):
-        if not report.strip():
-            st.warning("Claim report is required.")
+        first_pages = st.number_input(
+            "Pages to extract (0 = all)", min_value=0, value=0, step=1,
+            help="Only read the first pages of a long report"
+        ) or None
+        # Upload ids are stable across reruns, so each file is extracted once
+        extraction_id = (pdf.file_id, first_pages)
+        if st.session_state.get("extraction_id") != extraction_id:
+            if api.API_URL:
+                try:
+                    st.session_state.extraction = api.extract_pdf(pdf.getvalue(), first_pages)
+                except api.ApiError as e:
+                    st.error(e.describe("PDF extraction"))
+                    st.stop()
+            else:
+                st.session_state.extraction = extract_pdf(pdf, first_pages)
+            st.session_state.extraction_id = extraction_id
+        extraction = st.session_state.extraction
+        report = extraction["text"]
+        if extraction["truncated"]:
+            st.warning(
+                f"Large document: extracted the first {extraction['pages']} "
+                f"of {extraction['total_pages']} pages."
+            )
         else:
+            st.info("Claim report extracted successfully.")
+
+    # Finished results survive reruns; the same inputs are never re-sent to the model
+    results = st.session_state.setdefault("claim_results", {})
+    claim_key = input_key(claim_type, language, report)
+    result = results.get(claim_key)
+
+    generate = st.button("Generate Claim Explanation")
+    if generate and not report.strip():
+        st.warning("Claim report is required.")
+    elif generate and result is None and api.API_URL:
+        # Thin client: the service runs the pipeline and writes the audit row
+        with st.spinner("Generating explanation..."):
+            try:
+                response = api.explain_claim(report, claim_type, language)
+            except api.ApiError as e:
+                st.error(e.describe("Explanation"))
+                st.stop()
+
+        result = dict(response, logged=True)
+        keep_result(results, claim_key, result)
+        placeholder = show_decision(result["decision"])
+    elif generate and result is None:
+        with tracing.start_trace("claim_request", claim_type=claim_type) as trace:
             decision = detect_claim_decision(report)
-            explanation = call_llm(
-                explanation_prompt(claim_type, decision, report, language)
-            )
-
-            valid = hallucination_check(report, explanation)
-            score = appeal_score(report)
+            placeholder = show_decision(decision)
+            streamed = []
 
-            st.subheader("Detected Claim Decision")
-            st.write(decision)
+            def show_token(chunk):
+                streamed.append(chunk)
+                placeholder.markdown("".join(streamed))
 
-            st.subheader("Explanation")
-            st.write(explanation)
-
-            st.caption(
-                "Disclaimer: This explanation is for understanding purposes only "
-                "and does not replace the official claim decision or policy document."
+            try:
+                pipeline = run_claim_pipeline(
+                    claim_type, decision, report, language, on_token=show_token
+                )
+            except (FutureTimeout, APITimeoutError):
+                st.error("Explanation timed out. Please try again.")
+                st.stop()
+
+        result = dict(
+            pipeline,
+            decision=decision,
+            timings=stage_timings(trace, extraction),
+            logged=False
+        )
+        keep_result(results, claim_key, result)
+    elif result is not None:
+        placeholder = show_decision(result["decision"])
+
+    if result is not None:
+        score = result["score"]
+        placeholder.markdown(result["explanation"])
+
+        st.caption(
+            "Disclaimer: This explanation is for understanding purposes only "
+            "and does not replace the official claim decision or policy document."
+        )
+
+        st.subheader("Appeal Readiness Score")
+        st.progress(score)
+
+        reviewed = False
+        if not result["valid"] or score < 0.6:
+            review_key = f"review_{claim_key}"
+            reviewed = st.checkbox(
+                "Flag for human review",
+                key=review_key,
+                on_change=record_review,
+                args=(result, review_key)
             )
 
-            st.subheader("Appeal Readiness Score")
-            st.progress(score)
-
-            reviewed = False
-            if not valid or score < 0.6:
-                reviewed = st.checkbox("Flag for human review")
-
-            log_event(claim_type, decision, score, reviewed)
+        # One audit row per generated explanation, not per rerun; later
+        # changes of the review flag update that row (record_review)
+        if not result["logged"]:
+            result["event_id"] = log_event(
+                claim_type, result["decision"], score, reviewed,
+                timings=result["timings"]
+            )
+            result["logged"] = True
 
 # =========================================================
 # TAB 2 – INSURANCE DOMAIN Q&A BOT
@@ -242,17 +208,40 @@ with tab2:
         st.session_state.qa_history = []
 
     user_q = st.text_input("Ask a question related to your claim or insurance")
+    ask = st.button("Ask")
 
-    if st.button("Ask"):
+    for q, a, passages in st.session_state.qa_history:
+        st.markdown(f"**User:** {q}")
+        st.markdown(f"**Bot:** {a}")
+        with st.expander("Report passages used"):
+            for cid, text in passages:
+                st.markdown(f"**[{cid}]** {text}")
+
+    if ask:
         if not report.strip():
             st.warning("Upload or paste a claim report first.")
         else:
-            answer = call_llm(domain_bot_prompt(report, user_q))
-            st.session_state.qa_history.append((user_q, answer))
+            st.markdown(f"**User:** {user_q}")
+            st.markdown("**Bot:**")
+            if api.API_URL:
+                try:
+                    with st.spinner("Thinking..."):
+                        response = api.ask_about_claim(report, user_q)
+                except api.ApiError as e:
+                    st.error(e.describe("Answer"))
+                    st.stop()
+                answer, passages = response["answer"], response["passages"]
+                st.markdown(answer)
+            else:
+                passages = report_index(input_key(report), report).search(user_q)
+                answer = st.write_stream(
+                    stream_llm(domain_bot_prompt(format_passages(passages), user_q))
+                )
+            with st.expander("Report passages used"):
+                for cid, text in passages:
+                    st.markdown(f"**[{cid}]** {text}")
 
-    for q, a in st.session_state.qa_history:
-        st.markdown(f"**User:** {q}")
-        st.markdown(f"**Bot:** {a}")
+            st.session_state.qa_history.append((user_q, answer, passages))
 
 # =========================================================
 # TAB 3 – AUDIT & ANALYTICS
@@ -260,19 +249,42 @@ with tab2:
 with tab3:
     st.subheader("Audit Logs & Analytics")
 
-    if not os.path.exists(LOG_FILE):
+    _, migration_error = migrate_legacy_audit_log()
+    if migration_error:
+        st.error(f"Legacy CSV log was not imported: {migration_error}")
+
+    store = get_audit_store()
+    store.flush()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        type_filter = st.selectbox("Filter by Claim Type", ["All"] + CLAIM_TYPES)
+    with col2:
+        decision_filter = st.selectbox("Filter by Decision", ["All"] + DECISIONS)
+
+    filters = {
+        "claim_type": None if type_filter == "All" else type_filter,
+        "decision": None if decision_filter == "All" else decision_filter
+    }
+
+    total = store.count(**filters)
+    if total == 0:
         st.info("No audit data available.")
     else:
-        try:
-            df = pd.read_csv(LOG_FILE)
-            if df.empty:
-                st.info("Audit log is empty.")
-            elif not REQUIRED_COLUMNS.issubset(df.columns):
-                st.error("Audit schema mismatch.")
-            else:
-                st.dataframe(df)
-                st.bar_chart(
-                    df.groupby("decision")["appeal_score"].mean()
-                )
-        except EmptyDataError:
-            st.info("Audit log is empty.")
+        pages = (total + AUDIT_PAGE_SIZE - 1) // AUDIT_PAGE_SIZE
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1)
+
+        st.dataframe(store.query(
+            limit=AUDIT_PAGE_SIZE,
+            offset=(page - 1) * AUDIT_PAGE_SIZE,
+            **filters
+        ))
+        st.caption(f"{total} records · page {page} of {pages}")
+
+        summary = store.decision_summary(**filters)
+        st.bar_chart(summary.set_index("decision")["appeal_score"])
+
+        latency = store.stage_latency(**filters)
+        if not latency.empty:
+            st.markdown("**Latency breakdown (average ms per stage)**")
+            st.bar_chart(latency["avg_ms"])
@@ -0,0 +1,380 @@
+import os
+import queue
+import atexit
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+# SCHEMA
+# =========================================================
+BASE_COLUMNS = [
+    "timestamp", "claim_type", "decision",
+    "appeal_score", "human_review"
+]
+
+# Per-request stage timings (milliseconds) and token usage
+TIMING_COLUMNS = [
+    "total_ms", "extraction_ms", "decision_ms", "report_prep_ms",
+    "explanation_ms", "guard_ms", "appeal_ms"
+]
+USAGE_COLUMNS = ["prompt_tokens", "completion_tokens", "cache_hits"]
+
+DISPLAY_COLUMNS = BASE_COLUMNS + TIMING_COLUMNS + USAGE_COLUMNS
+# Set by log_event so the review flag can be updated after the row is written
+AUDIT_COLUMNS = DISPLAY_COLUMNS + ["event_id"]
+
+COLUMN_TYPES = {
+    "timestamp": "TEXT",
+    "claim_type": "TEXT",
+    "decision": "TEXT",
+    "appeal_score": "REAL",
+    "human_review": "INTEGER",
+    **{c: "REAL" for c in TIMING_COLUMNS},
+    **{c: "INTEGER" for c in USAGE_COLUMNS},
+    "event_id": "TEXT"
+}
+
+
+def _where(claim_type=None, decision=None, since=None, until=None):
+    clauses, params = [], []
+    if claim_type:
+        clauses.append("claim_type = ?")
+        params.append(claim_type)
+    if decision:
+        clauses.append("decision = ?")
+        params.append(decision)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(str(since))
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(str(until))
+    sql = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return sql, params
+
+
+# =========================================================
+# SQLITE BACKEND
+# =========================================================
+class SqliteAuditStore:
+    """
+    Append-only audit store. Rows are queued and written in batches by a
+    background thread; reads use their own connections (WAL mode).
+    """
+
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            self._create_schema(conn)
+            conn.commit()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="audit-writer", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _create_schema(self, conn):
+        columns = ", ".join(f"{c} {COLUMN_TYPES[c]}" for c in AUDIT_COLUMNS)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS audit_log "
+            f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})"
+        )
+        # Columns added after a database was created
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(audit_log)")}
+        for column in AUDIT_COLUMNS:
+            if column not in existing:
+                conn.execute(
+                    f"ALTER TABLE audit_log ADD COLUMN {column} {COLUMN_TYPES[column]}"
+                )
+        for column in ("timestamp", "claim_type", "decision", "event_id"):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_audit_{column} "
+                f"ON audit_log ({column})"
+            )
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audit_migrations (
+                source TEXT PRIMARY KEY,
+                rows INTEGER NOT NULL,
+                migrated_at TEXT NOT NULL
+            )
+        """)
+
+    # ---------------- WRITES ----------------
+    def append(self, row):
+        self._queue.put(row)
+
+    def set_review(self, event_id, reviewed):
+        """
+        Updates the human_review flag of a logged row. Queued behind the
+        row itself, so it applies even if the row is not written yet.
+        """
+        self._queue.put((event_id, _to_db("human_review", reviewed)))
+
+    def flush(self):
+        """
+        Blocks until every queued row and update has been committed.
+        """
+        self._queue.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Whatever queued up behind the first row goes in the same commit
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            try:
+                self._apply(conn, batch)
+            except sqlite3.Error as e:
+                logger.error("Audit write failed (%d rows): %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _apply(self, conn, batch):
+        rows, reviews = [], []
+        for item in batch:
+            if isinstance(item, dict):
+                rows.append(item)
+            else:
+                event_id, flag = item
+                reviews.append((flag, event_id))
+        with conn:
+            if rows:
+                self._insert(conn, rows)
+            if reviews:
+                conn.executemany(
+                    "UPDATE audit_log SET human_review = ? WHERE event_id = ?", reviews
+                )
+
+    def _insert(self, conn, rows):
+        placeholders = ", ".join("?" for _ in AUDIT_COLUMNS)
+        values = [
+            tuple(_to_db(c, row.get(c)) for c in AUDIT_COLUMNS)
+            for row in rows
+        ]
+        conn.executemany(
+            f"INSERT INTO audit_log ({', '.join(AUDIT_COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            values
+        )
+
+    # ---------------- READS ----------------
+    def count(self, **filters):
+        where, params = _where(**filters)
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM audit_log{where}", params
+            ).fetchone()[0]
+
+    def query(self, limit=50, offset=0, **filters):
+        """
+        Newest-first page of audit rows as a DataFrame.
+        """
+        where, params = _where(**filters)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(DISPLAY_COLUMNS)} FROM audit_log{where} "
+                f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+                conn,
+                params=params + [limit, offset]
+            )
+
+    def decision_summary(self, **filters):
+        where, params = _where(**filters)
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                f"SELECT decision, AVG(appeal_score) AS appeal_score, "
+                f"COUNT(*) AS claims FROM audit_log{where} GROUP BY decision",
+                conn,
+                params=params
+            )
+
+    def stage_latency(self, **filters):
+        """
+        Average milliseconds per pipeline stage over rows that have timings.
+        """
+        where, params = _where(**filters)
+        averages = ", ".join(f"AVG({c}) AS {c}" for c in TIMING_COLUMNS)
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(
+                f"SELECT {averages} FROM audit_log{where}", conn, params=params
+            )
+        return (
+            df.T.rename(columns={0: "avg_ms"})
+            .rename(index=lambda c: c[:-len("_ms")])
+            .dropna()
+        )
+
+    # ---------------- MIGRATION ----------------
+    def migrate_csv(self, csv_path, required_columns, chunksize=10000):
+        """
+        Imports rows from the legacy CSV log. Re-running only imports rows
+        appended since the previous migration.
+
+        The rows and the migration marker are committed in one transaction,
+        so an interrupted migration imports nothing and a concurrent one
+        waits for it instead of importing the same rows.
+        """
+        if not os.path.exists(csv_path) or os.stat(csv_path).st_size == 0:
+            return 0
+
+        header = pd.read_csv(csv_path, nrows=0)
+        if not set(required_columns).issubset(header.columns):
+            raise ValueError("Audit schema mismatch.")
+
+        source = os.path.abspath(csv_path)
+        imported = 0
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT rows FROM audit_migrations WHERE source = ?", (source,)
+                ).fetchone()
+                done = row[0] if row else 0
+
+                reader = pd.read_csv(
+                    csv_path,
+                    skiprows=range(1, done + 1),
+                    chunksize=chunksize
+                )
+                for chunk in reader:
+                    self._insert(conn, chunk.to_dict("records"))
+                    imported += len(chunk)
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO audit_migrations "
+                    "(source, rows, migrated_at) "
+                    "VALUES (?, ?, datetime('now'))",
+                    (source, done + imported)
+                )
+        finally:
+            conn.close()
+        return imported
+
+
+def _to_db(column, value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if column == "human_review":
+        if isinstance(value, str):
+            return int(value.strip().lower() in ("true", "1", "yes"))
+        return int(bool(value))
+    if column == "appeal_score" or column in TIMING_COLUMNS:
+        return float(value)
+    if column in USAGE_COLUMNS:
+        return int(value)
+    return str(value)
+
+
+# =========================================================
+# CSV BACKEND (LEGACY)
+# =========================================================
+class CsvAuditStore:
+    """
+    Original CSV log, kept for deployments that cannot use SQLite.
+    Reads scan the whole file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def _empty(self):
+        return not os.path.exists(self.path) or os.stat(self.path).st_size == 0
+
+    def append(self, row):
+        # Stage timings are only kept by the SQLite backend; logs created
+        # before event_id existed keep their original columns
+        with self._lock:
+            if self._empty():
+                pd.DataFrame([row], columns=BASE_COLUMNS + ["event_id"]).to_csv(
+                    self.path, index=False
+                )
+            else:
+                columns = list(pd.read_csv(self.path, nrows=0).columns)
+                pd.DataFrame([row], columns=columns).to_csv(
+                    self.path, mode="a", header=False, index=False
+                )
+
+    def set_review(self, event_id, reviewed):
+        with self._lock:
+            if self._empty():
+                return
+            df = pd.read_csv(self.path)
+            if "event_id" not in df.columns:
+                return
+            df.loc[df["event_id"] == event_id, "human_review"] = bool(reviewed)
+            df.to_csv(self.path + ".tmp", index=False)
+            os.replace(self.path + ".tmp", self.path)
+
+    def flush(self):
+        pass
+
+    def _read(self, claim_type=None, decision=None, since=None, until=None):
+        if self._empty():
+            return pd.DataFrame(columns=BASE_COLUMNS)
+        df = pd.read_csv(self.path).drop(columns=["event_id"], errors="ignore")
+        if not set(BASE_COLUMNS).issubset(df.columns):
+            raise ValueError("Audit schema mismatch.")
+        if claim_type:
+            df = df[df["claim_type"] == claim_type]
+        if decision:
+            df = df[df["decision"] == decision]
+        if since:
+            df = df[df["timestamp"] >= str(since)]
+        if until:
+            df = df[df["timestamp"] < str(until)]
+        return df
+
+    def count(self, **filters):
+        return len(self._read(**filters))
+
+    def query(self, limit=50, offset=0, **filters):
+        df = self._read(**filters).iloc[::-1]
+        return df.iloc[offset:offset + limit].reset_index(drop=True)
+
+    def decision_summary(self, **filters):
+        df = self._read(**filters)
+        return df.groupby("decision").agg(
+            appeal_score=("appeal_score", "mean"),
+            claims=("decision", "size")
+        ).reset_index()
+
+    def stage_latency(self, **filters):
+        return pd.DataFrame(columns=["avg_ms"])
+
+    def migrate_csv(self, csv_path, required_columns, chunksize=10000):
+        return 0
+
+
+def open_audit_store(backend, log_dir):
+    """
+    backend: "sqlite" (default) or "csv"
+    """
+    if backend == "csv":
+        return CsvAuditStore(os.path.join(log_dir, "audit_logs.csv"))
+    return SqliteAuditStore(os.path.join(log_dir, "audit_logs.sqlite3"))
@@ -0,0 +1,247 @@
+"""
+Headless batch runner for the claim explanation pipeline.
+
+    python batch_claims.py reports/ --output results.jsonl
+    python batch_claims.py claims.jsonl --output results.parquet --concurrency 8
+
+Input is a directory of .pdf / .txt reports or a JSONL file with one
+{"id", "report" | "path", "claim_type", "language"} object per line.
+Every result is appended to <output>.checkpoint.jsonl as it completes, so
+re-running the same command resumes where a crashed run stopped and
+retries the failed items. The output holds the latest result per id.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import claims_core
+from common import azure_gateway, tracing
+from claims_core import (
+    CLAIM_TYPES, LANGUAGES,
+    extract_text_from_pdf, detect_claim_decision,
+    run_claim_pipeline, log_event, stage_timings
+)
+
+REVIEW_THRESHOLD = 0.6
+
+
+# =========================================================
+# INPUT
+# =========================================================
+def load_items(source, claim_type, language):
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith((".pdf", ".txt")):
+                yield {
+                    "id": name,
+                    "path": os.path.join(source, name),
+                    "claim_type": claim_type,
+                    "language": language
+                }
+        return
+
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            item.setdefault("id", str(line_no))
+            item.setdefault("claim_type", claim_type)
+            item.setdefault("language", language)
+            yield item
+
+
+def read_report(item):
+    if item.get("report"):
+        return item["report"]
+    path = item["path"]
+    if path.lower().endswith(".pdf"):
+        with tracing.trace_stage("pdf_extraction"):
+            return extract_text_from_pdf(path)
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+# =========================================================
+# CHECKPOINT
+# =========================================================
+def checkpoint_path(output):
+    return os.path.splitext(output)[0] + ".checkpoint.jsonl"
+
+
+def load_checkpoint(path):
+    """
+    Latest record per id: a retried item's record replaces its failure.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partial last line from a crashed run
+                continue
+            records[record["id"]] = record
+    return records
+
+
+class CheckpointWriter:
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# =========================================================
+# PIPELINE
+# =========================================================
+def process_item(item):
+    started = time.monotonic()
+    record = {
+        "id": item["id"],
+        "claim_type": item["claim_type"],
+        "language": item["language"]
+    }
+    try:
+        with tracing.start_trace("claim_request", claim_type=item["claim_type"]) as trace:
+            report = read_report(item)
+            if not report.strip():
+                raise ValueError("empty claim report")
+
+            decision = detect_claim_decision(report)
+            result = run_claim_pipeline(
+                item["claim_type"], decision, report, item["language"]
+            )
+        needs_review = not result["valid"] or result["score"] < REVIEW_THRESHOLD
+
+        record.update({
+            "status": "ok",
+            "decision": decision,
+            "explanation": result["explanation"],
+            "supported": result["valid"],
+            "appeal_score": result["score"],
+            "needs_review": needs_review,
+            "timings": stage_timings(trace)
+        })
+    except Exception as e:
+        record.update({"status": "failed", "error": f"{type(e).__name__}: {e}"})
+
+    record["seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def write_results(records, path):
+    if path.endswith(".parquet"):
+        import pandas as pd
+        pd.DataFrame(records).to_parquet(path, index=False)
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+
+def run_batch(source, output, claim_type, language, concurrency, max_in_flight):
+    if os.path.abspath(source) == os.path.abspath(output):
+        raise ValueError("--output must not be the input file")
+
+    checkpoint = checkpoint_path(output)
+    records = load_checkpoint(checkpoint)
+    if not records and not output.endswith(".parquet"):
+        # Earlier runs checkpointed into the JSONL output itself
+        records = load_checkpoint(output)
+
+    done = {record_id for record_id, record in records.items() if record["status"] == "ok"}
+    pending = [
+        item for item in load_items(source, claim_type, language)
+        if item["id"] not in done
+    ]
+    print(f"{len(done)} already processed, {len(pending)} pending")
+
+    claims_core.set_max_in_flight(max_in_flight)
+    usage_before = claims_core.usage_stats()
+    writer = CheckpointWriter(checkpoint)
+    started = time.monotonic()
+    ok = failed = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(process_item, item) for item in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                writer.write(record)
+                records[record["id"]] = record
+                if record["status"] == "ok":
+                    ok += 1
+                    # Logged once checkpointed, so a resumed run never
+                    # logs the same report twice. Nobody has reviewed a
+                    # batch result yet; needs_review stays in the output
+                    log_event(
+                        record["claim_type"], record["decision"],
+                        record["appeal_score"], False, timings=record["timings"]
+                    )
+                else:
+                    failed += 1
+                    print(f"[failed] {record['id']}: {record['error']}")
+    finally:
+        writer.close()
+        claims_core.get_audit_store().flush()
+        write_results(list(records.values()), output)
+
+    minutes = max(time.monotonic() - started, 1e-9) / 60
+    usage = claims_core.usage_stats()
+    tokens = (
+        usage["prompt_tokens"] + usage["completion_tokens"]
+        - usage_before["prompt_tokens"] - usage_before["completion_tokens"]
+    )
+    print(f"Processed {ok} reports ({failed} failed) in {minutes * 60:.1f}s")
+    print(f"Throughput: {ok / minutes:.1f} reports/min, {tokens / minutes:.0f} tokens/min")
+    print(f"LLM requests: {usage['requests'] - usage_before['requests']}")
+    gateway = azure_gateway.gateway_stats()
+    print(f"Throttled (429): {gateway['throttled']}, retries: {gateway['retries']}, "
+          f"coalesced: {gateway['coalesced']}")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch claim explanation runner")
+    parser.add_argument("source", help="Directory of reports or a JSONL file")
+    parser.add_argument("--output", default="batch_results.jsonl",
+                        help="Results file (.jsonl or .parquet)")
+    parser.add_argument("--claim-type", default="Health", choices=CLAIM_TYPES)
+    parser.add_argument("--language", default="English", choices=LANGUAGES)
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Reports processed at the same time")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Cap on concurrent LLM requests (default 2x concurrency)")
+    args = parser.parse_args(argv)
+
+    failed = run_batch(
+        args.source,
+        args.output,
+        args.claim_type,
+        args.language,
+        args.concurrency,
+        args.max_in_flight or 2 * args.concurrency
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
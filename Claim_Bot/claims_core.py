@@ -0,0 +1,468 @@
+import os
+import sys
+import time
+import uuid
+import threading
+from dotenv import load_dotenv
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from common import metrics
+from common.llm_cache import get_llm_cache, make_key
+from common import azure_gateway
+from common import tracing
+from pdf_extract import extract_pdf
+from audit_store import open_audit_store
+from report_prep import prepare_report
+
+# =========================================================
+# ENVIRONMENT
+# =========================================================
+load_dotenv()
+
+MODEL = os.getenv("AZURE_OPENAI_DEPLOYMENT")
+TEMPERATURE = 0.3
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+LOG_DIR = os.getenv("CLAIM_LOG_DIR", "logs")
+LOG_FILE = os.path.join(LOG_DIR, "audit_logs.csv")
+os.makedirs(LOG_DIR, exist_ok=True)
+
+AUDIT_BACKEND = os.getenv("AUDIT_BACKEND", "sqlite")
+
+REQUIRED_COLUMNS = {
+    "timestamp", "claim_type", "decision",
+    "appeal_score", "human_review"
+}
+
+CLAIM_TYPES = [
+    "Health", "Motor", "Life", "Travel",
+    "Home / Property", "Commercial",
+    "Personal Accident"
+]
+
+LANGUAGES = ["English", "Hindi", "Marathi"]
+
+DECISIONS = ["Approved", "Partially Approved", "Denied", "Unclear"]
+
+# Cap on concurrent chat completion requests from this process
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+
+# Per-stage deadlines (seconds) for the claim explanation pipeline
+EXPLANATION_TIMEOUT = float(os.getenv("EXPLANATION_TIMEOUT", "60"))
+GUARD_TIMEOUT = float(os.getenv("GUARD_TIMEOUT", "30"))
+APPEAL_TIMEOUT = float(os.getenv("APPEAL_TIMEOUT", "30"))
+
+# =========================================================
+# DOCUMENT EXTRACTION
+# =========================================================
+def extract_text_from_pdf(file):
+    return extract_pdf(file)["text"]
+
+# =========================================================
+# CLAIM DECISION DETECTION
+# =========================================================
+@tracing.traced("detect_decision")
+def detect_claim_decision(report):
+    r = report.lower()
+    if "rejected" in r or "not payable" in r:
+        return "Denied"
+    if "partially approved" in r or "partial approval" in r:
+        return "Partially Approved"
+    if "approved" in r:
+        return "Approved"
+    return "Unclear"
+
+# =========================================================
+# PROMPTS
+# =========================================================
+def explanation_prompt(claim_type, decision, report, language):
+    return f"""
+You are an insurance claims explanation assistant.
+
+Claim Type: {claim_type}
+Decision (as stated in document): {decision}
+Language: {language}
+
+RULES:
+- Use ONLY information present in the claim report.
+- Do NOT invent policy rules.
+- Do NOT promise outcomes or approvals.
+- If information is missing, say so clearly.
+
+FORMAT:
+
+1. Claim Decision
+2. Why This Decision Was Made
+3. What This Means for You
+4. What You Can Do Next
+
+Claim Report:
+\"\"\"{report}\"\"\"
+"""
+
+def domain_bot_prompt(passages, question):
+    return f"""
+You are an insurance domain assistant.
+
+PRIORITY RULES:
+1. First use the claim report passages below.
+2. If the answer is not in the passages, you MAY use general insurance knowledge.
+3. Clearly say when general knowledge is used.
+4. Cite the passage ids you relied on, e.g. [C2].
+5. Do NOT provide legal or financial advice.
+
+Claim Report Passages:
+\"\"\"{passages}\"\"\"
+
+User Question:
+{question}
+"""
+
+def hallucination_guard(report, explanation):
+    return f"""
+Check whether the explanation is fully supported by the claim report.
+Reply strictly YES or NO.
+
+Report:
+{report}
+
+Explanation:
+{explanation}
+"""
+
+def appeal_score_prompt(report):
+    return f"""
+Based ONLY on the claim report,
+estimate appeal success likelihood between 0 and 1.
+Return only a numeric value.
+
+{report}
+"""
+
+# =========================================================
+# LLM CALL
+# =========================================================
+_llm_slots = threading.BoundedSemaphore(LLM_MAX_IN_FLIGHT)
+_llm_executor = None
+_executor_lock = threading.Lock()
+
+_usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+_usage_lock = threading.Lock()
+
+def set_max_in_flight(limit):
+    """
+    Resizes the in-flight request cap; call before starting work.
+    """
+    global _llm_slots, _llm_executor
+    with _executor_lock:
+        _llm_slots = threading.BoundedSemaphore(limit)
+        if _llm_executor is not None:
+            _llm_executor.shutdown(wait=False)
+        _llm_executor = ThreadPoolExecutor(
+            max_workers=limit, thread_name_prefix="claim-llm"
+        )
+
+def record_usage(usage):
+    if usage is None:
+        return
+    with _usage_lock:
+        _usage["requests"] += 1
+        _usage["prompt_tokens"] += usage.prompt_tokens or 0
+        _usage["completion_tokens"] += usage.completion_tokens or 0
+
+def usage_stats():
+    with _usage_lock:
+        return dict(_usage)
+
+def call_llm(prompt, timeout=None, bypass_cache=False):
+    messages = [{"role": "user", "content": prompt}]
+
+    cache = get_llm_cache()
+    key = make_key(MODEL, messages, TEMPERATURE)
+    cached = cache.get(key, bypass=bypass_cache)
+    if cached is not None:
+        tracing.record(cache_hits=1)
+        return cached
+
+    # Shared pooled client, created on first use; rate limiting and
+    # retries live in common/azure_gateway.py
+    llm = azure_gateway.get_client()
+    if timeout:
+        # Abort the HTTP request itself so a slow call frees its worker
+        llm = llm.with_options(timeout=timeout, max_retries=0)
+    with _llm_slots:
+        response = azure_gateway.chat_completion(
+            client=llm,
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE
+        )
+    record_usage(response.usage)
+    tracing.record_usage(response.usage)
+    content = response.choices[0].message.content.strip()
+    cache.set(key, content)
+    return content
+
+def stream_llm(prompt, timeout=None, bypass_cache=False):
+    """
+    Yields the completion as text chunks; a cached answer arrives as one chunk.
+    Time to first token is recorded as the claim_bot.ttft metric.
+    """
+    messages = [{"role": "user", "content": prompt}]
+
+    cache = get_llm_cache()
+    key = make_key(MODEL, messages, TEMPERATURE)
+    cached = cache.get(key, bypass=bypass_cache)
+    if cached is not None:
+        tracing.record(cache_hits=1)
+        yield cached
+        return
+
+    started = time.monotonic()
+    deadline = started + timeout if timeout else None
+    first = True
+    parts = []
+
+    with _llm_slots:
+        llm = azure_gateway.get_client()
+        if deadline:
+            # The request gets only what is left of the deadline (the slot
+            # wait included), so a stalled read cannot outlive it; between
+            # chunks the deadline is checked below
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise FutureTimeout("LLM stream exceeded its deadline")
+            llm = llm.with_options(timeout=remaining, max_retries=0)
+        stream = azure_gateway.chat_completion(
+            client=llm,
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+            stream=True,
+            # Final chunk carries token usage for the trace
+            stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in stream:
+                if deadline and time.monotonic() > deadline:
+                    raise FutureTimeout("LLM stream exceeded its deadline")
+                if getattr(chunk, "usage", None) is not None:
+                    tracing.record_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first:
+                    metrics.observe("claim_bot.ttft", time.monotonic() - started)
+                    first = False
+                parts.append(delta)
+                yield delta
+        finally:
+            stream.close()
+
+    cache.set(key, "".join(parts).strip())
+
+# =========================================================
+# GOVERNANCE FUNCTIONS
+# =========================================================
+@tracing.traced("hallucination_guard")
+def hallucination_check(report, explanation, timeout=None):
+    result = call_llm(hallucination_guard(report, explanation), timeout)
+    return "YES" in result.upper()
+
+@tracing.traced("appeal_score")
+def appeal_score(report, timeout=None):
+    try:
+        return float(call_llm(appeal_score_prompt(report), timeout))
+    except:
+        return 0.0
+
+_audit_store = None
+_audit_lock = threading.Lock()
+_migration = None
+
+def get_audit_store():
+    global _audit_store
+    if _audit_store is None:
+        with _audit_lock:
+            if _audit_store is None:
+                _audit_store = open_audit_store(AUDIT_BACKEND, LOG_DIR)
+    return _audit_store
+
+def migrate_legacy_audit_log():
+    """
+    One-off import of the legacy CSV log; returns (rows, error).
+    """
+    global _migration
+    if _migration is None:
+        try:
+            _migration = (
+                get_audit_store().migrate_csv(LOG_FILE, REQUIRED_COLUMNS), None
+            )
+        except ValueError as e:
+            _migration = (0, str(e))
+    return _migration
+
+# Trace stage -> audit column
+STAGE_COLUMNS = {
+    "claim_request": "total_ms",
+    "pdf_extraction": "extraction_ms",
+    "detect_decision": "decision_ms",
+    "report_prep": "report_prep_ms",
+    "explanation": "explanation_ms",
+    "hallucination_guard": "guard_ms",
+    "appeal_score": "appeal_ms"
+}
+
+def stage_timings(trace, extraction=None):
+    """
+    Audit columns (milliseconds, tokens, cache hits) from a request trace.
+    extraction: extract_pdf result, whose original extraction time is used
+    even when the PDF came from the cache.
+    """
+    stages = trace.summary()
+    timings = {
+        column: round(stages[stage]["seconds"] * 1000, 1)
+        for stage, column in STAGE_COLUMNS.items()
+        if stage in stages
+    }
+    if extraction is not None:
+        timings["extraction_ms"] = round(extraction["seconds"] * 1000, 1)
+    for key in ("prompt_tokens", "completion_tokens", "cache_hits"):
+        timings[key] = trace.total(key)
+    return timings
+
+def log_event(claim_type, decision, score, reviewed, timings=None):
+    """
+    Queues one audit row; returns its event ID for set_review().
+    """
+    event_id = uuid.uuid4().hex
+    row = {
+        "timestamp": datetime.now().isoformat(sep=" "),
+        "claim_type": claim_type,
+        "decision": decision,
+        "appeal_score": score,
+        "human_review": reviewed,
+        "event_id": event_id
+    }
+    row.update(timings or {})
+    get_audit_store().append(row)
+    return event_id
+
+def set_review(event_id, reviewed):
+    """
+    Records a later change of the human-review flag on a logged row.
+    """
+    get_audit_store().set_review(event_id, reviewed)
+
+# =========================================================
+# CLAIM PIPELINE
+# =========================================================
+def get_llm_executor():
+    global _llm_executor
+    if _llm_executor is None:
+        with _executor_lock:
+            if _llm_executor is None:
+                _llm_executor = ThreadPoolExecutor(
+                    max_workers=LLM_MAX_IN_FLIGHT,
+                    thread_name_prefix="claim-llm"
+                )
+    return _llm_executor
+
+def _submit_stage(executor, fn, *args):
+    """
+    Submits a pipeline stage. future.started is set once a worker picks it
+    up (future.started_at: when) or once it is done without running.
+    """
+    started = threading.Event()
+    started_at = []
+
+    def run(*args):
+        started_at.append(time.monotonic())
+        started.set()
+        return fn(*args)
+
+    future = tracing.submit(executor, run, *args)
+    future.started, future.started_at = started, started_at
+    future.add_done_callback(lambda f: started.set())
+    return future
+
+def _stage_result(future, timeout):
+    # The stage's timeout runs from when it started, so time queued behind
+    # other claims' stages on the shared executor does not count
+    future.started.wait()
+    elapsed = time.monotonic() - future.started_at[0] if future.started_at else 0.0
+    return future.result(timeout=max(0.0, timeout - elapsed))
+
+def run_claim_pipeline(claim_type, decision, report, language, on_token=None):
+    """
+    Runs explanation, hallucination guard and appeal score with
+    appeal scoring overlapped with the explanation call.
+
+    With on_token, the explanation is streamed in the calling thread and
+    each chunk is passed to the callback as it arrives.
+    """
+    executor = get_llm_executor()
+
+    # Compacted once; the guard checks against the explanation's context
+    with tracing.trace_stage("report_prep"):
+        prepared = prepare_report(report)
+        context = prepared.for_prompt("explanation")
+    prompt = explanation_prompt(claim_type, decision, context, language)
+
+    score_future = _submit_stage(
+        executor, appeal_score, prepared.for_prompt("appeal"), APPEAL_TIMEOUT
+    )
+
+    try:
+        with tracing.trace_stage("explanation"):
+            if on_token is None:
+                explanation_future = _submit_stage(
+                    executor, call_llm, prompt, EXPLANATION_TIMEOUT
+                )
+                try:
+                    explanation = _stage_result(
+                        explanation_future, EXPLANATION_TIMEOUT
+                    )
+                except Exception:
+                    explanation_future.cancel()
+                    raise
+            else:
+                parts = []
+                for chunk in stream_llm(prompt, EXPLANATION_TIMEOUT):
+                    parts.append(chunk)
+                    on_token(chunk)
+                explanation = "".join(parts).strip()
+    except Exception:
+        score_future.cancel()
+        raise
+
+    guard_future = _submit_stage(
+        executor, hallucination_check, context, explanation, GUARD_TIMEOUT
+    )
+    try:
+        valid = _stage_result(guard_future, GUARD_TIMEOUT)
+    except Exception:
+        # An unverified explanation is treated as unsupported
+        guard_future.cancel()
+        valid = False
+
+    try:
+        score = _stage_result(score_future, APPEAL_TIMEOUT)
+    except FutureTimeout:
+        score_future.cancel()
+        score = 0.0
+
+    return {
+        "explanation": explanation,
+        "valid": valid,
+        "score": score
+    }
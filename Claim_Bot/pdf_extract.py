@@ -0,0 +1,143 @@
+import io
+import os
+import time
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "200"))
+MAX_PDF_MB = float(os.getenv("MAX_PDF_MB", "25"))
+FAST_MODE_PAGES = int(os.getenv("PDF_FAST_MODE_PAGES", "20"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Small documents are cheaper to parse in-process than to ship to a pool
+PARALLEL_MIN_PAGES = 8
+PAGES_PER_TASK = 4
+CACHE_SIZE = 32
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: the Streamlit server is multi-threaded, fork is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def _extract_page_range(path, start, stop):
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def read_pdf_bytes(source):
+    """
+    Accepts raw bytes, a path or a file-like object (e.g. a Streamlit upload).
+    """
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    return source.read()
+
+
+def page_count(data):
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return len(pdf.pages)
+
+
+# =========================================================
+# EXTRACTION
+# =========================================================
+def _iter_pages(data, limit):
+    """
+    Yields the text of the first limit pages in page order as each is
+    ready. Large documents are split across a process pool.
+    """
+    if limit < PARALLEL_MIN_PAGES or PDF_WORKERS <= 1:
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            for page in pdf.pages[:limit]:
+                yield page.extract_text() or ""
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+
+    try:
+        starts = list(range(0, limit, PAGES_PER_TASK))
+        stops = [min(s + PAGES_PER_TASK, limit) for s in starts]
+        results = _get_pool().map(
+            _extract_page_range, [tmp.name] * len(starts), starts, stops
+        )
+        for texts in results:
+            yield from texts
+    finally:
+        os.unlink(tmp.name)
+
+
+def extract_pdf(source, first_pages=None):
+    """
+    Extracts report text, memoized by the SHA-256 of the file bytes.
+
+    first_pages limits extraction to the first N pages. Without it, files
+    above MAX_PDF_MB or MAX_PDF_PAGES fall back to the first
+    PDF_FAST_MODE_PAGES pages; either way a shorter result is reported as
+    truncated.
+    """
+    started = time.monotonic()
+    data = read_pdf_bytes(source)
+    digest = hashlib.sha256(data).hexdigest()
+
+    key = (digest, first_pages)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    total = page_count(data)
+    limit = first_pages
+    if limit is None and (
+        len(data) > MAX_PDF_MB * 1024 * 1024 or total > MAX_PDF_PAGES
+    ):
+        limit = FAST_MODE_PAGES
+    if limit is not None:
+        limit = min(limit, total)
+
+    count = limit if limit is not None else total
+    result = {
+        "sha256": digest,
+        "text": "\n".join(text for text in _iter_pages(data, count) if text).strip(),
+        "pages": count,
+        "total_pages": total,
+        "truncated": limit is not None and limit < total,
+        # Time of the original extraction; cache hits report the same value
+        "seconds": time.monotonic() - started
+    }
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return result
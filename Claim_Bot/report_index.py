@@ -0,0 +1,71 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from common.bm25 import BM25Index, tokenize
+from report_prep import PROMPT_BUDGETS, prepare_report, count_tokens, truncate_to_tokens
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+CHUNK_TOKENS = int(os.getenv("REPORT_CHUNK_TOKENS", "200"))
+QA_TOP_K = int(os.getenv("REPORT_QA_TOP_K", "4"))
+
+
+def chunk_sections(sections, max_tokens=CHUNK_TOKENS):
+    chunks = []
+    for section in sections:
+        if count_tokens(section) <= max_tokens:
+            chunks.append(section)
+            continue
+
+        current, size = [], 0
+        for line in section.splitlines():
+            line_tokens = count_tokens(line)
+            if current and size + line_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(line)
+            size += line_tokens
+        if current:
+            chunks.append("\n".join(current))
+    return [c for c in chunks if c.strip()]
+
+
+class ReportIndex:
+    """
+    Lexical (BM25) passage index over one claim report.
+    """
+
+    def __init__(self, report):
+        prepared = prepare_report(report)
+        self.chunks = chunk_sections(prepared.sections)
+        self.bm25 = BM25Index([tokenize(c) for c in self.chunks])
+
+    def search(self, question, k=QA_TOP_K, budget=PROMPT_BUDGETS["qa"]):
+        """
+        Returns [(citation_id, passage)] in report order: the best k
+        matches that fit the token budget, least relevant dropped first.
+        """
+        ids = [doc_id for doc_id, _ in self.bm25.search(tokenize(question), k)]
+        if not ids and self.chunks:
+            # Nothing matched: give the model the report opening for context
+            ids = [0]
+
+        chosen, used = {}, 0
+        for i in ids:
+            size = count_tokens(self.chunks[i])
+            if used + size <= budget:
+                chosen[i] = self.chunks[i]
+                used += size
+            elif not chosen:
+                chosen[i] = truncate_to_tokens(self.chunks[i], budget)
+                break
+        return [(f"C{i + 1}", chosen[i]) for i in sorted(chosen)]
+
+
+def format_passages(passages):
+    return "\n\n".join(f"[{cid}] {text}" for cid, text in passages)
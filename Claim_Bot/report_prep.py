@@ -0,0 +1,176 @@
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+# Token budget for the report text embedded in each prompt.
+# The hallucination guard reuses the explanation context so it checks
+# the explanation against exactly what the model saw.
+PROMPT_BUDGETS = {
+    "explanation": int(os.getenv("REPORT_BUDGET_EXPLANATION", "3000")),
+    "appeal": int(os.getenv("REPORT_BUDGET_APPEAL", "1500")),
+    "qa": int(os.getenv("REPORT_BUDGET_QA", "3000"))
+}
+
+# Exact lines repeated this often are treated as page headers / footers
+REPEAT_THRESHOLD = 3
+MAX_BOILERPLATE_CHARS = 100
+
+KEY_TERMS = [
+    "reject", "denied", "not payable", "repudiat", "approved", "partial",
+    "reason", "exclusion", "excluded", "clause", "condition", "waiting period",
+    "pre-existing", "deduct", "co-pay", "sum insured", "claim amount",
+    "settled", "payable", "disallowed", "appeal", "grievance"
+]
+
+# "Page 3", "Page 3 of 10", "Page 3/10", "- 3 -"; a bare number on its
+# own line may be an amount or a day count, so it is kept
+PAGE_NUMBER = re.compile(
+    r"^(page\s*\d+(\s*(of|/)\s*\d+)?"
+    r"|-\s*\d{1,3}\s*-)$",
+    re.I
+)
+NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*[.)]?\s+\S")
+SKIP_MARKER = "[...]"
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # ~4 characters per token for English text
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, budget):
+    if count_tokens(text) <= budget:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text, disallowed_special=())[:budget])
+    return text[:budget * 4]
+
+
+# =========================================================
+# COMPACTION
+# =========================================================
+def strip_boilerplate(text):
+    """
+    Drops page numbers, repeated headers / footers and redundant whitespace.
+    """
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines()]
+    repeats = Counter(
+        line for line in lines if line and len(line) <= MAX_BOILERPLATE_CHARS
+    )
+
+    kept, seen = [], set()
+    for line in lines:
+        if PAGE_NUMBER.match(line):
+            continue
+        if repeats.get(line, 0) >= REPEAT_THRESHOLD:
+            # Keep the first occurrence, e.g. the document title
+            if line in seen:
+                continue
+            seen.add(line)
+        if not line and (not kept or not kept[-1]):
+            continue
+        kept.append(line)
+
+    return "\n".join(kept).strip()
+
+
+def _is_heading(line):
+    if len(line) > 80:
+        return False
+    if NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and line.isupper():
+        return True
+    return line.endswith(":") and len(line) <= 60
+
+
+def split_sections(text):
+    sections, current = [], []
+    for line in text.splitlines():
+        if _is_heading(line) and current:
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current).strip())
+    return [s for s in sections if s]
+
+
+def _relevance(section, index):
+    lowered = section.lower()
+    score = sum(lowered.count(term) for term in KEY_TERMS)
+    # The opening section usually carries claim / policy identifiers
+    if index == 0:
+        score += 5
+    return score
+
+
+class PreparedReport:
+    """
+    Compacted claim report, computed once and sliced per prompt budget.
+    """
+
+    def __init__(self, text):
+        self.original_tokens = count_tokens(text)
+        self.text = strip_boilerplate(text)
+        self.tokens = count_tokens(self.text)
+        self.sections = split_sections(self.text)
+        self._section_tokens = [count_tokens(s) for s in self.sections]
+        self._contexts = {}
+
+    def for_prompt(self, name):
+        if name not in self._contexts:
+            self._contexts[name] = self.fit(PROMPT_BUDGETS[name])
+        return self._contexts[name]
+
+    def fit(self, budget):
+        """
+        Most relevant sections that fit the budget, in document order.
+        """
+        if self.tokens <= budget:
+            return self.text
+
+        ranked = sorted(
+            range(len(self.sections)),
+            key=lambda i: _relevance(self.sections[i], i),
+            reverse=True
+        )
+
+        chosen, used = {}, 0
+        for i in ranked:
+            remaining = budget - used
+            if remaining <= 0:
+                break
+            size = self._section_tokens[i]
+            if size <= remaining:
+                chosen[i] = self.sections[i]
+                used += size
+            elif not chosen:
+                chosen[i] = truncate_to_tokens(self.sections[i], remaining)
+                used = budget
+
+        parts, previous = [], None
+        for i in sorted(chosen):
+            if previous is not None and i != previous + 1:
+                parts.append(SKIP_MARKER)
+            parts.append(chosen[i])
+            previous = i
+        return "\n\n".join(parts)
+
+
+@lru_cache(maxsize=32)
+def prepare_report(report):
+    return PreparedReport(report)
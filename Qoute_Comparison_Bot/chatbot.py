@@ -1,9 +1,16 @@
+import time
+import uuid
+
 from logic.quote_input import get_quotes_from_user, get_user_profile
 from logic.quote_comparison import compare_quotes
-from rag.retriever_chroma import retrieve_policy_clauses
-from llm.explainer_with_memory import explain_answer
+from rag.retriever_chroma import retrieve_policy_clauses_multi, warm_up, get_embeddings
+from llm.explainer_with_memory import stream_answer, remember_answer, session_memory
+from llm.semantic_cache import SemanticCache, context_key
 
 def chatbot():
+    # Load the embedding model while the user enters quote details
+    warm_up(background=True)
+
     print("========================================")
     print(" Insurance Quote Comparison Chatbot ")
     print("========================================")
@@ -14,6 +21,12 @@ def chatbot():
 
     print("\nQuotes saved. You can now ask questions.\n")
 
+    # Each chatbot run gets its own conversation memory
+    session_id = uuid.uuid4().hex
+
+    # Paraphrases of an answered question reuse its answer
+    answer_cache = SemanticCache(lambda text: get_embeddings().embed_query(text))
+
     while True:
         question = input("Ask a question (or 'exit'): ").strip()
 
@@ -24,19 +37,41 @@ def chatbot():
         # 1️⃣ Compare quotes
         comparison = compare_quotes(quotes, user_profile)
 
-        # 2️⃣ RAG retrieval
-        policy_docs = retrieve_policy_clauses(question)
-
-        # 3️⃣ Explain with memory
-        answer = explain_answer(
-            question=question,
-            comparison_result=comparison,
-            policy_docs=policy_docs
+        # 2️⃣ RAG retrieval (clauses for every compared quote, one search)
+        policy_docs = retrieve_policy_clauses_multi(
+            question, list(comparison["scores"])
         )
 
+        # 3️⃣ Semantic cache: same quotes, profile and clauses (history for follow-ups), similar question
+        history = session_memory.get(session_id).messages
+        context = context_key(quotes, user_profile, policy_docs, history, question)
+        hit = answer_cache.lookup(question, context)
+
         print("\n--- Chatbot Response ---\n")
-        print(answer)
-        print("\n------------------------\n")
+        if hit:
+            print(hit.answer)
+            remember_answer(question, hit.answer, session_id)
+            stats = answer_cache.stats()
+            print(
+                f"\n(cached answer to \"{hit.question}\", similarity {hit.similarity:.2f}; "
+                f"hit rate {stats['hit_rate']:.0%}, {stats['saved_seconds']:.1f}s saved)"
+            )
+            print("\n------------------------\n")
+            continue
+
+        # 4️⃣ Explain with memory (printed as it is generated)
+        started = time.monotonic()
+        parts = []
+        for token in stream_answer(
+            question=question,
+            comparison_result=comparison,
+            policy_docs=policy_docs,
+            session_id=session_id
+        ):
+            parts.append(token)
+            print(token, end="", flush=True)
+        answer_cache.store(question, context, "".join(parts), time.monotonic() - started)
+        print("\n\n------------------------\n")
 
 if __name__ == "__main__":
     chatbot()
@@ -1,10 +1,22 @@
 from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.runnables import RunnableWithMessageHistory
-from langchain_core.chat_history import InMemoryChatMessageHistory
 import os
+import sys
+import time
 from dotenv import load_dotenv
 
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(APP_DIR)
+for path in (APP_DIR, ROOT_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from common import metrics
+from common import azure_gateway
+from llm.memory import SessionMemory
+
 load_dotenv() 
 
 AZURE_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
@@ -15,7 +27,13 @@ AZURE_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 llm = AzureChatOpenAI(
     deployment_name=AZURE_DEPLOYMENT,
     api_version=AZURE_API_VERSION,
-    temperature=0.2
+    temperature=0.2,
+    # Shared connection pool and quota with the other apps
+    http_client=azure_gateway.get_http_client(),
+    http_async_client=azure_gateway.get_async_http_client(),
+    rate_limiter=azure_gateway.langchain_rate_limiter(),
+    callbacks=[azure_gateway.langchain_usage_handler()],
+    max_retries=azure_gateway.MAX_RETRIES
 )
 
 # ---------------- PROMPT ----------------
@@ -37,6 +55,7 @@ Relevant policy clauses:
 Explain clearly:
 - Which quote is best
 - Why
+- Cite the quote ID (e.g. [Q2]) of any policy clause you rely on
 - Keep it simple
 - Do not invent facts
 """)
@@ -44,12 +63,45 @@ Explain clearly:
 chain = prompt | llm
 
 # ---------------- MEMORY STORE ----------------
-chat_histories = {}
+DEFAULT_SESSION_ID = "insurance_chat"
+
+summary_prompt = ChatPromptTemplate.from_template("""
+Update the running summary of a conversation between a user and an insurance assistant.
+Keep quote IDs, numbers, user preferences and conclusions. Be brief.
+
+Current summary:
+{summary}
+
+New conversation lines:
+{lines}
+
+Updated summary:
+""")
+
+summary_chain = summary_prompt | llm
+
+def summarize_history(previous_summary, messages):
+    lines = "\n".join(f"{m.type}: {m.content}" for m in messages)
+    response = summary_chain.invoke({
+        "summary": previous_summary or "(none)",
+        "lines": lines
+    })
+    return response.content.strip()
+
+session_memory = SessionMemory(summarize=summarize_history)
 
 def get_session_history(session_id: str):
-    if session_id not in chat_histories:
-        chat_histories[session_id] = InMemoryChatMessageHistory()
-    return chat_histories[session_id]
+    return session_memory.get(session_id)
+
+def remember_answer(question, answer, session_id=DEFAULT_SESSION_ID):
+    """
+    Records a turn answered without the model (e.g. from the semantic
+    cache), so follow-up questions still see it in the history.
+    """
+    session_memory.get(session_id).add_messages([
+        HumanMessage(content=question),
+        AIMessage(content=answer)
+    ])
 
 # ---------------- MEMORY-AWARE CHAIN ----------------
 chat_chain = RunnableWithMessageHistory(
@@ -60,18 +112,57 @@ chat_chain = RunnableWithMessageHistory(
 )
 
 # ---------------- FUNCTION ----------------
-def explain_answer(question, comparison_result, policy_docs):
-    clauses_text = "\n\n".join(
-        doc.page_content[:400] for doc in policy_docs
-    )
+def format_clauses(policy_docs):
+    """
+    policy_docs: list of documents, or {quote_id: documents} from
+    retrieve_policy_clauses_multi, rendered as one block per quote.
+    """
+    if not isinstance(policy_docs, dict):
+        return "\n\n".join(doc.page_content[:400] for doc in policy_docs)
 
+    blocks = []
+    for quote_id, docs in policy_docs.items():
+        if not docs:
+            blocks.append(f"[{quote_id}] No matching clauses found.")
+            continue
+        name = docs[0].metadata.get("policy_name")
+        header = f"[{quote_id}] {name}" if name else f"[{quote_id}]"
+        blocks.append("\n\n".join(
+            [header] + [doc.page_content[:400] for doc in docs]
+        ))
+    return "\n\n".join(blocks)
+
+def _chain_input(question, comparison_result, policy_docs):
+    clauses_text = format_clauses(policy_docs)
+    return {
+        "question": question,
+        "comparison_result": comparison_result,
+        "policy_clauses": clauses_text
+    }
+
+def explain_answer(question, comparison_result, policy_docs, session_id=DEFAULT_SESSION_ID):
     response = chat_chain.invoke(
-        {
-            "question": question,
-            "comparison_result": comparison_result,
-            "policy_clauses": clauses_text
-        },
-        config={"configurable": {"session_id": "insurance_chat"}}
+        _chain_input(question, comparison_result, policy_docs),
+        config={"configurable": {"session_id": session_id}}
     )
 
     return response.content
+
+def stream_answer(question, comparison_result, policy_docs, session_id=DEFAULT_SESSION_ID):
+    """
+    Same as explain_answer, but yields the answer text as it is generated.
+    Time to first token is recorded as the quote_bot.ttft metric.
+    """
+    started = time.monotonic()
+    first = True
+
+    for chunk in chat_chain.stream(
+        _chain_input(question, comparison_result, policy_docs),
+        config={"configurable": {"session_id": session_id}}
+    ):
+        if not chunk.content:
+            continue
+        if first:
+            metrics.observe("quote_bot.ttft", time.monotonic() - started)
+            first = False
+        yield chunk.content
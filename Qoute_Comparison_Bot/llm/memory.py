@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import (
+    SystemMessage, messages_from_dict, messages_to_dict
+)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+# -------- CONFIG --------
+# Recent turns kept verbatim; older turns are folded into a summary
+MEMORY_WINDOW_TOKENS = int(os.getenv("MEMORY_WINDOW_TOKENS", "1200"))
+# Sessions held in RAM, and how long an idle session lives
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "256"))
+MEMORY_SESSION_TTL = int(os.getenv("MEMORY_SESSION_TTL", str(60 * 60)))
+# Optional SQLite file; sessions survive restarts when set
+MEMORY_STORE_PATH = os.getenv("MEMORY_STORE_PATH", "")
+# How often expired sessions are deleted from the store
+MEMORY_PURGE_INTERVAL = int(os.getenv("MEMORY_PURGE_INTERVAL", "600"))
+# Set when several processes share the store (e.g. API workers): a session
+# is reloaded whenever another process has written it since
+MEMORY_SHARED_STORE = os.getenv("MEMORY_SHARED_STORE", "0") != "0"
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+logger = logging.getLogger(__name__)
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # ~4 characters per token for English text
+    return (len(text) + 3) // 4
+
+
+def _message_tokens(message):
+    return count_tokens(str(message.content)) + 4
+
+
+# Summaries are written off the request path, one at a time
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+
+# -------- WINDOWED HISTORY --------
+class WindowedChatHistory(BaseChatMessageHistory):
+    """
+    Chat history that keeps the most recent turns within a token window
+    and a rolling summary of everything older.
+
+    summarize(previous_summary, messages) -> new summary text
+    """
+
+    def __init__(self, session_id, summarize=None, max_tokens=MEMORY_WINDOW_TOKENS,
+                 summary="", messages=None, on_change=None, stored_at=0.0):
+        self.session_id = session_id
+        # Store timestamp of the version this history was loaded or saved as
+        self.stored_at = stored_at
+        self.summary = summary
+        self.max_tokens = max_tokens
+        self._summarize = summarize
+        self._on_change = on_change
+        self._recent = list(messages or [])
+        # Turns pushed out of the window but not yet summarized
+        self._pending = []
+        self._summarizing = False
+        self._lock = threading.RLock()
+
+    @property
+    def messages(self):
+        with self._lock:
+            prefix = [SystemMessage(content=SUMMARY_PREFIX + self.summary)] if self.summary else []
+            return prefix + self._pending + self._recent
+
+    def add_messages(self, messages):
+        with self._lock:
+            self._recent.extend(messages)
+            self._trim()
+        self._changed()
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self._recent = []
+            self._pending = []
+        self._changed()
+
+    def _trim(self):
+        used = sum(_message_tokens(m) for m in self._recent)
+        # Always keep the latest exchange, even if it alone exceeds the window
+        while used > self.max_tokens and len(self._recent) > 2:
+            message = self._recent.pop(0)
+            used -= _message_tokens(message)
+            self._pending.append(message)
+
+        if self._pending and not self._summarizing:
+            if self._summarize is None:
+                # No summarizer: the window is a plain sliding window
+                self._pending = []
+            else:
+                self._summarizing = True
+                _summary_executor.submit(self._fold_pending)
+
+    def _fold_pending(self):
+        with self._lock:
+            batch = list(self._pending)
+            previous = self.summary
+        try:
+            summary = self._summarize(previous, batch)
+        except Exception as e:
+            # Keep the turns verbatim and retry on the next trim
+            logger.warning("Memory summary failed (%s): %s", self.session_id, e)
+            with self._lock:
+                self._summarizing = False
+            return
+
+        with self._lock:
+            self.summary = summary
+            self._pending = self._pending[len(batch):]
+            self._summarizing = False
+            if self._pending:
+                self._summarizing = True
+                _summary_executor.submit(self._fold_pending)
+        self._changed()
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change(self)
+
+    def to_record(self):
+        with self._lock:
+            return {
+                "summary": self.summary,
+                # Unsummarized turns are saved verbatim so nothing is lost
+                "messages": messages_to_dict(self._pending + self._recent)
+            }
+
+
+# -------- ON-DISK STORE --------
+class SqliteSessionStore:
+    """
+    Persists session summaries and recent turns in SQLite.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "session_id TEXT PRIMARY KEY, summary TEXT, messages TEXT, updated REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self, session_id, ttl=None):
+        """
+        The saved session, or None; with ttl, also None once it has expired.
+        """
+        oldest = time.time() - ttl if ttl else 0.0
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT summary, messages, updated FROM chat_sessions "
+                "WHERE session_id = ? AND updated >= ?",
+                (session_id, oldest)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "summary": row[0],
+            "messages": messages_from_dict(json.loads(row[1])),
+            "updated": row[2]
+        }
+
+    def updated(self, session_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT updated FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id, record):
+        updated = time.time()
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions VALUES (?, ?, ?, ?)",
+                (session_id, record["summary"], json.dumps(record["messages"]), updated)
+            )
+        return updated
+
+    def delete(self, session_id):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+
+    def purge(self, ttl):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM chat_sessions WHERE updated < ?", (time.time() - ttl,))
+
+
+# -------- SESSION MANAGER --------
+class SessionMemory:
+    """
+    Per-session histories with LRU / idle-TTL eviction.
+
+    Evicted sessions are dropped from RAM; with a store configured they
+    are reloaded from disk until they have been idle for ttl there as
+    well (expired rows are purged every MEMORY_PURGE_INTERVAL seconds).
+    With shared, a session another process has saved since is reloaded
+    on get().
+    """
+
+    def __init__(self, summarize=None, max_sessions=MEMORY_MAX_SESSIONS,
+                 ttl=MEMORY_SESSION_TTL, store_path=MEMORY_STORE_PATH,
+                 max_tokens=MEMORY_WINDOW_TOKENS, shared=MEMORY_SHARED_STORE,
+                 purge_interval=MEMORY_PURGE_INTERVAL):
+        self.summarize = summarize
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self.store = SqliteSessionStore(store_path) if store_path else None
+        self.shared = shared and self.store is not None
+        self.purge_interval = purge_interval
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._purged = None
+        self.evictions = 0
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            self._purge(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None and self.shared and self._stale(entry[0]):
+                del self._sessions[session_id]
+                entry = None
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+                self._sessions[session_id] = (entry[0], now)
+                return entry[0]
+
+            saved = self.store.load(session_id, self.ttl) if self.store is not None else None
+            history = WindowedChatHistory(
+                session_id,
+                summarize=self.summarize,
+                max_tokens=self.max_tokens,
+                summary=(saved or {}).get("summary", ""),
+                messages=(saved or {}).get("messages"),
+                on_change=self._save if self.store is not None else None,
+                stored_at=(saved or {}).get("updated", 0.0)
+            )
+            self._sessions[session_id] = (history, now)
+            self._evict(now)
+            return history
+
+    def _evict(self, now):
+        for session_id, (_, last_used) in list(self._sessions.items()):
+            if now - last_used <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def _purge(self, now):
+        if self.store is None:
+            return
+        if self._purged is not None and now - self._purged < self.purge_interval:
+            return
+        self._purged = now
+        try:
+            self.store.purge(self.ttl)
+        except sqlite3.Error as e:
+            logger.warning("Memory store purge failed: %s", e)
+
+    def _stale(self, history):
+        updated = self.store.updated(history.session_id)
+        return updated is not None and updated > history.stored_at
+
+    def _save(self, history):
+        try:
+            history.stored_at = self.store.save(history.session_id, history.to_record())
+        except sqlite3.Error as e:
+            logger.warning("Memory store write failed (%s): %s", history.session_id, e)
+
+    def end(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        if self.store is not None:
+            self.store.delete(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "evictions": self.evictions}
@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from contextlib import closing
+
+import numpy as np
+
+# -------- CONFIG --------
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") != "0"
+# Cosine similarity at which a new question reuses a stored answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+# Optional SQLite file; answers survive restarts when set
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "")
+
+CacheHit = namedtuple("CacheHit", "answer question similarity seconds")
+
+# Questions that only make sense after earlier turns ("why?", "what about
+# it?", "is that covered?"); their answers depend on the conversation
+_FOLLOW_UP = re.compile(
+    r"^\W*(why|how come|and|so|what about|what else)\b"
+    r"|\b(it|its|that|this|these|those|they|them|their|above|previous|earlier|you said)\b",
+    re.IGNORECASE
+)
+
+
+def is_follow_up(question):
+    """
+    True for a question that refers back to earlier turns.
+    """
+    return bool(_FOLLOW_UP.search(question or ""))
+
+
+def clause_ids(policy_docs):
+    """
+    Stable IDs of the retrieved clauses (list, or {quote_id: documents}).
+    """
+    groups = policy_docs.items() if isinstance(policy_docs, dict) else [(None, policy_docs)]
+    return sorted(
+        f"{quote_id}:{doc.id or hashlib.sha256(doc.page_content.encode('utf-8')).hexdigest()}"
+        for quote_id, docs in groups
+        for doc in docs
+    )
+
+
+def context_key(quotes, user_profile, policy_docs, history=(), question=None):
+    """
+    Everything besides the question that the answer depends on. The
+    conversation so far (the session's messages) is part of it only for a
+    follow-up such as "why?" (or when no question is given), so a
+    standalone paraphrase still hits later in a session.
+    """
+    if question is not None and not is_follow_up(question):
+        history = ()
+    payload = json.dumps(
+        {
+            "quotes": quotes,
+            "profile": user_profile,
+            "clauses": clause_ids(policy_docs),
+            "history": [[message.type, message.content] for message in history]
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """
+    Answers keyed by question embedding within a context key: a question
+    whose cosine similarity to a stored one reaches the threshold, for the
+    same quotes, profile and clauses (and, for a follow-up, conversation
+    history), gets the stored answer.
+
+    embed_query(text) -> vector; the retriever's cached MiniLM embeddings,
+    so a question is embedded at most once for retrieval and lookup.
+    """
+
+    def __init__(self, embed_query, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES, path=SEMANTIC_CACHE_PATH,
+                 enabled=SEMANTIC_CACHE_ENABLED):
+        self.embed_query = embed_query
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.enabled and self.path:
+            self._load()
+
+    def _vector(self, question):
+        vector = np.asarray(self.embed_query(question), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    # ---------------- LOOKUP ----------------
+    def lookup(self, question, context):
+        """
+        CacheHit for the most similar stored question, or None.
+        """
+        if not self.enabled:
+            return None
+
+        vector = self._vector(question)
+        with self._lock:
+            best, best_similarity = None, self.threshold
+            for entry_id, entry in self._entries.items():
+                if entry["context"] != context:
+                    continue
+                similarity = float(vector @ entry["vector"])
+                if similarity >= best_similarity:
+                    best, best_similarity = entry_id, similarity
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best)
+            entry = self._entries[best]
+            self.hits += 1
+            self.saved_seconds += entry["seconds"]
+
+        self._touch(best)
+        return CacheHit(entry["answer"], entry["question"], best_similarity, entry["seconds"])
+
+    def store(self, question, context, answer, seconds):
+        """
+        seconds: how long the answer took to generate (saved on each hit).
+        """
+        if not self.enabled or not answer:
+            return
+
+        entry = {
+            "context": context,
+            "question": question,
+            "vector": self._vector(question),
+            "answer": answer,
+            "seconds": seconds
+        }
+        entry_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[entry_id] = entry
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+
+        self._save(entry_id, entry, evicted)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "entries": len(self._entries)
+            }
+
+    # ---------------- PERSISTENCE ----------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS semantic_cache ("
+            "id TEXT PRIMARY KEY, context TEXT, question TEXT, vector TEXT, "
+            "answer TEXT, seconds REAL, accessed REAL)"
+        )
+        return conn
+
+    def _load(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            rows = conn.execute(
+                "SELECT id, context, question, vector, answer, seconds "
+                "FROM semantic_cache ORDER BY accessed DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+        # Oldest first, so LRU order matches the last access times
+        for entry_id, context, question, vector, answer, seconds in reversed(rows):
+            self._entries[entry_id] = {
+                "context": context,
+                "question": question,
+                "vector": np.asarray(json.loads(vector), dtype=np.float32),
+                "answer": answer,
+                "seconds": seconds
+            }
+
+    def _save(self, entry_id, entry, evicted):
+        if not self.path:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO semantic_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry_id, entry["context"], entry["question"],
+                    json.dumps(entry["vector"].tolist()), entry["answer"],
+                    entry["seconds"], time.time()
+                )
+            )
+            conn.executemany(
+                "DELETE FROM semantic_cache WHERE id = ?", [(e,) for e in evicted]
+            )
+
+    def _touch(self, entry_id):
+        if not self.path:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE semantic_cache SET accessed = ? WHERE id = ?",
+                (time.time(), entry_id)
+            )
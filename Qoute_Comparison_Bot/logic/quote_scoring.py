@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+# ---------------- WEIGHT PROFILES ----------------
+# "balanced" reproduces the original compare_quotes scoring exactly:
+#   coverage   = sum_insured / 100000          (families of 4 or more only)
+#   deductible = max(0, (20000 - deductible) / 1000)
+#   premium    = max(0, (30000 - annual_premium) / 1000)
+WEIGHT_PROFILES = {
+    "balanced": {
+        "family_size_threshold": 4,
+        "sum_insured_scale": 100000,
+        "deductible_pivot": 20000,
+        "deductible_scale": 1000,
+        "premium_pivot": 30000,
+        "premium_scale": 1000,
+        "coverage_weight": 1.0,
+        "deductible_weight": 1.0,
+        "premium_weight": 1.0
+    },
+    "budget": {
+        "family_size_threshold": 4,
+        "sum_insured_scale": 100000,
+        "deductible_pivot": 20000,
+        "deductible_scale": 1000,
+        "premium_pivot": 30000,
+        "premium_scale": 1000,
+        "coverage_weight": 0.5,
+        "deductible_weight": 1.0,
+        "premium_weight": 2.0
+    },
+    "coverage": {
+        "family_size_threshold": 1,
+        "sum_insured_scale": 100000,
+        "deductible_pivot": 20000,
+        "deductible_scale": 1000,
+        "premium_pivot": 30000,
+        "premium_scale": 1000,
+        "coverage_weight": 2.0,
+        "deductible_weight": 1.0,
+        "premium_weight": 0.5
+    }
+}
+
+DEFAULT_PROFILE = "balanced"
+QUOTE_COLUMNS = ["quote_id", "annual_premium", "sum_insured", "deductible"]
+
+
+def _frame(data, columns=None):
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, dict):
+        data = [data]
+    return pd.DataFrame(list(data), columns=columns)
+
+
+def _weight_arrays(profiles, weights):
+    """
+    One column vector (P, 1) per weight parameter.
+
+    Per-profile weights come from a "weight_profile" column naming an
+    entry in WEIGHT_PROFILES; otherwise `weights` (a name or a dict)
+    applies to every profile.
+    """
+    if weights is None and "weight_profile" in profiles.columns:
+        names = profiles["weight_profile"].fillna(DEFAULT_PROFILE)
+        table = pd.DataFrame(WEIGHT_PROFILES).T.loc[names.to_numpy()]
+        return {
+            key: table[key].to_numpy(dtype=np.float64)[:, None]
+            for key in table.columns
+        }
+
+    if weights is None or isinstance(weights, str):
+        weights = WEIGHT_PROFILES[weights or DEFAULT_PROFILE]
+    base = dict(WEIGHT_PROFILES[DEFAULT_PROFILE], **weights)
+    return {
+        key: np.full((len(profiles), 1), value, dtype=np.float64)
+        for key, value in base.items()
+    }
+
+
+def score_matrix(quotes, profiles, weights=None):
+    """
+    Scores every quote for every profile in one vectorized pass.
+
+    quotes:   DataFrame / records with annual_premium, sum_insured, deductible
+    profiles: DataFrame / records with family_size
+    Returns an array of shape (len(profiles), len(quotes)).
+    """
+    quotes = _frame(quotes)
+    profiles = _frame(profiles)
+    w = _weight_arrays(profiles, weights)
+
+    premium = quotes["annual_premium"].to_numpy(dtype=np.float64)[None, :]
+    sum_insured = quotes["sum_insured"].to_numpy(dtype=np.float64)[None, :]
+    deductible = quotes["deductible"].to_numpy(dtype=np.float64)[None, :]
+    family_size = profiles["family_size"].to_numpy(dtype=np.float64)[:, None]
+
+    eligible = family_size >= w["family_size_threshold"]
+    coverage = np.where(
+        eligible, sum_insured / w["sum_insured_scale"] * w["coverage_weight"], 0.0
+    )
+    deductible_score = np.maximum(
+        0.0, (w["deductible_pivot"] - deductible) / w["deductible_scale"]
+    ) * w["deductible_weight"]
+    premium_score = np.maximum(
+        0.0, (w["premium_pivot"] - premium) / w["premium_scale"]
+    ) * w["premium_weight"]
+
+    return coverage + deductible_score + premium_score
+
+
+def top_k(quotes, profiles, k=3, weights=None):
+    """
+    Best k quotes per profile as a long DataFrame
+    (profile, rank, quote_id, score). Ties keep quote order.
+    """
+    quotes = _frame(quotes)
+    profiles = _frame(profiles)
+    scores = score_matrix(quotes, profiles, weights)
+    k = min(k, scores.shape[1])
+
+    if k < scores.shape[1]:
+        # Partition first so large quote books avoid a full sort
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidates.sort(axis=1)
+    else:
+        candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    best = np.take_along_axis(candidates, order, axis=1)
+    best_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+    profile_ids = (
+        profiles["profile_id"].to_numpy()
+        if "profile_id" in profiles.columns
+        else np.arange(len(profiles))
+    )
+    quote_ids = quotes["quote_id"].to_numpy()
+
+    return pd.DataFrame({
+        "profile": np.repeat(profile_ids, k),
+        "rank": np.tile(np.arange(1, k + 1), len(profiles)),
+        "quote_id": quote_ids[best.ravel()],
+        "score": best_scores.ravel()
+    })
+
+
+def rank_quotes(quotes, user_profile, weights=None):
+    """
+    Single-profile ranking in the compare_quotes result format.
+    """
+    quotes = _frame(quotes, QUOTE_COLUMNS)
+    raw = score_matrix(quotes, [user_profile], weights)[0]
+
+    # Python's round() keeps results identical to the original loop
+    scores = {
+        quote_id: round(float(score), 2)
+        for quote_id, score in zip(quotes["quote_id"], raw)
+    }
+    best_quote = max(scores, key=scores.get)
+
+    return {
+        "best_quote": best_quote,
+        "scores": scores
+    }
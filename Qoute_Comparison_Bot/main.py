@@ -1,6 +1,9 @@
-from rag.retriever_chroma import retrieve_policy_clauses
+from rag.retriever_chroma import retrieve_policy_clauses, warm_up
 
 def main():
+    # Load the embedding model while the user types the first question
+    warm_up(background=True)
+
     print("======================================")
     print(" Insurance Policy RAG Query Interface ")
     print("======================================\n")
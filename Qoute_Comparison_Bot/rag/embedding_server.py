@@ -0,0 +1,60 @@
+import os
+import sys
+import argparse
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.embeddings import EMBEDDINGS_AUTHKEY, check_connection, load_local_embeddings
+
+
+def handle(conn, embeddings):
+    with conn:
+        while True:
+            try:
+                method, payload = conn.recv()
+            except EOFError:
+                return
+
+            try:
+                if method == "embed_documents":
+                    result = embeddings.embed_documents(payload)
+                elif method == "embed_query":
+                    result = embeddings.embed_query(payload)
+                elif method == "ping":
+                    result = "pong"
+                else:
+                    raise ValueError(f"unknown method {method!r}")
+                conn.send(("ok", result))
+            except Exception as e:
+                conn.send(("error", str(e)))
+
+
+def serve(host, port, authkey=EMBEDDINGS_AUTHKEY):
+    check_connection(host, authkey)
+    embeddings = load_local_embeddings()
+    # Load the weights before accepting clients
+    embeddings.embed_query("warm up")
+
+    with Listener((host, port), authkey=authkey) as listener:
+        print(f"Embedding server listening on {host}:{port}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError) as e:
+                # A client with the wrong key must not stop the worker
+                print(f"Rejected embedding client: {e!r}")
+                continue
+            threading.Thread(
+                target=handle, args=(conn, embeddings), daemon=True
+            ).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared MiniLM embedding worker")
+    parser.add_argument("--host", default="127.0.0.1", help="Loopback address only")
+    parser.add_argument("--port", type=int, default=6100)
+    args = parser.parse_args()
+    serve(args.host, args.port)
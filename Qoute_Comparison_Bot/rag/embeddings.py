@@ -0,0 +1,106 @@
+import os
+import ipaddress
+import threading
+from multiprocessing.connection import Client
+
+from langchain_core.embeddings import Embeddings
+
+# -------- CONFIG --------
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# "torch" (sentence-transformers) or "onnx" (int8 export, see rag/embeddings_onnx.py)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+# host:port of a shared embedding worker (rag/embedding_server.py)
+EMBEDDINGS_SERVER = os.getenv("EMBEDDINGS_SERVER")
+# Shared secret for the worker connection; there is no default, since the
+# connection unpickles what it receives
+EMBEDDINGS_AUTHKEY = os.getenv("EMBEDDINGS_SERVER_AUTHKEY", "").encode()
+
+
+def load_local_embeddings(backend=EMBEDDING_BACKEND):
+    if backend == "onnx":
+        from rag.embeddings_onnx import OnnxEmbeddings
+
+        return OnnxEmbeddings()
+    if backend != "torch":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r} (torch or onnx)")
+
+    # Imported here: pulling in torch is the slow part of startup
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def check_connection(host, authkey):
+    """
+    The worker protocol (multiprocessing.connection) unpickles its messages,
+    so it is only used with a secret key and on this machine.
+    """
+    if not authkey:
+        raise RuntimeError(
+            "EMBEDDINGS_SERVER_AUTHKEY must be set to use the shared embedding worker"
+        )
+    if not is_loopback(host):
+        raise ValueError(
+            f"Embedding worker host {host!r} is not a loopback address; "
+            "the worker only serves clients on the same machine"
+        )
+
+
+class RemoteEmbeddings(Embeddings):
+    """
+    Embeddings served by a long-lived local worker process, so several bot
+    processes share one copy of the model.
+    """
+
+    def __init__(self, address=EMBEDDINGS_SERVER, authkey=EMBEDDINGS_AUTHKEY):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        check_connection(self.address[0], authkey)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _call(self, method, payload):
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._conn is None:
+                        self._conn = Client(self.address, authkey=self.authkey)
+                    self._conn.send((method, payload))
+                    status, result = self._conn.recv()
+                    break
+                except (EOFError, OSError):
+                    # Worker restarted: reconnect once
+                    self._conn = None
+                    if attempt:
+                        raise
+        if status != "ok":
+            raise RuntimeError(f"Embedding server error: {result}")
+        return result
+
+    def embed_documents(self, texts):
+        return self._call("embed_documents", list(texts))
+
+    def embed_query(self, text):
+        return self._call("embed_query", text)
+
+
+def create_embeddings():
+    if EMBEDDINGS_SERVER:
+        return RemoteEmbeddings(EMBEDDINGS_SERVER)
+    return load_local_embeddings()
@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# -------- CONFIG --------
+# Output of rag/export_onnx_embeddings.py (model + tokenizer.json)
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "models/all-MiniLM-L6-v2-int8")
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", str(min(4, os.cpu_count() or 1))))
+ONNX_BATCH_SIZE = int(os.getenv("ONNX_BATCH_SIZE", "32"))
+# all-MiniLM-L6-v2's max_seq_length in sentence-transformers
+ONNX_MAX_LENGTH = int(os.getenv("ONNX_MAX_LENGTH", "256"))
+
+# Preferred first: the int8 model written by the export script
+MODEL_FILES = ("model_quantized.onnx", "model.onnx")
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    all-MiniLM-L6-v2 on onnxruntime (CPU) with the sentence-transformers
+    head: mean pooling over the attention mask, then L2 normalization.
+
+    Texts are sorted by length and batched, so each batch is padded
+    only to its own longest text.
+    """
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, threads=ONNX_THREADS,
+                 batch_size=ONNX_BATCH_SIZE, max_length=ONNX_MAX_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = next(
+            (os.path.join(model_dir, f) for f in MODEL_FILES
+             if os.path.exists(os.path.join(model_dir, f))),
+            None
+        )
+        if model_path is None:
+            raise FileNotFoundError(
+                f"No ONNX model in {model_dir}; run rag/export_onnx_embeddings.py"
+            )
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding(
+            pad_id=self.tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]"
+        )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_array(self, texts):
+        """
+        (len(texts), dim) float32 array, in input order.
+        """
+        texts = [t.replace("\n", " ") for t in texts]
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._embed_batch([texts[i] for i in batch])):
+                vectors[i] = vector
+        return np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.embeddings import EMBEDDING_MODEL
+from rag.embeddings_onnx import ONNX_MODEL_DIR
+
+# Dynamic int8 quantization targets per CPU instruction set
+ARCHITECTURES = ["avx2", "avx512", "avx512_vnni", "arm64"]
+
+
+def export(output_dir=ONNX_MODEL_DIR, model_name=EMBEDDING_MODEL, arch="avx2"):
+    """
+    Exports the embedding model to ONNX and writes a dynamically
+    quantized (int8 weights) copy plus tokenizer.json to output_dir.
+    Needs optimum[onnxruntime]; only the export machine needs it.
+    """
+    from transformers import AutoTokenizer
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    started = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as fp32_dir:
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(fp32_dir)
+
+        config = getattr(AutoQuantizationConfig, arch)(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(fp32_dir).quantize(
+            save_dir=output_dir, quantization_config=config
+        )
+        # Kept next to the int8 model for parity checks
+        shutil.copy(
+            os.path.join(fp32_dir, "model.onnx"),
+            os.path.join(output_dir, "model.onnx")
+        )
+
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+    print(f"Exported {model_name} to {output_dir} ({arch}, {time.time() - started:.1f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export MiniLM to a quantized ONNX model")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--arch", choices=ARCHITECTURES, default="avx2",
+                        help="Instruction set the quantized kernels target")
+    args = parser.parse_args(argv)
+    export(args.output, args.model, args.arch)
+
+
+if __name__ == "__main__":
+    main()
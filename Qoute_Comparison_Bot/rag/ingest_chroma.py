@@ -1,47 +1,285 @@
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
+import os
+import sys
+import csv
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.retriever_chroma import (
+    CHROMA_DB_DIR, COLLECTION_NAME, VERSION_FILE, LEXICAL_INDEX_FILE
+)
+from rag.lexical_index import LexicalIndex
 
 # -------- CONFIG --------
 PDF_PATH = "data/Oriental_Mediclaim_Policy.pdf"
-CHROMA_DB_DIR = "chroma_db/oriental_mediclaim"
-COLLECTION_NAME = "oriental_policy"
 QUOTE_ID = "Q1"
+POLICY_NAME = "Oriental Mediclaim Individual"
 
-# -------- LOAD PDF --------
-loader = PyPDFLoader(PDF_PATH)
-documents = loader.load()
-
-# -------- ADD METADATA --------
-for doc in documents:
-    doc.metadata.update({
-        "quote_id": QUOTE_ID,
-        "policy_name": "Oriental Mediclaim Individual",
-        "source": "Oriental_Mediclaim_Policy.pdf"
-    })
-
-# -------- CHUNKING --------
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=500,
-    chunk_overlap=100,
-    separators=["\n\n", "\n", ".", " "]
-)
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
 
-chunks = text_splitter.split_documents(documents)
-print(f"Chunks created: {len(chunks)}")
 
-# -------- EMBEDDINGS (MiniLM) --------
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+# -------- POLICY SOURCES --------
+def load_manifest(path):
+    """
+    JSON list or CSV with path, quote_id and optional policy_name.
+    Relative paths are resolved against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            entries = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+
+    policies = []
+    for entry in entries:
+        pdf = os.path.join(base, entry["path"])
+        policies.append({
+            "path": pdf,
+            "quote_id": entry["quote_id"],
+            "policy_name": entry.get("policy_name") or _stem(pdf)
+        })
+    return policies
+
+
+def scan_directory(directory):
+    """
+    Every PDF in the directory; the file name (without .pdf) is the quote ID.
+    """
+    return [
+        {
+            "path": os.path.join(directory, name),
+            "quote_id": _stem(name),
+            "policy_name": _stem(name)
+        }
+        for name in sorted(os.listdir(directory))
+        if name.lower().endswith(".pdf")
+    ]
+
+
+def _stem(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(quote_id, text):
+    return hashlib.sha256(f"{quote_id}\0{text}".encode("utf-8")).hexdigest()
+
+
+# -------- PARSING (runs in worker processes) --------
+def load_and_split(policy):
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    documents = PyPDFLoader(policy["path"]).load()
+    for doc in documents:
+        doc.metadata.update({
+            "quote_id": policy["quote_id"],
+            "policy_name": policy["policy_name"],
+            "source": os.path.basename(policy["path"]),
+            "source_path": os.path.abspath(policy["path"]),
+            "source_sha256": policy["sha256"]
+        })
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ".", " "]
+    )
+
+    chunks = {}
+    for chunk in text_splitter.split_documents(documents):
+        # Identical chunks within a policy collapse onto one ID
+        cid = chunk_id(policy["quote_id"], chunk.page_content)
+        chunks.setdefault(cid, (chunk.page_content, chunk.metadata))
+    return chunks
+
+
+# -------- INGESTION --------
+def open_vectorstore():
+    from langchain_chroma import Chroma
+    from rag.embeddings import create_embeddings
+
+    return Chroma(
+        persist_directory=CHROMA_DB_DIR,
+        embedding_function=create_embeddings(),
+        collection_name=COLLECTION_NAME
+    )
+
+
+def existing_chunks(vectorstore, policy):
+    """
+    Stored chunks of this (file, quote ID) pair only, so a PDF mapped to
+    several quotes, or another file with the same name, is left alone.
+    Chunks ingested before source_path was recorded match on file name.
+    """
+    path = os.path.abspath(policy["path"])
+    found = vectorstore.get(
+        where={"$and": [
+            {"source": os.path.basename(path)},
+            {"quote_id": policy["quote_id"]}
+        ]},
+        include=["metadatas"]
+    )
+    return {
+        cid: metadata
+        for cid, metadata in zip(found["ids"], found["metadatas"])
+        if metadata.get("source_path", path) == path
+    }
+
+
+def update_metadata(vectorstore, ids, metadatas, batch_size=EMBED_BATCH_SIZE):
+    """
+    Rewrites the metadata of stored chunks without re-embedding them.
+    """
+    for i in range(0, len(ids), batch_size):
+        vectorstore._collection.update(
+            ids=ids[i:i + batch_size], metadatas=metadatas[i:i + batch_size]
+        )
+
+
+def policy_key(policy):
+    return os.path.abspath(policy["path"]), policy["quote_id"]
+
+
+def build_lexical_index(vectorstore):
+    """
+    Rebuilds the BM25 index from the whole collection, so it always holds
+    exactly the chunks Chroma holds.
+    """
+    started = time.time()
+    index = LexicalIndex.from_vectorstore(vectorstore)
+    index.save(os.path.join(CHROMA_DB_DIR, LEXICAL_INDEX_FILE))
+    print(f"BM25 index: {len(index)} chunks ({time.time() - started:.1f}s)")
+
+
+def mark_collection_changed():
+    # Retrievers compare this file's mtime to drop cached results
+    with open(os.path.join(CHROMA_DB_DIR, VERSION_FILE), "w") as f:
+        f.write(str(time.time()))
+
+
+def ingest(policies, batch_size=EMBED_BATCH_SIZE, workers=None):
+    started = time.time()
+    vectorstore = open_vectorstore()
+
+    # ---- Skip policies whose PDF is unchanged since the last run ----
+    changed, current = [], {}
+    for policy in policies:
+        policy["sha256"] = file_sha256(policy["path"])
+        source = os.path.basename(policy["path"])
+        current[policy_key(policy)] = existing_chunks(vectorstore, policy)
+
+        stored = current[policy_key(policy)].values()
+        if stored and all(
+            m.get("source_sha256") == policy["sha256"]
+            and m.get("quote_id") == policy["quote_id"]
+            for m in stored
+        ):
+            print(f"Unchanged: {source} ({policy['quote_id']})")
+            continue
+        changed.append(policy)
+
+    if not changed:
+        # Collections ingested before the BM25 index existed
+        if not os.path.exists(os.path.join(CHROMA_DB_DIR, LEXICAL_INDEX_FILE)):
+            build_lexical_index(vectorstore)
+            mark_collection_changed()
+        print(f"Nothing to ingest ({time.time() - started:.1f}s).")
+        return
+
+    # ---- Parse changed PDFs in parallel ----
+    if len(changed) == 1 or workers == 1:
+        parsed = [load_and_split(p) for p in changed]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(load_and_split, changed))
+
+    added = deleted = skipped = 0
+    for policy, chunks in zip(changed, parsed):
+        source = os.path.basename(policy["path"])
+        stored = current[policy_key(policy)]
+
+        # ---- Drop chunks from the previous version of this PDF ----
+        stale = [cid for cid in stored if cid not in chunks]
+        if stale:
+            vectorstore.delete(ids=stale)
+            deleted += len(stale)
+
+        new_ids = [cid for cid in chunks if cid not in stored]
+        skipped += len(chunks) - len(new_ids)
+
+        # Retained chunks take the new file hash (and page numbers), so the
+        # next run sees this version as unchanged
+        retained = [
+            cid for cid in chunks
+            if cid in stored and stored[cid] != chunks[cid][1]
+        ]
+        if retained:
+            update_metadata(
+                vectorstore, retained, [chunks[cid][1] for cid in retained], batch_size
+            )
+
+        # ---- Embed in batches ----
+        for i in range(0, len(new_ids), batch_size):
+            batch = new_ids[i:i + batch_size]
+            vectorstore.add_texts(
+                texts=[chunks[cid][0] for cid in batch],
+                metadatas=[chunks[cid][1] for cid in batch],
+                ids=batch
+            )
+            added += len(batch)
+
+        print(f"Ingested: {source} ({policy['quote_id']}) - {len(chunks)} chunks")
+
+    # -------- LEXICAL INDEX + INVALIDATE RETRIEVAL CACHES --------
+    build_lexical_index(vectorstore)
+    mark_collection_changed()
+
+    print(
+        f"Chunks added: {added}, already present: {skipped}, "
+        f"stale removed: {deleted} ({time.time() - started:.1f}s)"
+    )
+    print("ChromaDB ingestion completed successfully.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest policy PDFs into ChromaDB")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--source", help="Directory of policy PDFs (file name = quote ID)")
+    group.add_argument("--manifest", help="JSON/CSV manifest of path, quote_id, policy_name")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="PDF parsing processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        policies = load_manifest(args.manifest)
+    elif args.source:
+        policies = scan_directory(args.source)
+    else:
+        policies = [{
+            "path": PDF_PATH,
+            "quote_id": QUOTE_ID,
+            "policy_name": POLICY_NAME
+        }]
+
+    ingest(policies, batch_size=args.batch_size, workers=args.workers)
 
-# -------- CHROMA VECTOR STORE --------
-vectorstore = Chroma.from_documents(
-    documents=chunks,
-    embedding=embeddings,
-    persist_directory=CHROMA_DB_DIR,
-    collection_name=COLLECTION_NAME
-)
 
-print("ChromaDB ingestion completed successfully.")
+if __name__ == "__main__":
+    main()
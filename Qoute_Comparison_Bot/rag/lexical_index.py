@@ -0,0 +1,133 @@
+import os
+import re
+import sys
+
+from langchain_core.documents import Document
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from common.bm25 import BM25Index, tokenize, save_index, load_index
+
+# -------- CONFIG --------
+# Short keyword queries (after stopwords) that count as a term lookup
+LEXICAL_MAX_TERMS = int(os.getenv("LEXICAL_MAX_TERMS", "3"))
+
+# "Section 4.1", "clause 3", "Excl03", "4.1.2" ...
+CLAUSE_REF = re.compile(
+    r"\b(?:section|clause|exclusion|excl|article|schedule|annexure|condition|code)"
+    r"\s*[-.:#]?\s*\d+(?:\.\d+)*\b"
+    r"|\b\d+\.\d+\.\d+(?:\.\d+)*\b",
+    re.IGNORECASE
+)
+# "4.1" on its own; in a question it is more likely an amount ("5.5 lakh")
+BARE_CLAUSE_NUMBER = re.compile(r"(?<![\d.])\d+\.\d+(?!\.?\d)")
+QUOTED = re.compile(r"[\"“]([^\"”]{3,})[\"”]")
+QUESTION = re.compile(
+    r"^\s*(?:what|which|how|why|when|who|whom|where|is|are|can|could|does|do|"
+    r"should|would|will|explain|compare|tell)\b|\?",
+    re.IGNORECASE
+)
+
+
+def clause_numbers(query):
+    """
+    Clause numbers the query refers to, e.g. ["4.1"] for "Section 4.1".
+    """
+    refs = CLAUSE_REF.findall(query)
+    if not QUESTION.search(query):
+        refs += BARE_CLAUSE_NUMBER.findall(query)
+    numbers = [number for ref in refs for number in re.findall(r"\d+(?:\.\d+)*", ref)]
+    return list(dict.fromkeys(numbers))
+
+
+class LexicalIndex:
+    """
+    BM25 over every chunk of the Chroma collection, persisted next to it
+    by rag/ingest_chroma.py so it can be queried without the embedder.
+    """
+
+    def __init__(self, ids, texts, metadatas, bm25=None):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.bm25 = bm25 or BM25Index([tokenize(text) for text in texts])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        found = vectorstore.get(include=["documents", "metadatas"])
+        return cls(found["ids"], found["documents"], found["metadatas"])
+
+    def save(self, path):
+        save_index(
+            path, self.bm25,
+            ids=self.ids, texts=self.texts, metadatas=self.metadatas
+        )
+
+    @classmethod
+    def load(cls, path):
+        bm25, data = load_index(path)
+        return cls(data["ids"], data["texts"], data["metadatas"], bm25)
+
+    def is_lookup(self, query):
+        """
+        True for clause references, quoted terms and short keyword queries
+        whose terms all occur in the policies, e.g. "pre-existing disease".
+        """
+        if clause_numbers(query) or QUOTED.search(query):
+            return True
+        if QUESTION.search(query):
+            return False
+        tokens = tokenize(query)
+        return 0 < len(tokens) <= LEXICAL_MAX_TERMS and all(
+            token in self.bm25.idf for token in tokens
+        )
+
+    def search(self, query, quote_id=None, k=4):
+        scores = self.bm25.scores(tokenize(query))
+        if quote_id is not None:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if (self.metadatas[doc_id] or {}).get("quote_id") == quote_id
+            }
+
+        # A chunk that opens with the clause ("4.1 Pre-existing Diseases")
+        # ranks above chunks that only cross-reference it
+        headings = [
+            re.compile(rf"(?m)^\s*{re.escape(number)}(?!\.?\d)")
+            for number in clause_numbers(query)
+        ]
+
+        def rank(item):
+            doc_id, score = item
+            heading = any(h.search(self.texts[doc_id]) for h in headings)
+            return (not heading, -score, doc_id)
+
+        ranked = sorted(scores.items(), key=rank)[:k]
+        return [
+            Document(
+                id=self.ids[doc_id],
+                page_content=self.texts[doc_id],
+                metadata=self.metadatas[doc_id] or {}
+            )
+            for doc_id, _ in ranked
+        ]
+
+
+def reciprocal_rank_fusion(rankings, k=4, rrf_k=60):
+    """
+    Merges ranked Document lists; a chunk scores sum(1 / (rrf_k + rank)).
+    """
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            # Chunk text is unique within a quote (see ingest_chroma.chunk_id)
+            key = (doc.metadata.get("quote_id"), doc.page_content)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    ranked = sorted(scores, key=lambda key: -scores[key])[:k]
+    return [docs[key] for key in ranked]
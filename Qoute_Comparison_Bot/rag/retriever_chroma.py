@@ -1,26 +1,297 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
 
-CHROMA_DB_DIR = "chroma_db/oriental_mediclaim"
+from langchain_core.embeddings import Embeddings
+
+from rag.embeddings import create_embeddings
+from rag.lexical_index import LexicalIndex, reciprocal_rank_fusion
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from common import tracing
+
+CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "chroma_db/oriental_mediclaim")
 COLLECTION_NAME = "oriental_policy"
 
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+# Touched by rag/ingest_chroma.py after every ingestion run
+VERSION_FILE = "collection_version"
+# BM25 index over the same chunks, rebuilt by rag/ingest_chroma.py
+LEXICAL_INDEX_FILE = "bm25_index.json"
 
-vectorstore = Chroma(
-    persist_directory=CHROMA_DB_DIR,
-    embedding_function=embeddings,
-    collection_name=COLLECTION_NAME
-)
+# Candidates taken from each retriever before reciprocal-rank fusion
+FUSION_CANDIDATES = int(os.getenv("RETRIEVAL_FUSION_CANDIDATES", "10"))
+# Multi-quote search fetches this many times each quote's share up front
+MULTI_QUOTE_OVERFETCH = int(os.getenv("MULTI_QUOTE_OVERFETCH", "2"))
 
-def retrieve_policy_clauses(query, quote_id="Q1", k=4):
-    retriever = vectorstore.as_retriever(
-        search_kwargs={
-            "k": k,
-            "filter": {"quote_id": quote_id}
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+RESULT_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))
+
+_embeddings = None
+_vectorstore = None
+_lock = threading.Lock()
+
+
+def normalize_query(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._data)
         }
-    )
 
-    # ✅ CORRECT METHOD IN LANGCHAIN 0.2+
-    return retriever.invoke(query)
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Memoizes query embeddings by normalized query text.
+    """
+
+    def __init__(self, embeddings, maxsize=QUERY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.cache = LRUCache(maxsize)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+
+_query_embeddings = None
+_vector_searches = 0
+_results = LRUCache(RESULT_CACHE_SIZE)
+_results_version = None
+_invalidations = 0
+_lexical = None
+_lexical_loaded = False
+_routes = {"lexical": 0, "hybrid": 0, "dense": 0}
+
+
+def get_embeddings():
+    global _embeddings, _query_embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _query_embeddings = CachedQueryEmbeddings(create_embeddings())
+                _embeddings = _query_embeddings
+    return _embeddings
+
+
+def get_vectorstore():
+    global _vectorstore
+    if _vectorstore is None:
+        embeddings = get_embeddings()
+        with _lock:
+            if _vectorstore is None:
+                from langchain_chroma import Chroma
+
+                _vectorstore = Chroma(
+                    persist_directory=CHROMA_DB_DIR,
+                    embedding_function=embeddings,
+                    collection_name=COLLECTION_NAME
+                )
+    return _vectorstore
+
+
+def warm_up(background=True):
+    """
+    Loads the embedding model and opens the vector store ahead of the
+    first query, optionally on a background thread.
+    """
+    def load():
+        get_vectorstore()
+        get_embeddings().embeddings.embed_query("warm up")
+
+    if not background:
+        load()
+        return None
+
+    thread = threading.Thread(target=load, name="rag-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def collection_version():
+    """
+    Cheap change signature of the persisted collection (file mtimes).
+    """
+    version = []
+    for name in (VERSION_FILE, "chroma.sqlite3", "chroma.sqlite3-wal"):
+        try:
+            version.append(os.stat(os.path.join(CHROMA_DB_DIR, name)).st_mtime_ns)
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def _check_version():
+    global _results_version, _invalidations, _lexical_loaded
+    version = collection_version()
+    if version != _results_version:
+        if _results_version is not None:
+            _invalidations += 1
+        _results.clear()
+        _lexical_loaded = False
+        _results_version = version
+
+
+def get_lexical_index():
+    """
+    The persisted BM25 index, or None until ingest_chroma.py has built one.
+    Reloaded after every ingestion run.
+    """
+    global _lexical, _lexical_loaded
+    if not _lexical_loaded:
+        with _lock:
+            if not _lexical_loaded:
+                path = os.path.join(CHROMA_DB_DIR, LEXICAL_INDEX_FILE)
+                _lexical = LexicalIndex.load(path) if os.path.exists(path) else None
+                _lexical_loaded = True
+    return _lexical
+
+
+def _dense_search(vector, quote_ids, per_quote):
+    """
+    One vector search over all quotes, grouped by quote_id. A quote crowded
+    out of the shared result list gets its own search with the same vector.
+    """
+    global _vector_searches
+    store = get_vectorstore()
+    if len(quote_ids) == 1:
+        where, fetch = {"quote_id": quote_ids[0]}, per_quote
+    else:
+        where = {"quote_id": {"$in": list(quote_ids)}}
+        fetch = per_quote * len(quote_ids) * MULTI_QUOTE_OVERFETCH
+
+    docs = store.similarity_search_by_vector(vector, k=fetch, filter=where)
+    _vector_searches += 1
+
+    grouped = {quote_id: [] for quote_id in quote_ids}
+    for doc in docs:
+        group = grouped.get(doc.metadata.get("quote_id"))
+        if group is not None and len(group) < per_quote:
+            group.append(doc)
+
+    # Fewer hits than requested means the collection has nothing more
+    if len(docs) == fetch:
+        for quote_id, group in grouped.items():
+            if len(group) < per_quote:
+                grouped[quote_id] = store.similarity_search_by_vector(
+                    vector, k=per_quote, filter={"quote_id": quote_id}
+                )
+                _vector_searches += 1
+    return grouped
+
+
+def _retrieve(query, quote_ids, k):
+    _check_version()
+    normalized = normalize_query(query)
+
+    results, missing = {}, []
+    for quote_id in quote_ids:
+        docs = _results.get((normalized, quote_id, k))
+        if docs is not None:
+            tracing.record(cache_hits=1)
+            results[quote_id] = docs
+        else:
+            missing.append(quote_id)
+
+    routes = {}
+    lexical = get_lexical_index()
+    if missing and lexical is not None and lexical.is_lookup(query):
+        # Clause numbers and defined terms: BM25 alone, no query embedding
+        for quote_id in missing:
+            docs = lexical.search(query, quote_id, k)
+            if docs:
+                results[quote_id], routes[quote_id] = docs, "lexical"
+
+    dense_ids = [quote_id for quote_id in missing if quote_id not in results]
+    if dense_ids:
+        candidates = max(k, FUSION_CANDIDATES) if lexical is not None else k
+        # Embedded once (and memoized) for every quote
+        vector = get_embeddings().embed_query(query)
+        grouped = _dense_search(vector, dense_ids, candidates)
+        for quote_id in dense_ids:
+            if lexical is None:
+                results[quote_id], routes[quote_id] = grouped[quote_id][:k], "dense"
+            else:
+                results[quote_id] = reciprocal_rank_fusion(
+                    [grouped[quote_id], lexical.search(query, quote_id, candidates)], k
+                )
+                routes[quote_id] = "hybrid"
+
+    for quote_id, route in routes.items():
+        _routes[route] += 1
+        _results.put((normalized, quote_id, k), results[quote_id])
+    if routes:
+        tracing.record(route=",".join(sorted(set(routes.values()))))
+
+    return {quote_id: list(results[quote_id]) for quote_id in quote_ids}
+
+
+@tracing.traced("retrieval")
+def retrieve_policy_clauses(query, quote_id="Q1", k=4):
+    return _retrieve(query, [quote_id], k)[quote_id]
+
+
+@tracing.traced("retrieval")
+def retrieve_policy_clauses_multi(query, quote_ids, k=4):
+    """
+    {quote_id: top-k clauses} for every quote in a comparison, from one
+    query embedding and one vector search.
+    """
+    return _retrieve(query, list(dict.fromkeys(quote_ids)), k)
+
+
+def cache_stats():
+    return {
+        "query_embeddings": (
+            _query_embeddings.cache.stats() if _query_embeddings else None
+        ),
+        "results": _results.stats(),
+        "invalidations": _invalidations,
+        "vector_searches": _vector_searches,
+        "routes": dict(_routes)
+    }
@@ -0,0 +1,128 @@
+"""
+Client for api/server.py. The Streamlit apps use it instead of running the
+pipelines in-process when INSURANCE_API_URL is set.
+"""
+import os
+import threading
+
+import httpx
+
+API_URL = os.getenv("INSURANCE_API_URL", "").rstrip("/")
+# Claim explanations run three model calls, so allow for slow deployments
+API_TIMEOUT = float(os.getenv("INSURANCE_API_TIMEOUT", "180"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class ApiError(Exception):
+    """
+    status: HTTP status, or None when the service could not be reached.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def timed_out(self):
+        return self.status == 504
+
+    @property
+    def overloaded(self):
+        return self.status == 503
+
+    def describe(self, action):
+        """
+        Message for the UI, e.g. describe("Explanation").
+        """
+        if self.status is None:
+            return f"The insurance service at {API_URL} is unreachable. Please try again later."
+        if self.timed_out:
+            return f"{action} timed out. Please try again."
+        if self.overloaded:
+            return "The service is busy. Please try again shortly."
+        return f"{action} failed: {self}"
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(base_url=API_URL, timeout=API_TIMEOUT)
+    return _client
+
+
+def _request(method, path, **kwargs):
+    try:
+        response = get_client().request(method, path, **kwargs)
+    except httpx.TimeoutException:
+        raise ApiError(504, f"{path} timed out")
+    except httpx.TransportError as e:
+        raise ApiError(None, f"{API_URL} unreachable: {e}")
+    if response.status_code >= 400:
+        try:
+            message = response.json()["error"]
+        except (ValueError, KeyError):
+            message = response.text
+        raise ApiError(response.status_code, message)
+    return response.json()
+
+
+# ------------------------------
+# Claims
+# ------------------------------
+def extract_pdf(data, first_pages=None):
+    params = {"first_pages": first_pages} if first_pages else None
+    return _request(
+        "POST", "/claims/extract", params=params,
+        content=data, headers={"Content-Type": "application/pdf"}
+    )
+
+
+def explain_claim(report, claim_type, language):
+    return _request("POST", "/claims/explain", json={
+        "report": report, "claim_type": claim_type, "language": language
+    })
+
+
+def set_review(event_id, reviewed):
+    return _request("POST", "/claims/review", json={"event_id": event_id, "reviewed": reviewed})
+
+
+def ask_about_claim(report, question):
+    return _request("POST", "/claims/ask", json={"report": report, "question": question})
+
+
+# ------------------------------
+# Quotes
+# ------------------------------
+def compare_quotes(quotes, user_profile, weights=None):
+    return _request("POST", "/quotes/compare", json={
+        "quotes": quotes, "user_profile": user_profile, "weights": weights
+    })
+
+
+def ask_about_quotes(question, quotes, user_profile, session_id=None, k=4):
+    return _request("POST", "/quotes/ask", json={
+        "question": question, "quotes": quotes, "user_profile": user_profile,
+        "session_id": session_id, "k": k
+    })
+
+
+# ------------------------------
+# Underwriting
+# ------------------------------
+def assess_underwriting(applicant, claims, external):
+    return _request("POST", "/underwriting", json={
+        "applicant": applicant, "claims": claims, "external": external
+    })
+
+
+def health():
+    return _request("GET", "/healthz")
+
+
+def service_metrics():
+    return _request("GET", "/metrics")
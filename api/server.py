@@ -0,0 +1,534 @@
+"""
+Async HTTP service for the claims, quote and underwriting pipelines.
+
+    python -m api.server --workers 4 --port 8000
+    uvicorn api.server:app --workers 4 --port 8000
+
+Each worker process loads the pipelines once and warms its model clients
+and embeddings before it accepts traffic. Pipeline endpoints are capped by
+per-worker semaphores; a request that cannot get a slot within
+API_QUEUE_TIMEOUT seconds is answered with 503 and Retry-After instead of
+queueing without bound. GET /healthz and GET /metrics report on the worker
+that serves them.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import functools
+import contextlib
+from typing import List, Literal, Optional, Union
+from concurrent.futures import TimeoutError as FutureTimeout
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLAIM_BOT_DIR = os.path.join(ROOT_DIR, "Claim_Bot")
+QUOTE_BOT_DIR = os.path.join(ROOT_DIR, "Qoute_Comparison_Bot")
+UNDERWRITING_DIR = os.path.join(ROOT_DIR, "underwriting-assistant")
+
+for path in (ROOT_DIR, CLAIM_BOT_DIR, QUOTE_BOT_DIR, UNDERWRITING_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
+
+# The bots resolve their data paths against their own folders
+os.environ.setdefault("CLAIM_LOG_DIR", os.path.join(CLAIM_BOT_DIR, "logs"))
+os.environ.setdefault(
+    "CHROMA_DB_DIR", os.path.join(QUOTE_BOT_DIR, "chroma_db", "oriental_mediclaim")
+)
+os.environ.setdefault(
+    "ONNX_MODEL_DIR", os.path.join(QUOTE_BOT_DIR, "models", "all-MiniLM-L6-v2-int8")
+)
+# Quote conversations are shared by every worker through one SQLite store,
+# so a follow-up sees its history whichever worker answers it
+os.environ.setdefault(
+    "MEMORY_STORE_PATH", os.path.join(QUOTE_BOT_DIR, ".cache", "chat_sessions.sqlite3")
+)
+os.environ.setdefault("MEMORY_SHARED_STORE", "1")
+
+from openai import APITimeoutError
+from pdfminer.psexceptions import PSException
+from pdfplumber.utils.exceptions import MalformedPDFException, PdfminerException
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from common import metrics
+from common import tracing
+from common import azure_gateway
+from common.llm_cache import get_llm_cache
+
+from claims_core import (
+    CLAIM_TYPES, LANGUAGES,
+    extract_pdf, detect_claim_decision, domain_bot_prompt, call_llm,
+    run_claim_pipeline, log_event, set_review, get_audit_store,
+    migrate_legacy_audit_log, stage_timings, usage_stats
+)
+from report_index import ReportIndex, format_passages
+
+from logic.quote_comparison import compare_quotes
+from logic.quote_scoring import WEIGHT_PROFILES
+from rag.retriever_chroma import (
+    retrieve_policy_clauses_multi, get_embeddings, warm_up, cache_stats
+)
+from llm.explainer_with_memory import explain_answer, remember_answer, session_memory
+from llm.semantic_cache import SemanticCache, context_key
+
+from underwriting_ai import run_underwriting_analysis_async, parse_result_async
+from response_parser import parse_stats
+from rules import rule_stats
+
+# ------------------------------
+# Configuration
+# ------------------------------
+CLAIM_CONCURRENCY = int(os.getenv("API_CLAIM_CONCURRENCY", "8"))
+QUOTE_CONCURRENCY = int(os.getenv("API_QUOTE_CONCURRENCY", "8"))
+# Underwriting runs on the event loop (async client), so it can take more
+UNDERWRITING_CONCURRENCY = int(os.getenv("API_UNDERWRITING_CONCURRENCY", "32"))
+# Longest a request waits for a pipeline slot before 503
+QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "30"))
+MAX_UPLOAD_MB = float(os.getenv("API_MAX_UPLOAD_MB", "100"))
+# Load the embedding model at startup instead of on the first quote question
+WARM_EMBEDDINGS = os.getenv("API_WARM_EMBEDDINGS", "1") != "0"
+REPORT_INDEX_CACHE = int(os.getenv("API_REPORT_INDEX_CACHE", "32"))
+
+
+class Overloaded(Exception):
+    pass
+
+
+class Limiter:
+    """
+    Caps concurrent runs of one pipeline within a worker.
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(self.name)
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            metrics.observe(f"api.{self.name}", time.monotonic() - started)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected
+        }
+
+
+limits = {
+    "claims": Limiter("claims", CLAIM_CONCURRENCY),
+    "quotes": Limiter("quotes", QUOTE_CONCURRENCY),
+    "underwriting": Limiter("underwriting", UNDERWRITING_CONCURRENCY)
+}
+
+# Paraphrases of an answered quote question reuse its answer
+answer_cache = SemanticCache(lambda text: get_embeddings().embed_query(text))
+
+_warm = {}
+_started = time.time()
+
+
+# ------------------------------
+# Request Models
+# ------------------------------
+class ClaimRequest(BaseModel):
+    report: str = Field(min_length=1)
+    claim_type: str = CLAIM_TYPES[0]
+    language: str = LANGUAGES[0]
+
+
+class PdfOptions(BaseModel):
+    # Query parameters of /claims/extract
+    first_pages: Optional[int] = Field(default=None, ge=1)
+
+
+class ClaimReview(BaseModel):
+    event_id: str = Field(min_length=1)
+    reviewed: bool
+
+
+class ClaimQuestion(BaseModel):
+    report: str = Field(min_length=1)
+    question: str = Field(min_length=1)
+
+
+class Quote(BaseModel):
+    quote_id: str = Field(min_length=1)
+    annual_premium: float = Field(ge=0)
+    sum_insured: float = Field(ge=0)
+    deductible: float = Field(ge=0)
+
+
+class UserProfile(BaseModel):
+    family_size: int = Field(ge=1)
+
+
+class Weights(BaseModel):
+    """
+    Overrides of the "balanced" profile (logic/quote_scoring.WEIGHT_PROFILES).
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    family_size_threshold: Optional[float] = Field(default=None, ge=0)
+    sum_insured_scale: Optional[float] = Field(default=None, gt=0)
+    deductible_pivot: Optional[float] = None
+    deductible_scale: Optional[float] = Field(default=None, gt=0)
+    premium_pivot: Optional[float] = None
+    premium_scale: Optional[float] = Field(default=None, gt=0)
+    coverage_weight: Optional[float] = None
+    deductible_weight: Optional[float] = None
+    premium_weight: Optional[float] = None
+
+
+class QuoteRequest(BaseModel):
+    quotes: List[Quote] = Field(min_length=1)
+    user_profile: UserProfile
+    # A preset name or custom weights
+    weights: Union[Literal[tuple(WEIGHT_PROFILES)], Weights, None] = None
+
+    @field_validator("quotes")
+    @classmethod
+    def unique_quote_ids(cls, quotes):
+        if len({q.quote_id for q in quotes}) < len(quotes):
+            raise ValueError("quote_id values must be unique")
+        return quotes
+
+    def scoring_args(self):
+        """
+        (quotes, user_profile, weights) as compare_quotes takes them.
+        """
+        weights = self.weights
+        if isinstance(weights, Weights):
+            weights = weights.model_dump(exclude_none=True)
+        return (
+            [q.model_dump() for q in self.quotes],
+            self.user_profile.model_dump(),
+            weights
+        )
+
+
+class QuoteQuestion(QuoteRequest):
+    question: str = Field(min_length=1)
+    # Conversation memory; a new session is started when omitted
+    session_id: Optional[str] = None
+    k: int = Field(default=4, ge=1, le=20)
+
+
+class UnderwritingRequest(BaseModel):
+    applicant: dict
+    claims: list = []
+    external: dict = {}
+
+
+async def parse(request, model):
+    # Malformed JSON is reported as a ValidationError too
+    return model.model_validate_json(await request.body())
+
+
+# ------------------------------
+# Claims
+# ------------------------------
+@functools.lru_cache(maxsize=REPORT_INDEX_CACHE)
+def report_index(report):
+    """
+    One index per report, shared by every question about it.
+    """
+    return ReportIndex(report)
+
+
+def _explain_claim(body):
+    with tracing.start_trace("claim_request", claim_type=body.claim_type) as trace:
+        decision = detect_claim_decision(body.report)
+        result = run_claim_pipeline(
+            body.claim_type, decision, body.report, body.language
+        )
+
+    timings = stage_timings(trace)
+    # Logged unreviewed; POST /claims/review records the reviewer's flag
+    event_id = log_event(
+        body.claim_type, decision, result["score"], False, timings=timings
+    )
+    return dict(
+        result,
+        decision=decision,
+        event_id=event_id,
+        review_suggested=not result["valid"] or result["score"] < 0.6,
+        timings=timings
+    )
+
+
+async def explain_claim(request):
+    body = await parse(request, ClaimRequest)
+    async with limits["claims"].slot():
+        return JSONResponse(await run_in_threadpool(_explain_claim, body))
+
+
+async def review_claim(request):
+    body = await parse(request, ClaimReview)
+    set_review(body.event_id, body.reviewed)
+    return JSONResponse({"event_id": body.event_id, "reviewed": body.reviewed})
+
+
+async def extract_claim_pdf(request):
+    options = PdfOptions.model_validate(dict(request.query_params))
+    data = await request.body()
+    if not data:
+        return JSONResponse({"error": "Request body must be the PDF file"}, 400)
+    if len(data) > MAX_UPLOAD_MB * 1024 * 1024:
+        return JSONResponse({"error": f"PDF exceeds {MAX_UPLOAD_MB:g} MB"}, 413)
+
+    async with limits["claims"].slot():
+        try:
+            return JSONResponse(await run_in_threadpool(extract_pdf, data, options.first_pages))
+        except (PdfminerException, MalformedPDFException, PSException) as e:
+            return JSONResponse({"error": f"Not a readable PDF: {e}"}, 400)
+
+
+def _ask_about_claim(body):
+    passages = report_index(body.report).search(body.question)
+    answer = call_llm(domain_bot_prompt(format_passages(passages), body.question))
+    return {"answer": answer, "passages": passages}
+
+
+async def ask_about_claim(request):
+    body = await parse(request, ClaimQuestion)
+    async with limits["claims"].slot():
+        return JSONResponse(await run_in_threadpool(_ask_about_claim, body))
+
+
+# ------------------------------
+# Quotes
+# ------------------------------
+def _clauses(policy_docs):
+    return {
+        quote_id: [
+            {"text": doc.page_content, "metadata": doc.metadata} for doc in docs
+        ]
+        for quote_id, docs in policy_docs.items()
+    }
+
+
+async def compare(request):
+    body = await parse(request, QuoteRequest)
+    async with limits["quotes"].slot():
+        comparison = await run_in_threadpool(compare_quotes, *body.scoring_args())
+    return JSONResponse(comparison)
+
+
+def _ask_about_quotes(body):
+    session_id = body.session_id or uuid.uuid4().hex
+    quotes, user_profile, weights = body.scoring_args()
+    comparison = compare_quotes(quotes, user_profile, weights)
+    policy_docs = retrieve_policy_clauses_multi(
+        body.question, list(comparison["scores"]), body.k
+    )
+
+    history = session_memory.get(session_id).messages
+    context = context_key(quotes, user_profile, policy_docs, history, body.question)
+    hit = answer_cache.lookup(body.question, context)
+    if hit:
+        answer = hit.answer
+        remember_answer(body.question, answer, session_id)
+    else:
+        started = time.monotonic()
+        answer = explain_answer(body.question, comparison, policy_docs, session_id)
+        answer_cache.store(body.question, context, answer, time.monotonic() - started)
+
+    return {
+        "answer": answer,
+        "cached": hit is not None,
+        "session_id": session_id,
+        "comparison": comparison,
+        "clauses": _clauses(policy_docs)
+    }
+
+
+async def ask_about_quotes(request):
+    body = await parse(request, QuoteQuestion)
+    async with limits["quotes"].slot():
+        return JSONResponse(await run_in_threadpool(_ask_about_quotes, body))
+
+
+# ------------------------------
+# Underwriting
+# ------------------------------
+async def underwriting(request):
+    body = await parse(request, UnderwritingRequest)
+    # Formatted like batch_underwriting._as_text, so API and batch runs share
+    # LLM cache entries (in-process app runs send the raw text-area contents)
+    inputs = [
+        json.dumps(value, indent=2)
+        for value in (body.applicant, body.claims, body.external)
+    ]
+    async with limits["underwriting"].slot():
+        raw, messages = await run_underwriting_analysis_async(*inputs)
+        result = await parse_result_async(raw, messages)
+    return JSONResponse(result.model_dump())
+
+
+# ------------------------------
+# Health & Metrics
+# ------------------------------
+async def healthz(request):
+    return JSONResponse({
+        "status": "ok",
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - _started, 1),
+        "warm": _warm
+    })
+
+
+async def metrics_endpoint(request):
+    return JSONResponse({
+        "pid": os.getpid(),
+        "limits": {name: limiter.stats() for name, limiter in limits.items()},
+        "latency": metrics.summary(),
+        "gateway": azure_gateway.gateway_stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "claims": {"usage": usage_stats()},
+        "quotes": {
+            "retrieval": cache_stats(),
+            "semantic_cache": answer_cache.stats(),
+            "memory": session_memory.stats()
+        },
+        "rules": rule_stats(),
+        "parsing": parse_stats()
+    }, headers={"Cache-Control": "no-store"})
+
+
+# ------------------------------
+# Errors
+# ------------------------------
+async def invalid_request(request, exc):
+    detail = exc.errors(include_url=False, include_input=False, include_context=False)
+    return JSONResponse({"error": "Invalid request", "detail": detail}, 422)
+
+
+async def overloaded(request, exc):
+    return JSONResponse(
+        {"error": f"{exc} pipeline is at capacity, retry shortly"}, 503,
+        headers={"Retry-After": "1"}
+    )
+
+
+async def timed_out(request, exc):
+    return JSONResponse({"error": "Model call timed out"}, 504)
+
+
+async def server_error(request, exc):
+    return JSONResponse({"error": str(exc) or type(exc).__name__}, 500)
+
+
+# ------------------------------
+# App
+# ------------------------------
+def warm_worker():
+    """
+    Runs once per worker process before it accepts requests.
+    """
+    azure_gateway.get_client()
+    azure_gateway.get_async_client()
+    get_audit_store()
+    migrate_legacy_audit_log()
+    _warm["clients"] = "ready"
+
+    if not WARM_EMBEDDINGS:
+        _warm["embeddings"] = "lazy"
+        return
+    try:
+        warm_up(background=False)
+        _warm["embeddings"] = "ready"
+    except Exception as e:
+        # Quote questions load the model on first use (or fail there)
+        _warm["embeddings"] = f"unavailable: {e}"
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    started = time.monotonic()
+    await run_in_threadpool(warm_worker)
+    _warm["seconds"] = round(time.monotonic() - started, 2)
+    print(f"Worker {os.getpid()} ready in {_warm['seconds']:.2f}s")
+    yield
+    get_audit_store().flush()
+
+
+app = Starlette(
+    routes=[
+        Route("/claims/explain", explain_claim, methods=["POST"]),
+        Route("/claims/review", review_claim, methods=["POST"]),
+        Route("/claims/extract", extract_claim_pdf, methods=["POST"]),
+        Route("/claims/ask", ask_about_claim, methods=["POST"]),
+        Route("/quotes/compare", compare, methods=["POST"]),
+        Route("/quotes/ask", ask_about_quotes, methods=["POST"]),
+        Route("/underwriting", underwriting, methods=["POST"]),
+        Route("/healthz", healthz),
+        Route("/metrics", metrics_endpoint)
+    ],
+    exception_handlers={
+        ValidationError: invalid_request,
+        Overloaded: overloaded,
+        FutureTimeout: timed_out,
+        APITimeoutError: timed_out,
+        Exception: server_error
+    },
+    lifespan=lifespan
+)
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Insurance pipelines HTTP service")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("API_WORKERS", str(min(4, os.cpu_count() or 1)))))
+    args = parser.parse_args(argv)
+    if args.workers > 1 and not (
+        os.getenv("MEMORY_STORE_PATH") and os.getenv("MEMORY_SHARED_STORE") != "0"
+    ):
+        parser.error(
+            "--workers > 1 needs a shared MEMORY_STORE_PATH (and MEMORY_SHARED_STORE=1) "
+            "so /quotes/ask follow-ups keep their history"
+        )
+
+    # Each worker is its own process with its own models, clients and limits
+    uvicorn.run(
+        "api.server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=ROOT_DIR
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Embedding backends: int8 ONNX vs. sentence-transformers (torch).
+
+    python benchmarks/embeddings_onnx.py
+    python benchmarks/embeddings_onnx.py --threads 2 --batch-size 64 --json results/embeddings.json
+    python benchmarks/embeddings_onnx.py --backends onnx
+
+Reports cold start (import + load + first embedding, in a fresh process),
+sentences/sec, and recall parity: overlap of the top-k policy chunks each
+backend retrieves for the same questions. The corpus is the ingested
+collection's chunks when available (rag/ingest_chroma.py), else synthetic
+clause text. Exits non-zero when recall falls below --min-recall.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+QUOTE_BOT_DIR = os.path.join(os.path.dirname(BENCH_DIR), "Qoute_Comparison_Bot")
+
+for path in (BENCH_DIR, QUOTE_BOT_DIR):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import synthetic
+from rag.embeddings_onnx import ONNX_MODEL_DIR, ONNX_THREADS, ONNX_BATCH_SIZE
+from rag.retriever_chroma import CHROMA_DB_DIR, LEXICAL_INDEX_FILE
+
+BACKENDS = ["torch", "onnx"]
+QUERIES = synthetic.QUOTE_QUESTIONS + [
+    "Section 4.1 pre-existing diseases exclusion",
+    "Cataract surgery sub-limit",
+    "Grace period for premium payment",
+    "Cumulative bonus on claim-free years",
+    "Ambulance charges covered",
+    "Maternity expenses exclusion",
+    "Portability to another insurer",
+    "Co-payment for senior citizens"
+]
+
+
+def load_corpus(size):
+    path = os.path.join(QUOTE_BOT_DIR, CHROMA_DB_DIR, LEXICAL_INDEX_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            texts = json.load(f)["texts"]
+        if texts:
+            return texts[:size], "collection"
+
+    texts = []
+    for report in synthetic.claim_reports(max(1, size // 8), pages=1):
+        texts.extend(p for p in report.split("\n\n") if p.strip())
+    texts.extend(synthetic.REASONS)
+    return texts[:size], "synthetic"
+
+
+def make_embeddings(backend, model_dir, threads, batch_size):
+    if backend == "onnx":
+        from rag.embeddings_onnx import OnnxEmbeddings
+
+        return OnnxEmbeddings(model_dir, threads=threads, batch_size=batch_size)
+    from rag.embeddings import load_local_embeddings
+
+    return load_local_embeddings("torch")
+
+
+def cold_start(backend, args):
+    """
+    Runs in a child process so module imports are included.
+    """
+    command = [
+        sys.executable, os.path.abspath(__file__), "--cold-start", backend,
+        "--model-dir", args.model_dir, "--threads", str(args.threads),
+        "--batch-size", str(args.batch_size)
+    ]
+    output = subprocess.check_output(command, cwd=QUOTE_BOT_DIR, text=True)
+    return json.loads(output.strip().splitlines()[-1])["seconds"]
+
+
+def measure_cold_start(backend, args):
+    started = time.perf_counter()
+    make_embeddings(backend, args.model_dir, args.threads, args.batch_size).embed_query("warm up")
+    print(json.dumps({"seconds": round(time.perf_counter() - started, 3)}))
+
+
+def throughput(embeddings, texts, repeat=3):
+    embeddings.embed_documents(texts[:8])
+    best = min(_timed(embeddings.embed_documents, texts) for _ in range(repeat))
+    return len(texts) / best
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def top_k(query_vectors, doc_vectors, k):
+    scores = np.asarray(query_vectors) @ np.asarray(doc_vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_parity(reference, candidate, corpus, k):
+    """
+    Mean overlap of the top-k chunks, plus cosine agreement of the vectors.
+    """
+    ref_docs = np.asarray(reference.embed_documents(corpus))
+    cand_docs = np.asarray(candidate.embed_documents(corpus))
+    ref_top = top_k(reference.embed_documents(QUERIES), ref_docs, k)
+    cand_top = top_k(candidate.embed_documents(QUERIES), cand_docs, k)
+
+    recall = np.mean([
+        len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)
+    ])
+    cosine = np.sum(ref_docs * cand_docs, axis=1)
+    return {
+        "recall_at_k": round(float(recall), 4),
+        "k": k,
+        "cosine_mean": round(float(cosine.mean()), 4),
+        "cosine_min": round(float(cosine.min()), 4)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--model-dir", default=os.path.join(QUOTE_BOT_DIR, ONNX_MODEL_DIR))
+    parser.add_argument("--threads", type=int, default=ONNX_THREADS)
+    parser.add_argument("--batch-size", type=int, default=ONNX_BATCH_SIZE)
+    parser.add_argument("--corpus-size", type=int, default=512)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--cold-start", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.cold_start:
+        measure_cold_start(args.cold_start, args)
+        return 0
+
+    corpus, source = load_corpus(args.corpus_size)
+    print(f"Corpus: {len(corpus)} {source} chunks, {len(QUERIES)} queries")
+
+    results = {"corpus": source, "corpus_size": len(corpus), "backends": {}}
+    loaded = {}
+    for backend in args.backends:
+        try:
+            seconds = cold_start(backend, args)
+        except subprocess.CalledProcessError:
+            print(f"{backend:<6} unavailable (see error above)")
+            continue
+        loaded[backend] = make_embeddings(backend, args.model_dir, args.threads, args.batch_size)
+        rate = throughput(loaded[backend], corpus)
+        results["backends"][backend] = {
+            "cold_start_seconds": seconds,
+            "sentences_per_sec": round(rate, 1)
+        }
+        print(f"{backend:<6} cold start {seconds:6.2f}s   {rate:8.1f} sentences/sec")
+
+    status = 0
+    if "torch" in loaded and "onnx" in loaded:
+        parity = recall_parity(loaded["torch"], loaded["onnx"], corpus, args.k)
+        results["parity"] = parity
+        print(
+            f"Recall@{args.k} vs torch: {parity['recall_at_k']:.2%}  "
+            f"(cosine mean {parity['cosine_mean']:.4f}, min {parity['cosine_min']:.4f})"
+        )
+        if parity["recall_at_k"] < args.min_recall:
+            print(f"Recall below --min-recall {args.min_recall:.2f}")
+            status = 1
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
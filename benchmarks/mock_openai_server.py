@@ -0,0 +1,220 @@
+"""
+Local stand-in for the Azure OpenAI chat-completions API.
+
+    python benchmarks/mock_openai_server.py --port 8900 --latency 0.4 --tokens-per-sec 60
+
+Point an app at it with AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8900 (any key
+and API version). Responses are chosen from the prompt so every app gets
+output it can parse. GET /stats returns request and token counters.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+EXPLANATION = (
+    "The claim was assessed against the policy terms. The decision follows the "
+    "exclusion and waiting period clauses cited in the report. The insurer noted "
+    "that the documents submitted did not cover the full hospitalisation period. "
+    "You can request a review by sending the missing discharge summary and bills. "
+    "This explanation is informational and does not change the claim decision."
+)
+UNDERWRITING = json.dumps({
+    "risk_level": "Medium",
+    "risk_score": 55,
+    "key_risk_factors": ["Recent hospitalisation claim", "High-risk zone"],
+    "underwriting_summary": "Moderate claims history with an elevated location risk.",
+    "recommendation": "Request a medical report before standard review."
+})
+
+
+def count_tokens(text):
+    # Same ~4 characters per token estimate the apps use without tiktoken
+    return (len(text) + 3) // 4
+
+
+def pick_response(messages):
+    prompt = messages[-1]["content"] if messages else ""
+    if "appeal success" in prompt:
+        return "0.42"
+    if "Reply strictly YES or NO" in prompt:
+        return "YES"
+    if "risk_level" in prompt or "missing:" in prompt:
+        return UNDERWRITING
+    if "Update the running summary" in prompt:
+        return "The user compared quotes Q1 to Q3 and prefers a low deductible."
+    return EXPLANATION
+
+
+class MockState:
+    def __init__(self, latency, tokens_per_sec, error_rate, retry_after, seed=None):
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "throttled": 0, "streamed": 0,
+            "prompt_tokens": 0, "completion_tokens": 0
+        }
+
+    def count(self, **deltas):
+        with self.lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def throttle(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.state.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if not self.path.split("?")[0].endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        if self.state.throttle():
+            self.state.count(throttled=1)
+            self._send_json(
+                429,
+                {"error": {"code": "429", "message": "Rate limit exceeded (mock)."}},
+                {"retry-after-ms": str(int(self.state.retry_after * 1000))}
+            )
+            return
+
+        messages = body.get("messages", [])
+        text = pick_response(messages)
+        prompt_tokens = count_tokens(json.dumps(messages))
+        completion_tokens = count_tokens(text)
+        self.state.count(
+            requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        )
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+        time.sleep(self.state.latency)
+        if body.get("stream"):
+            self.state.count(streamed=1)
+            self._stream(body, text, usage)
+            return
+
+        if self.state.tokens_per_sec:
+            time.sleep(completion_tokens / self.state.tokens_per_sec)
+        self._send_json(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+    def _stream(self, body, text, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send(choices, **extra):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": choices
+            }
+            chunk.update(extra)
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        # Roughly one token per piece, paced at the configured rate
+        for piece in re.findall(r"\S{1,4}\s*|\s+", text):
+            send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+            if self.state.tokens_per_sec:
+                time.sleep(1 / self.state.tokens_per_sec)
+        send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            send([], usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_server(port=0, latency=0.4, tokens_per_sec=60, error_rate=0.0,
+                 retry_after=0.5, seed=None):
+    """
+    Runs the mock in a background thread; returns (server, base_url).
+    """
+    state = MockState(latency, tokens_per_sec, error_rate, retry_after, seed)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Azure OpenAI chat-completions server")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.4,
+                        help="Seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=60,
+                        help="Generation speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.5,
+                        help="Retry-After sent with 429 responses (seconds)")
+    args = parser.parse_args(argv)
+
+    server, url = start_server(
+        args.port, args.latency, args.tokens_per_sec, args.error_rate, args.retry_after
+    )
+    print(f"Mock Azure OpenAI listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Quote scoring benchmark: vectorized engine vs. the original per-quote loop.
+
+    python benchmarks/quote_scoring.py
+    python benchmarks/quote_scoring.py --json results/quote_scoring.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Qoute_Comparison_Bot"))
+
+from logic.quote_scoring import score_matrix, top_k, rank_quotes
+
+# (profiles, quotes) -> 3 ... 1M quote-profile pairs
+SIZES = [(1, 3), (10, 100), (100, 1000), (1000, 1000)]
+
+# Loop baseline is only timed up to this many pairs
+LOOP_LIMIT = 100_000
+
+
+def legacy_compare_quotes(quotes, user_profile):
+    # Original logic/quote_comparison.py implementation, kept as reference
+    scores = {}
+
+    for q in quotes:
+        score = 0
+
+        if user_profile["family_size"] >= 4:
+            score += q["sum_insured"] / 100000
+
+        score += max(0, (20000 - q["deductible"]) / 1000)
+        score += max(0, (30000 - q["annual_premium"]) / 1000)
+
+        scores[q["quote_id"]] = round(score, 2)
+
+    best_quote = max(scores, key=scores.get)
+
+    return {
+        "best_quote": best_quote,
+        "scores": scores
+    }
+
+
+def synthetic_quotes(n, rng):
+    return pd.DataFrame({
+        "quote_id": [f"Q{i + 1}" for i in range(n)],
+        "annual_premium": rng.integers(8000, 40000, n),
+        "sum_insured": rng.integers(2, 50, n) * 100000,
+        "deductible": rng.integers(0, 30, n) * 1000
+    })
+
+
+def synthetic_profiles(n, rng):
+    return pd.DataFrame({"family_size": rng.integers(1, 7, n)})
+
+
+def check_parity(rng, trials=2000):
+    for _ in range(trials):
+        quotes = synthetic_quotes(3, rng).to_dict("records")
+        quotes = [{k: (int(v) if k != "quote_id" else v) for k, v in q.items()} for q in quotes]
+        profile = {"family_size": int(rng.integers(1, 7))}
+        if rank_quotes(quotes, profile) != legacy_compare_quotes(quotes, profile):
+            raise AssertionError(f"Mismatch for {quotes} / {profile}")
+    return trials
+
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run():
+    rng = np.random.default_rng(7)
+    results = {"parity_trials": check_parity(rng), "sizes": []}
+
+    for n_profiles, n_quotes in SIZES:
+        quotes = synthetic_quotes(n_quotes, rng)
+        profiles = synthetic_profiles(n_profiles, rng)
+        pairs = n_profiles * n_quotes
+
+        row = {
+            "profiles": n_profiles,
+            "quotes": n_quotes,
+            "pairs": pairs,
+            "matrix_s": best_of(lambda: score_matrix(quotes, profiles)),
+            "top3_s": best_of(lambda: top_k(quotes, profiles, k=3))
+        }
+
+        if pairs <= LOOP_LIMIT:
+            records = quotes.to_dict("records")
+            profile_records = profiles.to_dict("records")
+            row["loop_s"] = best_of(
+                lambda: [legacy_compare_quotes(records, p) for p in profile_records]
+            )
+
+        results["sizes"].append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = run()
+    print(f"Parity with original compare_quotes: {results['parity_trials']} random cases OK\n")
+    print(f"{'pairs':>10} {'matrix':>10} {'top-3':>10} {'loop':>10} {'pairs/s':>14}")
+    for row in results["sizes"]:
+        loop = f"{row['loop_s'] * 1000:8.2f}ms" if "loop_s" in row else f"{'-':>10}"
+        print(
+            f"{row['pairs']:>10} {row['matrix_s'] * 1000:8.2f}ms "
+            f"{row['top3_s'] * 1000:8.2f}ms {loop} "
+            f"{row['pairs'] / row['matrix_s']:>14,.0f}"
+        )
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
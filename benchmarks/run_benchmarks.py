@@ -0,0 +1,283 @@
+"""
+End-to-end latency / throughput benchmarks against the mock Azure OpenAI server.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenarios claim underwriting --requests 50 --concurrency 8
+    python benchmarks/run_benchmarks.py --error-rate 0.1 --compare benchmarks/results/<previous>.json
+
+The mock is started in-process unless --endpoint points at a running one
+(see mock_openai_server.py). Results are written to benchmarks/results/ as
+JSON, named by timestamp and commit, so runs can be compared across commits.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+QUOTE_BOT_DIR = os.path.join(ROOT_DIR, "Qoute_Comparison_Bot")
+
+for path in (
+    ROOT_DIR,
+    os.path.join(ROOT_DIR, "Claim_Bot"),
+    os.path.join(ROOT_DIR, "underwriting-assistant"),
+    QUOTE_BOT_DIR
+):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import synthetic
+from mock_openai_server import start_server
+from common.metrics import percentile
+
+SCENARIOS = ["claim", "quote", "underwriting"]
+
+
+# ---------------- SCENARIOS ----------------
+def claim_scenario(n):
+    """
+    Claim_Bot tab 1: decision detection, explanation, guard and appeal score.
+    """
+    import claims_core
+
+    reports = synthetic.claim_reports(n)
+
+    def run(i):
+        report = reports[i]
+        decision = claims_core.detect_claim_decision(report)
+        claims_core.run_claim_pipeline("Health", decision, report, "English")
+
+    return run, {}
+
+
+def quote_scenario(n):
+    """
+    Quote bot: clauses for every compared quote + explain_answer, one session per request.
+    """
+    from langchain_core.documents import Document
+    from logic.quote_comparison import compare_quotes
+    from llm.explainer_with_memory import explain_answer
+
+    comparison = compare_quotes(synthetic.quote_book(3), {"family_size": 4})
+    quote_ids = list(comparison["scores"])
+    info = {}
+
+    # The retriever resolves its Chroma directory relative to the bot folder
+    previous_dir = os.getcwd()
+    os.chdir(QUOTE_BOT_DIR)
+    try:
+        from rag.retriever_chroma import retrieve_policy_clauses_multi
+        retrieve_policy_clauses_multi(synthetic.QUOTE_QUESTIONS[0], quote_ids)
+        retrieve = lambda question: retrieve_policy_clauses_multi(question, quote_ids)
+        info["retrieval"] = "chroma"
+    except Exception as e:
+        # Without an ingested collection / embedding model, time the LLM part only
+        fallback = {
+            quote_id: [Document(page_content=r) for r in synthetic.REASONS[:2]]
+            for quote_id in quote_ids
+        }
+        retrieve = lambda question: fallback
+        info["retrieval"] = f"synthetic ({type(e).__name__}: {e})"
+    finally:
+        os.chdir(previous_dir)
+
+    def run(i):
+        question = synthetic.QUOTE_QUESTIONS[i % len(synthetic.QUOTE_QUESTIONS)]
+        docs = retrieve(question)
+        explain_answer(question, comparison, docs, session_id=f"bench-{i}")
+
+    return run, info
+
+
+def underwriting_scenario(n):
+    """
+    run_underwriting_analysis + response parsing over a synthetic portfolio.
+    """
+    import rules
+    from underwriting_ai import run_underwriting_analysis, parse_result
+
+    portfolio = synthetic.applicant_portfolio(n)
+    before = rules.rule_stats()
+
+    def run(i):
+        record = portfolio[i]
+        inputs = [
+            json.dumps(record[name], indent=2)
+            for name in ("applicant", "claims", "external")
+        ]
+        parse_result(*run_underwriting_analysis(*inputs))
+
+    def info():
+        after = rules.rule_stats()
+        evaluated = after["evaluated"] - before["evaluated"]
+        decided = after["decided"] - before["decided"]
+        return {"rule_skip_rate": round(decided / evaluated, 4) if evaluated else 0.0}
+
+    return run, info
+
+
+SCENARIO_FUNCS = {
+    "claim": claim_scenario,
+    "quote": quote_scenario,
+    "underwriting": underwriting_scenario
+}
+
+
+# ---------------- RUNNER ----------------
+def mock_stats(endpoint):
+    with urllib.request.urlopen(endpoint.rstrip("/") + "/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def run_scenario(name, endpoint, requests, concurrency):
+    run, info = SCENARIO_FUNCS[name](requests)
+    latencies, errors = [], []
+
+    def timed(i):
+        started = time.perf_counter()
+        try:
+            run(i)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return
+        latencies.append(time.perf_counter() - started)
+
+    before = mock_stats(endpoint)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+    after = mock_stats(endpoint)
+
+    llm_requests = after["requests"] - before["requests"]
+    tokens = (
+        after["prompt_tokens"] + after["completion_tokens"]
+        - before["prompt_tokens"] - before["completion_tokens"]
+    )
+    latencies.sort()
+    result = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 3),
+        "latency": {
+            "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4)
+        },
+        "llm_requests": llm_requests,
+        "llm_requests_per_sec": round(llm_requests / elapsed, 3),
+        "throttled": after["throttled"] - before["throttled"],
+        "tokens_per_request": round(tokens / llm_requests, 1) if llm_requests else 0
+    }
+    result.update(info() if callable(info) else info)
+    if errors:
+        result["sample_errors"] = sorted(set(errors))[:5]
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_table(results, baseline=None):
+    print(f"\n{'scenario':<14} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'llm/req':>8} {'tok/llm':>8}")
+    for name, r in results["scenarios"].items():
+        lat = r["latency"]
+        llm_per_request = r["llm_requests"] / max(r["requests"], 1)
+        print(
+            f"{name:<14} {lat['p50']:>8.3f} {lat['p95']:>8.3f} {lat['p99']:>8.3f} "
+            f"{r['requests_per_sec']:>8.2f} {llm_per_request:>8.2f} {r['tokens_per_request']:>8.0f}"
+        )
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous and previous["latency"]["p50"]:
+            change = lat["p50"] / previous["latency"]["p50"] - 1
+            print(
+                f"{'':<14} p50 {change:+.1%} vs {baseline.get('commit', '?')}, "
+                f"req/s {previous['requests_per_sec']:.2f} -> {r['requests_per_sec']:.2f}"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks on a mock Azure OpenAI")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--endpoint", help="Use a running mock server instead of starting one")
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--tokens-per-sec", type=float, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Keep the LLM response cache on (off by default)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    endpoint = args.endpoint
+    if endpoint is None:
+        _, endpoint = start_server(
+            latency=args.latency,
+            tokens_per_sec=args.tokens_per_sec,
+            error_rate=args.error_rate,
+            seed=7
+        )
+
+    # Must be set before the apps import their clients
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": endpoint,
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "AZURE_OPENAI_API_VERSION": "2024-06-01",
+        "AZURE_OPENAI_DEPLOYMENT": "benchmark"
+    })
+    if not args.use_cache:
+        os.environ["LLM_CACHE_ENABLED"] = "0"
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "latency": args.latency if args.endpoint is None else None,
+            "tokens_per_sec": args.tokens_per_sec if args.endpoint is None else None,
+            "error_rate": args.error_rate if args.endpoint is None else None,
+            "cache": args.use_cache
+        },
+        "scenarios": {}
+    }
+    for name in args.scenarios:
+        print(f"Running {name} ({args.requests} requests, concurrency {args.concurrency})...")
+        results["scenarios"][name] = run_scenario(
+            name, endpoint, args.requests, args.concurrency
+        )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
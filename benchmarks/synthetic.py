@@ -0,0 +1,105 @@
+"""
+Deterministic synthetic inputs for the benchmarks: claim reports,
+quote books and applicant portfolios.
+"""
+import random
+
+DECISIONS = ["rejected", "approved", "partially approved"]
+REASONS = [
+    "the treatment falls under exclusion clause 4.1 (pre-existing disease)",
+    "the 30-day initial waiting period had not been completed",
+    "room rent exceeded the sub-limit of 1% of the sum insured",
+    "the discharge summary and final bills were not submitted",
+    "the hospitalisation was for diagnostic purposes only"
+]
+OCCUPATIONS = ["Construction Worker", "Teacher", "Software Engineer", "Driver", "Nurse"]
+CITIES = ["Mumbai", "Pune", "Chennai", "Kolkata", "Delhi"]
+CLAIM_TYPES = ["Hospitalization", "Accident", "Daycare", "Maternity"]
+
+
+def claim_report(rng, pages=3):
+    """
+    Multi-page claim report text with repeated headers and page numbers,
+    like the output of PDF extraction.
+    """
+    claim_no = rng.randint(100000, 999999)
+    decision = rng.choice(DECISIONS)
+    reason = rng.choice(REASONS)
+    amount = rng.randint(20, 500) * 1000
+
+    body = [
+        f"CLAIM SETTLEMENT LETTER\nClaim number: CL-{claim_no}\n"
+        f"Policy: Oriental Mediclaim Individual\nClaim amount: {amount:,}",
+        f"1. Decision\nThe claim has been {decision} because {reason}.",
+        "2. Hospitalisation details\n" + " ".join(
+            f"Day {d}: treatment and observation, charges {rng.randint(2, 40) * 1000:,}."
+            for d in range(1, rng.randint(4, 12))
+        ),
+        "3. Policy conditions\n" + " ".join(rng.sample(REASONS, 3)),
+        "4. Grievance\nYou may appeal this decision within 30 days by writing to the "
+        "grievance cell with the claim number and supporting documents."
+    ]
+
+    text = []
+    for page in range(1, pages + 1):
+        text.append("Oriental Insurance Co. Ltd - Health Claims Department")
+        text.extend(body if page == 1 else body[2:4])
+        text.append(f"Page {page} of {pages}")
+    return "\n\n".join(text)
+
+
+def claim_reports(n, pages=3, seed=7):
+    rng = random.Random(seed)
+    return [claim_report(rng, pages) for _ in range(n)]
+
+
+def quote_book(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "quote_id": f"Q{i + 1}",
+            "annual_premium": rng.randint(8, 40) * 1000,
+            "sum_insured": rng.randint(2, 50) * 100000,
+            "deductible": rng.randint(0, 30) * 1000
+        }
+        for i in range(n)
+    ]
+
+
+def applicant(rng):
+    return {
+        "applicant": {
+            "age": rng.randint(21, 70),
+            "occupation": rng.choice(OCCUPATIONS),
+            "annual_income": rng.randint(3, 30) * 100000,
+            "location": rng.choice(CITIES),
+            "policy_type": "Health Insurance"
+        },
+        "claims": [
+            {
+                "year": rng.randint(2020, 2026),
+                "claim_amount": rng.randint(10, 300) * 1000,
+                "claim_type": rng.choice(CLAIM_TYPES)
+            }
+            for _ in range(rng.choice([0, 0, 1, 2, 3]))
+        ],
+        "external": {
+            "credit_score": rng.randint(500, 850),
+            "fraud_flag": rng.random() < 0.05,
+            "high_risk_zone": rng.random() < 0.3
+        }
+    }
+
+
+def applicant_portfolio(n, seed=7):
+    rng = random.Random(seed)
+    return [dict(applicant(rng), id=f"A{i + 1}") for i in range(n)]
+
+
+QUOTE_QUESTIONS = [
+    "Which quote is best for a family of four?",
+    "What is the waiting period for pre-existing diseases?",
+    "Is room rent capped under this policy?",
+    "Which quote has the lowest deductible and what does that mean for me?",
+    "Are daycare procedures covered?"
+]
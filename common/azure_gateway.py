@@ -0,0 +1,590 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import Future, CancelledError
+
+import httpx
+from openai import (
+    AzureOpenAI, AsyncAzureOpenAI,
+    RateLimitError, InternalServerError, APIConnectionError, APITimeoutError
+)
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+# Deployment quotas; 0 disables the corresponding limit
+RPM_LIMIT = int(os.getenv("AZURE_OPENAI_RPM", "0"))
+TPM_LIMIT = int(os.getenv("AZURE_OPENAI_TPM", "0"))
+# Completion size assumed when reserving TPM for a request without max_tokens
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("AZURE_OPENAI_EXPECTED_COMPLETION", "500"))
+# Ask streams for a final usage chunk (stream_options, API 2024-09-01+) to
+# settle their reservation; without it the streamed text is counted instead
+STREAM_USAGE = os.getenv("AZURE_OPENAI_STREAM_USAGE", "1") != "0"
+
+POOL_CONNECTIONS = int(os.getenv("AZURE_OPENAI_POOL_SIZE", "20"))
+KEEPALIVE_SECONDS = float(os.getenv("AZURE_OPENAI_KEEPALIVE", "60"))
+REQUEST_TIMEOUT = float(os.getenv("AZURE_OPENAI_TIMEOUT", "120"))
+
+MAX_RETRIES = int(os.getenv("AZURE_OPENAI_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("AZURE_OPENAI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("AZURE_OPENAI_BACKOFF_MAX", "30"))
+
+RETRYABLE = (RateLimitError, InternalServerError, APIConnectionError)
+
+
+# =========================================================
+# RATE LIMITING
+# =========================================================
+class TokenBucket:
+    """
+    Per-minute quota refilled continuously.
+
+    reserve() always succeeds and returns how long the caller must wait
+    before sending, so the same bucket serves threads and coroutines.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount):
+        # Corrects a reservation once the real token usage is known
+        if self.capacity <= 0 or not amount:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+_requests_bucket = TokenBucket(RPM_LIMIT)
+_tokens_bucket = TokenBucket(TPM_LIMIT)
+
+_stats = {
+    "requests": 0, "queued": 0, "in_flight": 0, "throttled": 0,
+    "retries": 0, "coalesced": 0, "failed": 0
+}
+_stats_lock = threading.Lock()
+
+
+def _count(name, delta=1):
+    with _stats_lock:
+        _stats[name] += delta
+
+
+def gateway_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def estimate_tokens(kwargs):
+    text = json.dumps(kwargs.get("messages", []), ensure_ascii=False)
+    completion = kwargs.get("max_tokens") or EXPECTED_COMPLETION_TOKENS
+    # ~4 characters per token for English text
+    return len(text) // 4 + completion
+
+
+def _reserve(kwargs):
+    estimate = estimate_tokens(kwargs)
+    wait = max(_requests_bucket.reserve(1), _tokens_bucket.reserve(estimate))
+    return estimate, wait
+
+
+def _settle(response, estimate):
+    usage = getattr(response, "usage", None)
+    if usage is not None and usage.total_tokens:
+        _tokens_bucket.adjust(usage.total_tokens - estimate)
+
+
+# =========================================================
+# STREAMS
+# =========================================================
+def _stream_kwargs(kwargs):
+    """
+    kwargs with the final usage chunk requested, and whether it was added
+    here (and so is hidden from the caller).
+    """
+    if not STREAM_USAGE or "stream_options" in kwargs:
+        return kwargs, False
+    return dict(kwargs, stream_options={"include_usage": True}), True
+
+
+class _StreamUsage:
+    """
+    Settles a stream's reservation once: with the final chunk's usage when
+    it arrives, else with the streamed text when the stream ends or closes.
+    """
+
+    def __init__(self, estimate, kwargs, hide_usage):
+        self.estimate = estimate
+        self.prompt = estimate - (kwargs.get("max_tokens") or EXPECTED_COMPLETION_TOKENS)
+        self.hide_usage = hide_usage
+        self.characters = 0
+        self.settled = False
+
+    def observe(self, chunk):
+        # True if the chunk is passed on to the caller
+        usage = getattr(chunk, "usage", None)
+        if usage is not None and usage.total_tokens and not self.settled:
+            self.settled = True
+            _tokens_bucket.adjust(usage.total_tokens - self.estimate)
+        for choice in chunk.choices or ():
+            self.characters += len(getattr(choice.delta, "content", None) or "")
+        return bool(chunk.choices) or not self.hide_usage
+
+    def close(self):
+        if not self.settled:
+            self.settled = True
+            _tokens_bucket.adjust(self.prompt + self.characters // 4 - self.estimate)
+
+
+class _SettledStream:
+    """
+    Stream wrapper that settles the reservation; otherwise behaves like
+    the wrapped openai Stream.
+    """
+
+    def __init__(self, stream, usage):
+        self._stream = stream
+        self._usage = usage
+        self._chunks = self._iterate()
+
+    def _iterate(self):
+        try:
+            for chunk in self._stream:
+                if self._usage.observe(chunk):
+                    yield chunk
+        finally:
+            self._usage.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._chunks.close()
+        self._usage.close()
+        self._stream.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class _AsyncSettledStream:
+    """
+    Async variant of _SettledStream.
+    """
+
+    def __init__(self, stream, usage):
+        self._stream = stream
+        self._usage = usage
+        self._chunks = self._iterate()
+
+    async def _iterate(self):
+        try:
+            async for chunk in self._stream:
+                if self._usage.observe(chunk):
+                    yield chunk
+        finally:
+            self._usage.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._chunks.__anext__()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        await self._chunks.aclose()
+        self._usage.close()
+        await self._stream.close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+# =========================================================
+# RETRIES
+# =========================================================
+def _retry_delay(error, attempt):
+    """
+    Server-provided Retry-After when present, else jittered exponential backoff.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        headers = response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+    backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return backoff * random.uniform(0.5, 1.0)
+
+
+def _should_retry(error, attempt):
+    if isinstance(error, RateLimitError):
+        _count("throttled")
+    # A timeout is the caller's deadline, not a transient failure
+    if isinstance(error, APITimeoutError) or not isinstance(error, RETRYABLE):
+        return False
+    return attempt < MAX_RETRIES
+
+
+def _coalesce_key(client, kwargs):
+    if kwargs.get("stream"):
+        return None
+    # Calls made with different client options (e.g. with_options(timeout=...))
+    # are different requests
+    options = {
+        "base_url": client.base_url,
+        "timeout": client.timeout,
+        "max_retries": client.max_retries,
+        # Unset headers are per-client Omit sentinels
+        "headers": {k: v for k, v in client.default_headers.items() if isinstance(v, str)},
+        "query": client.default_query
+    }
+    return json.dumps([options, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+
+
+# =========================================================
+# CLIENTS
+# =========================================================
+_client = None
+_async_client = None
+_http_client = None
+_async_http_client = None
+_client_lock = threading.Lock()
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=POOL_CONNECTIONS,
+        max_keepalive_connections=POOL_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_SECONDS
+    )
+
+
+def get_http_client():
+    """
+    Shared keep-alive connection pool for synchronous clients.
+    """
+    global _http_client
+    if _http_client is None:
+        with _client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=_limits(), timeout=REQUEST_TIMEOUT)
+    return _http_client
+
+
+def get_async_http_client():
+    global _async_http_client
+    if _async_http_client is None:
+        with _client_lock:
+            if _async_http_client is None:
+                _async_http_client = httpx.AsyncClient(
+                    limits=_limits(), timeout=REQUEST_TIMEOUT
+                )
+    return _async_http_client
+
+
+def _client_options():
+    return {
+        "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
+        "azure_endpoint": os.getenv("AZURE_OPENAI_ENDPOINT"),
+        "api_version": os.getenv("AZURE_OPENAI_API_VERSION"),
+        # Retries are handled here so they respect the shared limiter
+        "max_retries": 0
+    }
+
+
+def get_client():
+    """
+    Process-wide AzureOpenAI client on the shared connection pool.
+    """
+    global _client
+    if _client is None:
+        http_client = get_http_client()
+        with _client_lock:
+            if _client is None:
+                _client = AzureOpenAI(http_client=http_client, **_client_options())
+    return _client
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        http_client = get_async_http_client()
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncAzureOpenAI(http_client=http_client, **_client_options())
+    return _async_client
+
+
+# =========================================================
+# SYNC GATEWAY
+# =========================================================
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _send(client, kwargs):
+    stream = bool(kwargs.get("stream"))
+    if stream:
+        kwargs, hide_usage = _stream_kwargs(kwargs)
+    attempt = 0
+    while True:
+        estimate, wait = _reserve(kwargs)
+        if wait:
+            _count("queued")
+            time.sleep(wait)
+            _count("queued", -1)
+
+        _count("requests")
+        _count("in_flight")
+        try:
+            response = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            _tokens_bucket.adjust(-estimate)
+            if not _should_retry(e, attempt):
+                _count("failed")
+                raise
+            _count("retries")
+            delay = _retry_delay(e, attempt)
+            attempt += 1
+        else:
+            if stream:
+                return _SettledStream(response, _StreamUsage(estimate, kwargs, hide_usage))
+            _settle(response, estimate)
+            return response
+        finally:
+            _count("in_flight", -1)
+        time.sleep(delay)
+
+
+def chat_completion(client=None, **kwargs):
+    """
+    chat.completions.create through the shared limiter, with retries.
+
+    Identical non-streaming requests already in flight share one call; if
+    its caller is interrupted, a waiting caller sends the request instead.
+    Streams settle their TPM reservation from the final usage chunk.
+    Pass client to use per-call options, e.g. get_client().with_options(timeout=...).
+    """
+    client = client or get_client()
+    key = _coalesce_key(client, kwargs)
+    if key is None:
+        return _send(client, kwargs)
+
+    with _pending_lock:
+        future = _pending.get(key)
+        leader = future is None
+        if leader:
+            future = _pending[key] = Future()
+    if not leader:
+        _count("coalesced")
+        try:
+            return future.result()
+        except CancelledError:
+            # The leader was interrupted; the first waiter to get here leads
+            return chat_completion(client, **kwargs)
+
+    try:
+        response = _send(client, kwargs)
+        future.set_result(response)
+        return response
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    except BaseException:
+        # e.g. KeyboardInterrupt: the waiters retry rather than fail
+        future.cancel()
+        raise
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+# =========================================================
+# ASYNC GATEWAY
+# =========================================================
+_async_pending = {}
+
+
+async def _send_async(client, kwargs):
+    stream = bool(kwargs.get("stream"))
+    if stream:
+        kwargs, hide_usage = _stream_kwargs(kwargs)
+    attempt = 0
+    while True:
+        estimate, wait = _reserve(kwargs)
+        if wait:
+            _count("queued")
+            await asyncio.sleep(wait)
+            _count("queued", -1)
+
+        _count("requests")
+        _count("in_flight")
+        try:
+            response = await client.chat.completions.create(**kwargs)
+        except Exception as e:
+            _tokens_bucket.adjust(-estimate)
+            if not _should_retry(e, attempt):
+                _count("failed")
+                raise
+            _count("retries")
+            delay = _retry_delay(e, attempt)
+            attempt += 1
+        else:
+            if stream:
+                return _AsyncSettledStream(response, _StreamUsage(estimate, kwargs, hide_usage))
+            _settle(response, estimate)
+            return response
+        finally:
+            _count("in_flight", -1)
+        await asyncio.sleep(delay)
+
+
+async def chat_completion_async(client=None, **kwargs):
+    """
+    Async variant of chat_completion.
+    """
+    client = client or get_async_client()
+    key = _coalesce_key(client, kwargs)
+    if key is None:
+        return await _send_async(client, kwargs)
+
+    # Keyed per event loop: futures cannot be awaited across loops
+    key = (id(asyncio.get_running_loop()), key)
+    future = _async_pending.get(key)
+    if future is not None:
+        _count("coalesced")
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled() or asyncio.current_task().cancelling():
+                raise
+        # The leader was cancelled, not this caller: the first follower to
+        # get here sends the request and the rest coalesce behind it
+        return await chat_completion_async(client, **kwargs)
+
+    future = _async_pending[key] = asyncio.get_running_loop().create_future()
+    try:
+        response = await _send_async(client, kwargs)
+        future.set_result(response)
+        return response
+    except asyncio.CancelledError:
+        # Wakes the followers, which take over rather than fail
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark retrieved so a failure nobody else awaited is not logged
+        future.exception()
+        raise
+    finally:
+        _async_pending.pop(key, None)
+
+
+# =========================================================
+# LANGCHAIN
+# =========================================================
+def langchain_rate_limiter():
+    """
+    Rate limiter for LangChain chat models that draws on the same quotas.
+
+    The limiter cannot see the prompt, so it reserves a flat estimate; pass
+    langchain_usage_handler() as a model callback to settle it.
+    """
+    from langchain_core.rate_limiters import BaseRateLimiter
+
+    class GatewayRateLimiter(BaseRateLimiter):
+        def acquire(self, *, blocking=True):
+            _, wait = _reserve({})
+            if wait:
+                _count("queued")
+                time.sleep(wait)
+                _count("queued", -1)
+            _count("requests")
+            return True
+
+        async def aacquire(self, *, blocking=True):
+            _, wait = _reserve({})
+            if wait:
+                _count("queued")
+                await asyncio.sleep(wait)
+                _count("queued", -1)
+            _count("requests")
+            return True
+
+    return GatewayRateLimiter()
+
+
+def _reported_tokens(result):
+    # usage_metadata on the messages (also set when streaming), else the
+    # provider's token_usage
+    total = 0
+    for generations in result.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage = getattr(message, "usage_metadata", None) or {}
+            total += usage.get("total_tokens", 0)
+    if total:
+        return total
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    return usage.get("total_tokens", 0)
+
+
+def langchain_usage_handler():
+    """
+    Callback that settles the limiter's reservations with the token usage
+    each LangChain model call reports.
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    # What GatewayRateLimiter reserved for every call
+    estimate = estimate_tokens({})
+
+    class GatewayUsageHandler(BaseCallbackHandler):
+        def on_llm_end(self, response, **kwargs):
+            used = _reported_tokens(response)
+            if used:
+                _tokens_bucket.adjust(used - estimate)
+
+        def on_llm_error(self, error, **kwargs):
+            _tokens_bucket.adjust(-estimate)
+
+    return GatewayUsageHandler()
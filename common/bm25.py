@@ -0,0 +1,113 @@
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+
+TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has",
+    "have", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or",
+    "that", "the", "this", "to", "was", "were", "what", "when", "which",
+    "who", "why", "will", "with", "you", "your", "how", "do", "does", "can"
+}
+
+
+def tokenize(text):
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over pre-tokenized documents, stored as an inverted index.
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = [len(doc) for doc in documents]
+        self.avg_length = (
+            sum(self.doc_lengths) / len(documents) if documents else 0.0
+        )
+
+        self.postings = defaultdict(list)
+        for doc_id, doc in enumerate(documents):
+            for term, tf in Counter(doc).items():
+                self.postings[term].append((doc_id, tf))
+
+        self._compute_idf()
+
+    def _compute_idf(self):
+        n = len(self.doc_lengths)
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def to_dict(self):
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls([], k1=data["k1"], b=data["b"])
+        index.doc_lengths = data["doc_lengths"]
+        index.avg_length = (
+            sum(index.doc_lengths) / len(index.doc_lengths)
+            if index.doc_lengths else 0.0
+        )
+        index.postings = defaultdict(list, {
+            term: [tuple(posting) for posting in postings]
+            for term, postings in data["postings"].items()
+        })
+        index._compute_idf()
+        return index
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def scores(self, query_tokens):
+        scores = defaultdict(float)
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (
+                    1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length
+                )
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query_tokens, k=4):
+        """
+        Top-k (doc_id, score) pairs; documents sharing no term are omitted.
+        """
+        scores = self.scores(query_tokens)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+def save_index(path, index, **extra):
+    """
+    Writes the index and any JSON-serializable extras (e.g. document
+    texts) to one file. The file is replaced atomically.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(extra, index=index.to_dict()), f)
+    os.replace(tmp, path)
+
+
+def load_index(path):
+    """
+    Returns (index, extras) as written by save_index.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return BM25Index.from_dict(data.pop("index")), data
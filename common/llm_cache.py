@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(ROOT_DIR, ".cache", "llm_cache.sqlite3")
+)
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "100"))
+
+
+def make_key(deployment, messages, temperature):
+    """
+    Content address of a chat completion request.
+    """
+    payload = json.dumps(
+        {
+            "deployment": deployment,
+            "messages": messages,
+            "temperature": temperature
+        },
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# =========================================================
+# CACHE
+# =========================================================
+class LLMCache:
+    """
+    On-disk LLM response cache with TTL expiry and LRU eviction
+    once the entry count or total size cap is exceeded.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL,
+                 max_entries=CACHE_MAX_ENTRIES, max_bytes=None,
+                 enabled=CACHE_ENABLED):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes or int(CACHE_MAX_MB * 1024 * 1024)
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._conn = self._connect()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        # Several app processes share one cache file
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed "
+            "ON llm_cache (accessed)"
+        )
+        conn.commit()
+        return conn
+
+    def get(self, key, bypass=False):
+        if not self.enabled:
+            return None
+        if bypass:
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created = row
+            if self.ttl and now - created > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if not self.enabled or value is None:
+            return
+
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.ttl:
+            cur = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,)
+            )
+            self.evictions += cur.rowcount
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until both caps are met
+        rows = self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY accessed ASC"
+        ).fetchall()
+        stale = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def delete(self, key):
+        # Used to drop responses that turned out to be unusable
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        entries, total = 0, 0
+        if self.enabled:
+            with self._lock:
+                entries, total = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+                ).fetchone()
+
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": total
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """
+    Process-wide cache instance configured from the environment.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
@@ -0,0 +1,68 @@
+import threading
+from collections import deque
+
+# Samples kept per metric for percentile summaries
+WINDOW = 1000
+
+
+class LatencyStats:
+    """
+    Rolling window of observations (seconds) with percentile summary.
+    """
+
+    def __init__(self, window=WINDOW):
+        self._values = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def observe(self, value):
+        with self._lock:
+            self._values.append(value)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            values = sorted(self._values)
+            last = self._values[-1] if self._values else None
+        if not values:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "last": round(last, 4),
+            "mean": round(sum(values) / len(values), 4),
+            "p50": round(percentile(values, 50), 4),
+            "p95": round(percentile(values, 95), 4),
+            "p99": round(percentile(values, 99), 4)
+        }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_stats(name):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = LatencyStats()
+        return _registry[name]
+
+
+def observe(name, value):
+    get_stats(name).observe(value)
+
+
+def summary(name=None):
+    if name is not None:
+        return get_stats(name).summary()
+    with _registry_lock:
+        names = list(_registry)
+    return {n: get_stats(n).summary() for n in names}
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import secrets
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+from common import metrics
+
+# =========================================================
+# CONFIGURATION
+# =========================================================
+# JSON lines file for finished spans (OTLP/JSON span layout); unset = no export
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "insurance-suite")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    @property
+    def seconds(self):
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def add(self, **attributes):
+        # Numeric values accumulate, e.g. tokens from several LLM calls
+        with self._lock:
+            for key, value in attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) \
+                        and isinstance(self.attributes.get(key), (int, float)):
+                    self.attributes[key] += value
+                else:
+                    self.attributes[key] = value
+
+    def to_otlp(self):
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": k, "value": value(v)} for k, v in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """
+    All stages of one request; summarized into per-stage timings.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self):
+        """
+        {stage: {"seconds", "calls", plus summed numeric attributes}}
+        """
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span.name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += span.seconds
+            stage["calls"] += 1
+            for key, value in span.attributes.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    stage[key] = stage.get(key, 0) + value
+        return stages
+
+    def total(self, key):
+        # record() only touches the innermost stage, so this never double counts
+        return sum(stage.get(key, 0) for stage in self.summary().values())
+
+
+def _export(span):
+    if not TRACE_EXPORT_PATH:
+        return
+    record = {
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+        ]},
+        "span": span.to_otlp()
+    }
+    line = json.dumps(record) + "\n"
+    with _export_lock:
+        directory = os.path.dirname(os.path.abspath(TRACE_EXPORT_PATH))
+        os.makedirs(directory, exist_ok=True)
+        with open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# =========================================================
+# PUBLIC API
+# =========================================================
+@contextmanager
+def start_trace(name, **attributes):
+    """
+    Root of a request. Yields the Trace so callers can read stage timings.
+    """
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    try:
+        with trace_stage(name, **attributes):
+            yield trace
+    finally:
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def trace_stage(name, **attributes):
+    """
+    Times a stage; nested stages and record() calls attach to it.
+    """
+    parent = _current_span.get()
+    trace = _current_trace.get()
+    trace_id = parent.trace_id if parent else trace.trace_id if trace else secrets.token_hex(16)
+    span = Span(name, trace_id, parent.span_id if parent else None, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if trace is not None:
+            trace.add(span)
+        metrics.observe(f"stage.{name}", span.seconds)
+        _export(span)
+
+
+def traced(name):
+    """
+    Decorator form of trace_stage.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(**attributes):
+    """
+    Adds attributes (tokens, cache hits, ...) to the current stage, if any.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.add(**attributes)
+
+
+def record_usage(usage):
+    if usage is not None:
+        record(
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0
+        )
+
+
+def submit(executor, fn, *args, **kwargs):
+    """
+    executor.submit that carries the current trace into the worker thread.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
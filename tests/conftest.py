@@ -0,0 +1,18 @@
+import os
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The bots import their modules by bare name, as when run from their folders
+for path in (
+    ROOT_DIR,
+    os.path.join(ROOT_DIR, "Claim_Bot"),
+    os.path.join(ROOT_DIR, "Qoute_Comparison_Bot"),
+    os.path.join(ROOT_DIR, "underwriting-assistant")
+):
+    if path not in sys.path:
+        sys.path.append(path)
+
+# claims_core creates its log directory on import
+os.environ.setdefault("CLAIM_LOG_DIR", tempfile.mkdtemp(prefix="claim-logs-"))
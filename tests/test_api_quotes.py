@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+import pytest
+
+# The server module reads its configuration at import; keep its
+# defaults out of the environment the other tests see
+environ = dict(os.environ)
+for name, value in {
+    "AZURE_OPENAI_API_KEY": "test", "AZURE_OPENAI_ENDPOINT": "http://127.0.0.1:9",
+    "AZURE_OPENAI_API_VERSION": "2024-02-01", "AZURE_OPENAI_DEPLOYMENT": "gpt",
+    "MEMORY_STORE_PATH": os.path.join(tempfile.mkdtemp(prefix="sessions-"), "chat_sessions.sqlite3")
+}.items():
+    os.environ.setdefault(name, value)
+
+from starlette.testclient import TestClient
+
+from api import server
+
+os.environ.clear()
+os.environ.update(environ)
+
+QUOTES = [
+    {"quote_id": "Q1", "annual_premium": 12000, "sum_insured": 500000, "deductible": 5000},
+    {"quote_id": "Q2", "annual_premium": 18000, "sum_insured": 1000000, "deductible": 0}
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    # No lifespan: the quote comparison needs no warm-up
+    return TestClient(server.app)
+
+
+def compare(client, **body):
+    return client.post("/quotes/compare", json=dict({"quotes": QUOTES, "user_profile": {"family_size": 4}}, **body))
+
+
+def test_valid_comparison(client):
+    response = compare(client, weights="budget")
+    assert response.status_code == 200
+    assert set(response.json()["scores"]) == {"Q1", "Q2"}
+    assert compare(client, weights={"premium_weight": 2}).status_code == 200
+
+
+@pytest.mark.parametrize("body", [
+    {"user_profile": {}},
+    {"user_profile": {"family_size": 0}},
+    {"quotes": []},
+    {"quotes": [{"quote_id": "Q1", "annual_premium": 12000}]},
+    {"quotes": [QUOTES[0], QUOTES[0]]},
+    {"weights": "nope"},
+    {"weights": {"premium_scale": 0}},
+    {"weights": {"unknown": 1}},
+])
+def test_invalid_comparison_is_rejected(client, body):
+    response = compare(client, **body)
+    assert response.status_code == 422
+    assert response.json()["error"] == "Invalid request"
+
+
+def test_invalid_question_is_rejected(client):
+    response = client.post("/quotes/ask", json={"question": "Which is best?", "quotes": [], "user_profile": {"family_size": 2}})
+    assert response.status_code == 422
@@ -0,0 +1,93 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from audit_store import SqliteAuditStore, CsvAuditStore, BASE_COLUMNS
+
+REQUIRED = BASE_COLUMNS
+
+
+def row(event_id, claim_type="Health"):
+    return {
+        "timestamp": "2026-01-01 10:00:00", "claim_type": claim_type,
+        "decision": "REJECTED", "appeal_score": 0.4, "human_review": False,
+        "event_id": event_id
+    }
+
+
+@pytest.fixture(params=["sqlite", "csv"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SqliteAuditStore(str(tmp_path / "audit_log.sqlite3"))
+    else:
+        store = CsvAuditStore(str(tmp_path / "audit_log.csv"))
+    yield store
+    store.flush()
+
+
+def reviews(store):
+    df = store.query(limit=10)
+    return dict(zip(df["claim_type"], df["human_review"].astype(bool)))
+
+
+def test_set_review_updates_only_the_matching_row(store):
+    store.append(row("a", "Health"))
+    store.append(row("b", "Motor"))
+    store.set_review("b", True)
+    store.flush()
+    assert reviews(store) == {"Health": False, "Motor": True}
+
+    store.set_review("b", False)
+    store.flush()
+    assert reviews(store) == {"Health": False, "Motor": False}
+
+
+def test_review_queued_with_its_row_is_applied(tmp_path):
+    store = SqliteAuditStore(str(tmp_path / "audit_log.sqlite3"), batch_size=100)
+    store.append(row("a"))
+    store.set_review("a", True)
+    store.flush()
+    assert reviews(store) == {"Health": True}
+    assert "event_id" not in store.query().columns
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows).to_csv(path, index=False, mode="a", header=not os.path.exists(path))
+
+
+def test_migration_imports_each_csv_row_once(tmp_path):
+    store = SqliteAuditStore(str(tmp_path / "audit_log.sqlite3"))
+    csv_path = str(tmp_path / "audit_logs.csv")
+    write_csv(csv_path, [dict(row(None), event_id=None) for _ in range(3)])
+
+    assert store.migrate_csv(csv_path, REQUIRED, chunksize=2) == 3
+    assert store.migrate_csv(csv_path, REQUIRED) == 0
+    write_csv(csv_path, [dict(row(None, "Motor"), event_id=None)])
+    assert store.migrate_csv(csv_path, REQUIRED) == 1
+    assert store.count() == 4
+
+
+def test_interrupted_migration_leaves_nothing_behind(tmp_path, monkeypatch):
+    store = SqliteAuditStore(str(tmp_path / "audit_log.sqlite3"))
+    csv_path = str(tmp_path / "audit_logs.csv")
+    write_csv(csv_path, [dict(row(None), event_id=None) for _ in range(5)])
+
+    insert = store._insert
+    calls = []
+
+    def crash_on_second_chunk(conn, rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("disk I/O error")
+        insert(conn, rows)
+
+    monkeypatch.setattr(store, "_insert", crash_on_second_chunk)
+    with pytest.raises(sqlite3.OperationalError):
+        store.migrate_csv(csv_path, REQUIRED, chunksize=2)
+    assert store.count() == 0
+
+    monkeypatch.setattr(store, "_insert", insert)
+    assert store.migrate_csv(csv_path, REQUIRED, chunksize=2) == 5
+    assert store.count() == 5
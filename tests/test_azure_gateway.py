@@ -0,0 +1,176 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from openai import AzureOpenAI
+
+from common import azure_gateway
+
+REQUEST = {"model": "gpt", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+
+
+def client():
+    return AzureOpenAI(api_key="x", azure_endpoint="http://127.0.0.1:1", api_version="2024-02-01")
+
+
+def test_coalesce_key_includes_client_options():
+    base = client()
+    assert azure_gateway._coalesce_key(base, REQUEST) == azure_gateway._coalesce_key(client(), REQUEST)
+    assert azure_gateway._coalesce_key(base, REQUEST) != azure_gateway._coalesce_key(
+        base.with_options(timeout=5), REQUEST
+    )
+    assert azure_gateway._coalesce_key(base, dict(REQUEST, stream=True)) is None
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = azure_gateway.TokenBucket(600)
+    monkeypatch.setattr(azure_gateway, "_tokens_bucket", bucket)
+    monkeypatch.setattr(azure_gateway, "_requests_bucket", azure_gateway.TokenBucket(0))
+    return bucket
+
+
+def generation(total_tokens):
+    message = AIMessage(content="ok", usage_metadata={
+        "input_tokens": total_tokens - 20, "output_tokens": 20, "total_tokens": total_tokens
+    })
+    return LLMResult(generations=[[ChatGeneration(message=message)]])
+
+
+def test_langchain_reservation_is_settled_with_reported_usage(bucket):
+    azure_gateway.langchain_rate_limiter().acquire()
+    assert bucket.tokens == pytest.approx(600 - azure_gateway.EXPECTED_COMPLETION_TOKENS, abs=1)
+
+    azure_gateway.langchain_usage_handler().on_llm_end(generation(120))
+    assert bucket.tokens == pytest.approx(600 - 120, abs=1)
+
+
+def test_langchain_token_usage_fallback_and_errors(bucket):
+    limiter, handler = azure_gateway.langchain_rate_limiter(), azure_gateway.langchain_usage_handler()
+
+    limiter.acquire()
+    handler.on_llm_end(LLMResult(generations=[[]], llm_output={"token_usage": {"total_tokens": 90}}))
+    assert bucket.tokens == pytest.approx(600 - 90, abs=1)
+
+    limiter.acquire()
+    handler.on_llm_error(RuntimeError("timeout"))
+    assert bucket.tokens == pytest.approx(600 - 90, abs=1)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """
+    Just enough of AzureOpenAI for the gateway; create() is replaced per test.
+    """
+
+    def __init__(self, create):
+        self.base_url, self.timeout, self.max_retries = "http://fake", 5, 0
+        self.default_headers, self.default_query = {}, {}
+        self.calls = []
+
+        def record(**kwargs):
+            self.calls.append(kwargs)
+            return create(**kwargs)
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=record))
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def streamed(total_tokens=None):
+    usage = SimpleNamespace(total_tokens=total_tokens) if total_tokens else None
+    return FakeStream([chunk("Approved, "), chunk("within policy."), chunk(usage=usage)])
+
+
+def test_stream_reservation_is_settled_with_final_usage(bucket):
+    client = FakeClient(lambda **kwargs: streamed(total_tokens=80))
+    stream = azure_gateway.chat_completion(client=client, stream=True, **REQUEST)
+
+    assert client.calls[0]["stream_options"] == {"include_usage": True}
+    # The usage chunk the gateway asked for is not passed on
+    assert [c.choices[0].delta.content for c in stream] == ["Approved, ", "within policy."]
+    assert bucket.tokens == pytest.approx(600 - 80, abs=1)
+    stream.close()
+    assert bucket.tokens == pytest.approx(600 - 80, abs=1)
+
+
+def test_stream_without_usage_is_settled_when_closed(bucket):
+    client = FakeClient(lambda **kwargs: streamed())
+    estimate = azure_gateway.estimate_tokens(REQUEST)
+    prompt = estimate - azure_gateway.EXPECTED_COMPLETION_TOKENS
+
+    stream = azure_gateway.chat_completion(client=client, stream=True, **REQUEST)
+    assert bucket.tokens == pytest.approx(600 - estimate, abs=1)
+    next(stream)
+    stream.close()
+    assert stream._stream.closed
+    assert bucket.tokens == pytest.approx(600 - prompt - len("Approved, ") // 4, abs=1)
+
+
+def test_async_stream_reservation_is_settled(bucket):
+    async def create(**kwargs):
+        return streamed(total_tokens=70)
+
+    async def consume():
+        stream = await azure_gateway.chat_completion_async(
+            client=FakeClient(create), stream=True, stream_options={"include_usage": True}, **REQUEST
+        )
+        # Requested by the caller, so the usage chunk is theirs
+        return [c async for c in stream]
+
+    assert len(asyncio.run(consume())) == 3
+    assert bucket.tokens == pytest.approx(600 - 70, abs=1)
+
+
+def test_follower_takes_over_when_leader_is_cancelled(monkeypatch):
+    monkeypatch.setattr(azure_gateway, "_tokens_bucket", azure_gateway.TokenBucket(0))
+    monkeypatch.setattr(azure_gateway, "_requests_bucket", azure_gateway.TokenBucket(0))
+
+    async def main():
+        release = asyncio.Event()
+
+        async def create(**kwargs):
+            if len(client.calls) == 1:
+                await asyncio.sleep(3600)
+            await release.wait()
+            return SimpleNamespace(usage=None, answer="ok")
+
+        client = FakeClient(create)
+        leader = asyncio.create_task(azure_gateway.chat_completion_async(client=client, **REQUEST))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(azure_gateway.chat_completion_async(client=client, **REQUEST)) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*followers)
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return client, results
+
+    client, results = asyncio.run(main())
+    assert [r.answer for r in results] == ["ok"] * 3
+    # One request for the cancelled leader, one for the follower that took over
+    assert len(client.calls) == 2
@@ -0,0 +1,85 @@
+import json
+import asyncio
+
+import pytest
+
+import batch_underwriting
+from schemas import UnderwritingResult
+
+
+async def fake_assess(record):
+    if record["applicant"].get("fail"):
+        raise ValueError("unusable response")
+    return UnderwritingResult(
+        risk_level="Low", risk_score=10, key_risk_factors=[],
+        underwriting_summary="ok", recommendation="Standard"
+    )
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    return str(path)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_retry_file_can_be_rerun_as_input(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_underwriting, "assess", fake_assess)
+    source = write_jsonl(tmp_path / "portfolio.jsonl", [
+        {"id": "1", "applicant": {}, "claims": [], "external": {}},
+        {"id": "2", "applicant": {"fail": True}, "claims": [], "external": {}}
+    ])
+    output = str(tmp_path / "results.jsonl")
+    retry_path = str(tmp_path / "results.retry.jsonl")
+
+    assert asyncio.run(batch_underwriting.run_batch(source, output, 2)) == 1
+    assert [r["id"] for r in read_jsonl(retry_path)] == ["2"]
+
+    # Same output name: the retry file is both the input and the target
+    assert asyncio.run(batch_underwriting.run_batch(retry_path, output, 2)) == 1
+    assert [r["id"] for r in read_jsonl(retry_path)] == ["2"]
+
+
+def test_record_missing_a_field_goes_to_the_retry_file(tmp_path, monkeypatch):
+    async def analysis(*inputs):
+        return "{}", []
+
+    async def parse(raw, messages):
+        return await fake_assess({"applicant": {}})
+
+    monkeypatch.setattr(batch_underwriting, "run_underwriting_analysis_async", analysis)
+    monkeypatch.setattr(batch_underwriting, "parse_result_async", parse)
+    source = write_jsonl(tmp_path / "portfolio.jsonl", [
+        {"id": "1", "applicant": {}, "claims": [], "external": {}},
+        {"id": "2", "applicant": {}}
+    ])
+
+    assert asyncio.run(batch_underwriting.run_batch(source, str(tmp_path / "results.jsonl"), 2)) == 1
+    failed, = read_jsonl(tmp_path / "results.retry.jsonl")
+    assert failed["id"] == "2" and failed["error"] == "ValueError: record is missing claims, external"
+
+
+def test_malformed_line_stops_the_run_with_its_line_number(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(batch_underwriting, "assess", fake_assess)
+    source = tmp_path / "portfolio.jsonl"
+    records = [{"id": str(n), "applicant": {}, "claims": [], "external": {}} for n in range(1, 4)]
+    source.write_text(
+        "".join(json.dumps(r) + "\n" for r in records) + '{"id": "4", "applicant": \n',
+        encoding="utf-8"
+    )
+    output = str(tmp_path / "results.jsonl")
+
+    async def run():
+        with pytest.raises(ValueError, match="line 4: invalid JSON"):
+            await batch_underwriting.run_batch(str(source), output, 2)
+        # No worker is left waiting for a record that never comes
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(run()) == set()
+
+    source.write_text('["not", "an", "object"]\n', encoding="utf-8")
+    assert batch_underwriting.main([str(source), "--output", output]) == 2
+    assert f"{source}, line 1: expected a JSON object" in capsys.readouterr().err
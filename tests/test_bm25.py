@@ -0,0 +1,37 @@
+import json
+
+from common.bm25 import BM25Index, tokenize, save_index, load_index
+
+DOCS = [
+    "Room rent is capped at 1% of the sum insured per day.",
+    "Pre-existing diseases are covered after a waiting period of 48 months.",
+    "Cataract surgery is covered up to Rs 40,000 per eye.",
+]
+
+
+def test_tokenize_drops_stopwords_and_keeps_clause_numbers():
+    assert tokenize("What is the waiting period in Section 4.1.2?") == ["waiting", "period", "section", "4.1.2"]
+
+
+def test_search_ranks_matching_documents_only():
+    index = BM25Index([tokenize(doc) for doc in DOCS])
+    ranked = index.search(tokenize("cataract surgery limit"))
+    assert [doc_id for doc_id, _ in ranked] == [2]
+
+
+def test_dict_round_trip_keeps_scores():
+    index = BM25Index([tokenize(doc) for doc in DOCS])
+    # As written to disk: postings become lists
+    restored = BM25Index.from_dict(json.loads(json.dumps(index.to_dict())))
+    query = tokenize("room rent sum insured waiting period")
+    assert len(restored) == len(index)
+    assert restored.idf == index.idf
+    assert restored.scores(query) == index.scores(query)
+
+
+def test_save_and_load_with_extras(tmp_path):
+    path = str(tmp_path / "bm25.json")
+    save_index(path, BM25Index([tokenize(doc) for doc in DOCS]), texts=DOCS)
+    index, extras = load_index(path)
+    assert extras == {"texts": DOCS}
+    assert index.search(tokenize("pre-existing diseases"))[0][0] == 1
@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from types import SimpleNamespace
+
+import pytest
+
+import claims_core
+
+
+class NoCache:
+    def get(self, key, bypass=False):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.timeouts = []
+
+    def with_options(self, timeout=None, max_retries=None):
+        self.timeouts.append(timeout)
+        return self
+
+
+class SlowSlots:
+    """
+    LLM slots that take wait seconds to acquire.
+    """
+
+    def __init__(self, wait):
+        self.wait = wait
+
+    def __enter__(self):
+        time.sleep(self.wait)
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeStream:
+    def __init__(self, parts):
+        self.chunks = [
+            SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+            for part in parts
+        ]
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client, sent = FakeClient(), []
+    monkeypatch.setattr(claims_core, "get_llm_cache", NoCache)
+    monkeypatch.setattr(claims_core.azure_gateway, "get_client", lambda: client)
+    monkeypatch.setattr(
+        claims_core.azure_gateway, "chat_completion",
+        lambda **kwargs: sent.append(kwargs) or FakeStream(["Denied ", "as excluded."])
+    )
+    client.sent = sent
+    return client
+
+
+def test_stream_request_timeout_is_what_is_left_of_the_deadline(client, monkeypatch):
+    monkeypatch.setattr(claims_core, "_llm_slots", SlowSlots(0.2))
+    assert "".join(claims_core.stream_llm("Explain", timeout=1.0)) == "Denied as excluded."
+    timeout, = client.timeouts
+    assert 0.7 < timeout <= 0.8
+
+
+def test_stream_is_not_sent_once_the_slot_wait_used_up_the_deadline(client, monkeypatch):
+    monkeypatch.setattr(claims_core, "_llm_slots", SlowSlots(0.2))
+    with pytest.raises(FutureTimeout):
+        list(claims_core.stream_llm("Explain", timeout=0.1))
+    assert client.sent == []
+
+
+def test_stream_without_timeout_uses_the_shared_client(client):
+    assert list(claims_core.stream_llm("Explain")) == ["Denied ", "as excluded."]
+    assert client.timeouts == [] and len(client.sent) == 1
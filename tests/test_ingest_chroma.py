@@ -0,0 +1,130 @@
+import pytest
+import langchain_community.document_loaders as loaders
+from langchain_core.documents import Document
+
+from rag import ingest_chroma
+
+
+class FakeStore:
+    """
+    The slice of the Chroma API ingestion uses, over a dict.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self._collection = self
+
+    def get(self, where=None, include=None):
+        clauses = where.get("$and", [where]) if where else []
+        ids = [
+            cid for cid, (_, metadata) in self.docs.items()
+            if all(metadata.get(k) == v for clause in clauses for k, v in clause.items())
+        ]
+        return {
+            "ids": ids,
+            "documents": [self.docs[cid][0] for cid in ids],
+            "metadatas": [self.docs[cid][1] for cid in ids]
+        }
+
+    def add_texts(self, texts, metadatas, ids):
+        for cid, text, metadata in zip(ids, texts, metadatas):
+            self.docs[cid] = (text, dict(metadata))
+
+    def update(self, ids, metadatas):
+        for cid, metadata in zip(ids, metadatas):
+            self.docs[cid] = (self.docs[cid][0], dict(metadata))
+
+    def delete(self, ids):
+        for cid in ids:
+            self.docs.pop(cid, None)
+
+    def texts(self, quote_id):
+        return sorted(t for t, m in self.docs.values() if m["quote_id"] == quote_id)
+
+
+class TextLoader:
+    # Stands in for PyPDFLoader: one page per blank-line separated block
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            pages = [p.strip() for p in f.read().split("\n\n") if p.strip()]
+        return [Document(page_content=page, metadata={"page": i}) for i, page in enumerate(pages)]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(ingest_chroma, "open_vectorstore", lambda: store)
+    monkeypatch.setattr(ingest_chroma, "CHROMA_DB_DIR", str(tmp_path))
+    monkeypatch.setattr(loaders, "PyPDFLoader", TextLoader)
+    return store
+
+
+def write(path, *pages):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n\n".join(pages), encoding="utf-8")
+    return str(path)
+
+
+def policy(path, quote_id):
+    return {"path": path, "quote_id": quote_id, "policy_name": quote_id}
+
+
+def test_changed_pdf_replaces_only_its_stale_chunks(store, tmp_path):
+    path = write(tmp_path / "q1.pdf", "Room rent capped.", "Cataract covered.")
+    ingest_chroma.ingest([policy(path, "Q1")], workers=1)
+
+    write(tmp_path / "q1.pdf", "Room rent capped.", "Cataract excluded.")
+    ingest_chroma.ingest([policy(path, "Q1")], workers=1)
+
+    assert store.texts("Q1") == ["Cataract excluded.", "Room rent capped."]
+
+
+def test_same_pdf_under_several_quotes_keeps_every_quote(store, tmp_path):
+    path = write(tmp_path / "shared.pdf", "Room rent capped.", "Cataract covered.")
+    policies = [policy(path, "Q1"), policy(path, "Q2")]
+
+    ingest_chroma.ingest(policies, workers=1)
+    ingest_chroma.ingest([dict(p) for p in policies], workers=1)
+
+    assert store.texts("Q1") == store.texts("Q2") == ["Cataract covered.", "Room rent capped."]
+
+
+def test_same_file_name_in_other_folder_is_left_alone(store, tmp_path):
+    first = write(tmp_path / "a" / "policy.pdf", "Grace period 30 days.")
+    second = write(tmp_path / "b" / "policy.pdf", "Grace period 15 days.")
+    ingest_chroma.ingest([policy(first, "Q1")], workers=1)
+    ingest_chroma.ingest([policy(second, "Q1")], workers=1)
+
+    write(tmp_path / "b" / "policy.pdf", "Grace period 20 days.")
+    ingest_chroma.ingest([policy(second, "Q1")], workers=1)
+
+    assert store.texts("Q1") == ["Grace period 20 days.", "Grace period 30 days."]
+
+
+def test_unchanged_pdf_is_skipped(store, tmp_path, capsys):
+    path = write(tmp_path / "q1.pdf", "Room rent capped.")
+    ingest_chroma.ingest([policy(path, "Q1")], workers=1)
+    ingest_chroma.ingest([policy(path, "Q1")], workers=1)
+
+    assert "Unchanged: q1.pdf (Q1)" in capsys.readouterr().out
+    assert store.texts("Q1") == ["Room rent capped."]
+
+
+def test_pdf_is_unchanged_again_after_one_change(store, tmp_path, capsys, monkeypatch):
+    path = write(tmp_path / "q1.pdf", "Room rent capped.", "Cataract covered.")
+    ingest_chroma.ingest([policy(path, "Q1")], workers=1)
+    write(tmp_path / "q1.pdf", "Room rent capped.", "Cataract excluded.")
+    ingest_chroma.ingest([policy(path, "Q1")], workers=1)
+    capsys.readouterr()
+
+    changes = []
+    monkeypatch.setattr(ingest_chroma, "mark_collection_changed", lambda: changes.append(1))
+    ingest_chroma.ingest([policy(path, "Q1")], workers=1)
+
+    assert "Unchanged: q1.pdf (Q1)" in capsys.readouterr().out
+    assert changes == []
+    sha = ingest_chroma.file_sha256(path)
+    assert all(m["source_sha256"] == sha for _, m in store.docs.values())
@@ -0,0 +1,59 @@
+from langchain_core.documents import Document
+
+from rag.lexical_index import LexicalIndex, clause_numbers, reciprocal_rank_fusion
+
+CHUNKS = [
+    ("Q1", "4.1 Pre-existing Diseases are excluded for the first 48 months."),
+    ("Q1", "Claims under 4.1 need the hospital discharge summary."),
+    ("Q1", "4.1.2 Cataract surgery is covered after 24 months."),
+    ("Q2", "4.1 Pre-existing Diseases are excluded for the first 36 months."),
+    ("Q2", "Room rent is capped at 1% of the sum insured per day."),
+]
+
+
+def make_index():
+    return LexicalIndex(
+        [f"c{i}" for i in range(len(CHUNKS))],
+        [text for _, text in CHUNKS],
+        [{"quote_id": quote_id} for quote_id, _ in CHUNKS]
+    )
+
+
+def test_clause_references_and_quoted_terms_are_lookups():
+    index = make_index()
+    assert index.is_lookup("Section 4.1")
+    assert index.is_lookup("4.1.2")
+    assert index.is_lookup("What does clause 4 say?")
+    assert index.is_lookup('Is "room rent" capped?')
+
+
+def test_decimal_amounts_in_questions_are_not_clause_references():
+    index = make_index()
+    assert clause_numbers("What is the room rent limit for a 5.5 lakh sum insured?") == []
+    assert not index.is_lookup("What is the room rent limit for a 5.5 lakh sum insured?")
+
+
+def test_short_keyword_queries_need_known_terms():
+    index = make_index()
+    assert index.is_lookup("room rent")
+    assert not index.is_lookup("maternity benefit")
+    assert not index.is_lookup("Which quote is best for my family?")
+
+
+def test_search_ranks_clause_headings_first_and_filters_by_quote():
+    index = make_index()
+    found = index.search("Section 4.1", quote_id="Q1", k=2)
+    assert [doc.id for doc in found] == ["c0", "c1"]
+    assert all(doc.metadata["quote_id"] == "Q1" for doc in found)
+
+
+def doc(quote_id, text):
+    return Document(page_content=text, metadata={"quote_id": quote_id})
+
+
+def test_reciprocal_rank_fusion_merges_duplicates():
+    a, b, c = doc("Q1", "a"), doc("Q1", "b"), doc("Q2", "a")
+    fused = reciprocal_rank_fusion([[a, b], [doc("Q1", "b"), c]], k=3)
+    # b is ranked by both lists; same text under another quote stays separate
+    assert [(d.metadata["quote_id"], d.page_content) for d in fused] == [("Q1", "b"), ("Q1", "a"), ("Q2", "a")]
+    assert len(reciprocal_rank_fusion([[a, b], [c]], k=1)) == 1
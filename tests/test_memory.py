@@ -0,0 +1,153 @@
+import time
+import sqlite3
+from contextlib import closing
+
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+
+from llm.memory import (
+    SessionMemory, WindowedChatHistory, SUMMARY_PREFIX, _message_tokens, _summary_executor
+)
+
+
+def turn(question, answer):
+    return [HumanMessage(content=question), AIMessage(content=answer)]
+
+
+def contents(history):
+    return [m.content for m in history.messages]
+
+
+def test_shared_store_reloads_sessions_written_by_another_worker(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SessionMemory(store_path=path, shared=True)
+    second = SessionMemory(store_path=path, shared=True)
+
+    first.get("s1").add_messages(turn("Which quote is best?", "Q2"))
+    assert contents(second.get("s1")) == ["Which quote is best?", "Q2"]
+
+    second.get("s1").add_messages(turn("Why?", "Lowest deductible"))
+    assert contents(first.get("s1")) == ["Which quote is best?", "Q2", "Why?", "Lowest deductible"]
+
+
+def test_unshared_memory_keeps_its_own_copy(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first = SessionMemory(store_path=path, shared=False)
+    second = SessionMemory(store_path=path, shared=False)
+
+    first.get("s1")
+    second.get("s1").add_messages(turn("Which quote is best?", "Q2"))
+    assert contents(first.get("s1")) == []
+
+
+def stored_sessions(path):
+    with closing(sqlite3.connect(path)) as conn:
+        return [row[0] for row in conn.execute("SELECT session_id FROM chat_sessions")]
+
+
+def test_expired_sessions_are_not_reloaded_and_get_purged(tmp_path, monkeypatch):
+    path = str(tmp_path / "sessions.sqlite3")
+    memory = SessionMemory(store_path=path, ttl=60, purge_interval=300)
+    memory.get("old").add_messages(turn("Which quote is best?", "Q2"))
+
+    # Two minutes later, in another process
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert memory.store.load("old", ttl=60) is None
+    assert memory.store.load("old") is not None
+    restarted = SessionMemory(store_path=path, ttl=60, purge_interval=300)
+    assert contents(restarted.get("fresh")) == []
+    assert stored_sessions(path) == []
+
+    restarted.get("fresh").add_messages(turn("Why?", "Lowest deductible"))
+    assert contents(SessionMemory(store_path=path, ttl=60).get("fresh")) == ["Why?", "Lowest deductible"]
+
+
+def test_store_is_purged_at_most_once_per_interval(tmp_path, monkeypatch):
+    memory = SessionMemory(store_path=str(tmp_path / "sessions.sqlite3"), purge_interval=300)
+    purged = []
+    monkeypatch.setattr(memory.store, "purge", purged.append)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+
+    memory.get("s1")
+    memory.get("s2")
+    clock[0] += 301
+    memory.get("s1")
+    assert purged == [memory.ttl, memory.ttl]
+
+
+TURNS = [
+    turn("Which quote is best?", "Q2, for its lower deductible."),
+    turn("Does Q2 cover maternity?", "Yes, after a two-year waiting period."),
+    turn("What is the room rent cap?", "1% of the sum insured per day."),
+    turn("And for Q1?", "Q1 has no room rent cap."),
+]
+
+
+def contents_of(turns):
+    return [m.content for t in turns for m in t]
+
+
+def window_for(turns):
+    return sum(_message_tokens(m) for t in turns for m in t)
+
+
+def wait_for_summaries(history):
+    # One summary worker: a no-op queued behind it runs once it is idle
+    while True:
+        _summary_executor.submit(lambda: None).result()
+        with history._lock:
+            if not history._summarizing:
+                return
+
+
+def test_overflow_folds_older_turns_into_the_summary():
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append([m.content for m in messages])
+        return " | ".join(filter(None, [previous] + [m.content for m in messages]))
+
+    # Room for the last two turns only
+    history = WindowedChatHistory("s1", summarize=summarize, max_tokens=window_for(TURNS[2:]))
+    for t in TURNS:
+        history.add_messages(t)
+        wait_for_summaries(history)
+
+    older = contents_of(TURNS[:2])
+    assert [content for batch in calls for content in batch] == older
+    assert history.summary == " | ".join(older)
+
+    summary, *recent = history.messages
+    assert isinstance(summary, SystemMessage)
+    assert summary.content == SUMMARY_PREFIX + " | ".join(older)
+    assert recent == TURNS[2] + TURNS[3]
+    assert [m["data"]["content"] for m in history.to_record()["messages"]] == contents_of(TURNS[2:])
+
+
+def test_failed_summary_keeps_turns_verbatim_until_it_succeeds():
+    attempts = []
+
+    def summarize(previous, messages):
+        attempts.append(len(messages))
+        if len(attempts) == 1:
+            raise RuntimeError("model unavailable")
+        return "summary"
+
+    history = WindowedChatHistory("s1", summarize=summarize, max_tokens=window_for(TURNS[3:]))
+    history.add_messages(TURNS[0])
+    history.add_messages(TURNS[1])
+    wait_for_summaries(history)
+    assert history.summary == "" and contents(history) == contents_of(TURNS[:2])
+
+    history.add_messages(TURNS[2])
+    wait_for_summaries(history)
+    assert attempts == [2, 4]
+    assert contents(history) == [SUMMARY_PREFIX + "summary"] + contents_of(TURNS[2:3])
+
+
+def test_without_summarizer_the_window_slides():
+    history = WindowedChatHistory("s1", max_tokens=window_for(TURNS[3:]))
+    for t in TURNS:
+        history.add_messages(t)
+    assert history.messages == TURNS[3]
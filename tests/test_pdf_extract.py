@@ -0,0 +1,83 @@
+import pytest
+
+import pdf_extract
+
+
+def make_pdf(pages):
+    """
+    Minimal PDF with one line of Helvetica text per page.
+    """
+    count = len(pages)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(count))
+    font = 3 + 2 * count
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", f"<< /Type /Pages /Kids [{kids}] /Count {count} >>"]
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+PAGES = [f"Page {n} of the claim report" for n in range(1, 6)]
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    # No process pool, and an empty cache for every test
+    monkeypatch.setattr(pdf_extract, "PDF_WORKERS", 1)
+    monkeypatch.setattr(pdf_extract, "_cache", type(pdf_extract._cache)())
+
+
+def test_whole_document_is_extracted():
+    result = pdf_extract.extract_pdf(make_pdf(PAGES))
+    assert result["text"].splitlines() == PAGES
+    assert (result["pages"], result["total_pages"], result["truncated"]) == (5, 5, False)
+
+
+def test_first_pages_truncates():
+    result = pdf_extract.extract_pdf(make_pdf(PAGES), first_pages=2)
+    assert result["text"].splitlines() == PAGES[:2]
+    assert (result["pages"], result["total_pages"], result["truncated"]) == (2, 5, True)
+
+    # A limit beyond the document is not a truncation
+    result = pdf_extract.extract_pdf(make_pdf(PAGES), first_pages=9)
+    assert (result["pages"], result["truncated"]) == (5, False)
+
+
+def test_large_documents_fall_back_to_fast_mode(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "MAX_PDF_PAGES", 4)
+    monkeypatch.setattr(pdf_extract, "FAST_MODE_PAGES", 3)
+    result = pdf_extract.extract_pdf(make_pdf(PAGES))
+    assert result["text"].splitlines() == PAGES[:3]
+    assert (result["pages"], result["total_pages"], result["truncated"]) == (3, 5, True)
+
+
+def test_cache_is_keyed_on_content_and_page_limit(monkeypatch):
+    data = make_pdf(PAGES)
+    calls = []
+    extract = pdf_extract._iter_pages
+    monkeypatch.setattr(pdf_extract, "_iter_pages", lambda *args: calls.append(args[1]) or extract(*args))
+
+    first = pdf_extract.extract_pdf(data)
+    assert pdf_extract.extract_pdf(bytes(data)) is first
+    assert pdf_extract.extract_pdf(data, first_pages=2)["pages"] == 2
+    assert pdf_extract.extract_pdf(make_pdf(PAGES[:4]))["total_pages"] == 4
+    assert calls == [5, 2, 4]
+    assert set(pdf_extract._cache) == {
+        (first["sha256"], None), (first["sha256"], 2),
+        (pdf_extract.extract_pdf(make_pdf(PAGES[:4]))["sha256"], None)
+    }
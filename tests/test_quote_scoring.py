@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from logic.quote_comparison import compare_quotes
+from logic.quote_scoring import rank_quotes, score_matrix, top_k
+
+
+def original_compare_quotes(quotes, user_profile):
+    # compare_quotes as it was before the vectorized engine
+    scores = {}
+    for q in quotes:
+        score = 0
+        if user_profile["family_size"] >= 4:
+            score += q["sum_insured"] / 100000
+        score += max(0, (20000 - q["deductible"]) / 1000)
+        score += max(0, (30000 - q["annual_premium"]) / 1000)
+        scores[q["quote_id"]] = round(score, 2)
+    best_quote = max(scores, key=scores.get)
+    return {"best_quote": best_quote, "scores": scores}
+
+
+def random_quotes(rng, n):
+    return [
+        {
+            "quote_id": f"Q{i + 1}",
+            "annual_premium": rng.randrange(8000, 40000),
+            "sum_insured": rng.randrange(2, 50) * 100000,
+            "deductible": rng.randrange(0, 30) * 1000
+        }
+        for i in range(n)
+    ]
+
+
+def test_rank_quotes_matches_the_original_scoring():
+    rng = random.Random(7)
+    for _ in range(500):
+        quotes = random_quotes(rng, rng.randrange(1, 6))
+        profile = {"family_size": rng.randrange(1, 7)}
+        assert rank_quotes(quotes, profile) == original_compare_quotes(quotes, profile)
+        assert compare_quotes(quotes, profile) == original_compare_quotes(quotes, profile)
+
+
+@pytest.mark.parametrize("family_size", [3, 4])
+def test_ties_and_clamped_terms_match(family_size):
+    quotes = [
+        {"quote_id": "Q1", "annual_premium": 45000, "sum_insured": 500000, "deductible": 25000},
+        {"quote_id": "Q2", "annual_premium": 45000, "sum_insured": 500000, "deductible": 25000},
+        {"quote_id": "Q3", "annual_premium": 29999, "sum_insured": 300000, "deductible": 19999}
+    ]
+    profile = {"family_size": family_size}
+    assert rank_quotes(quotes, profile) == original_compare_quotes(quotes, profile)
+
+
+def test_top_k_follows_score_matrix_and_keeps_quote_order_on_ties():
+    quotes = [
+        {"quote_id": "Q1", "annual_premium": 20000, "sum_insured": 300000, "deductible": 5000},
+        {"quote_id": "Q2", "annual_premium": 10000, "sum_insured": 300000, "deductible": 5000},
+        {"quote_id": "Q3", "annual_premium": 20000, "sum_insured": 300000, "deductible": 5000}
+    ]
+    profiles = [{"family_size": 2}, {"family_size": 5}]
+    best = top_k(quotes, profiles, k=2)
+    assert list(best["quote_id"]) == ["Q2", "Q1", "Q2", "Q1"]
+    assert list(best["score"]) == pytest.approx([
+        score_matrix(quotes, profiles)[row, col] for row, col in ((0, 1), (0, 0), (1, 1), (1, 0))
+    ])
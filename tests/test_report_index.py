@@ -0,0 +1,30 @@
+from report_index import ReportIndex, format_passages
+from report_prep import count_tokens
+
+SECTIONS = [
+    "CLAIM SUMMARY\nClaim 4411 for hospitalisation at City Hospital.",
+    "ROOM RENT\nRoom rent charged above the policy room rent cap of 1% of sum insured.",
+    "PHARMACY\nPharmacy bills were settled in full.",
+    "DECISION\nRoom rent excess is not payable; the rest of the claim is approved."
+]
+REPORT = "\n\n".join(SECTIONS)
+
+
+def test_search_returns_best_matches_in_report_order():
+    passages = ReportIndex(REPORT).search("why was room rent not payable", k=2)
+    assert [cid for cid, _ in passages] == ["C2", "C4"]
+    assert format_passages(passages).startswith("[C2] ROOM RENT")
+
+
+def test_search_drops_least_relevant_passages_over_budget():
+    index = ReportIndex(REPORT)
+    question = "why was room rent not payable"
+    (_, best), = index.search(question, k=1)
+
+    passages = index.search(question, k=2, budget=count_tokens(best) + 1)
+    assert [text for _, text in passages] == [best]
+
+
+def test_search_truncates_a_top_match_larger_than_the_budget():
+    (cid, text), = ReportIndex(REPORT).search("room rent cap", k=1, budget=5)
+    assert cid == "C2" and text.startswith("ROOM") and count_tokens(text) <= 5
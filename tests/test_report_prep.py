@@ -0,0 +1,26 @@
+from report_prep import strip_boilerplate
+
+REPORT = """ACME HEALTH INSURANCE
+Claim rejection letter
+Page 1 of 2
+Amount claimed (Rs):
+450
+Hospitalization days:
+3
+- 1 -
+ACME HEALTH INSURANCE
+Reason: pre-existing disease not disclosed.
+Page 2/2
+ACME HEALTH INSURANCE
+12/30
+"""
+
+
+def test_page_markers_are_dropped_but_bare_numbers_kept():
+    lines = strip_boilerplate(REPORT).splitlines()
+    assert "Page 1 of 2" not in lines and "Page 2/2" not in lines and "- 1 -" not in lines
+    assert ["450", "3", "12/30"] == [line for line in lines if line[0].isdigit()]
+
+
+def test_repeated_header_is_kept_once():
+    assert strip_boilerplate(REPORT).count("ACME HEALTH INSURANCE") == 1
@@ -0,0 +1,111 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import response_parser
+import underwriting_ai
+from common.llm_cache import LLMCache, make_key
+
+COMPLETE = {
+    "risk_level": "Medium", "risk_score": 55, "key_risk_factors": ["Late payments"],
+    "underwriting_summary": "Moderate claim history.", "recommendation": "Review income proof."
+}
+MESSAGES = [{"role": "user", "content": "Assess this applicant"}]
+
+
+def test_clean_response_needs_no_repair():
+    data, missing, repaired = response_parser.parse_locally(json.dumps(COMPLETE))
+    assert (data, missing, repaired) == (COMPLETE, [], False)
+
+
+def test_fences_and_trailing_commas_are_repaired():
+    raw = "```json\n" + json.dumps(COMPLETE)[:-1] + ",}\n```"
+    data, missing, repaired = response_parser.parse_locally(raw)
+    assert data == COMPLETE and missing == [] and repaired
+
+
+def test_field_types_are_coerced():
+    raw = json.dumps(dict(
+        COMPLETE, risk_level=" high", risk_score="about 140", key_risk_factors="Smoker"
+    ))
+    data, missing, repaired = response_parser.parse_locally(raw)
+    assert repaired and missing == []
+    assert data["risk_level"] == "High"
+    assert data["risk_score"] == 100
+    assert data["key_risk_factors"] == ["Smoker"]
+
+
+def test_blank_fields_count_as_missing():
+    raw = json.dumps(dict(COMPLETE, recommendation="  ", risk_score="n/a"))
+    _, missing, _ = response_parser.parse_locally(raw)
+    assert missing == ["risk_score", "recommendation"]
+
+
+def test_non_object_is_unrecoverable():
+    with pytest.raises(json.JSONDecodeError):
+        response_parser.parse_locally("[1, 2]")
+
+
+def test_reask_asks_only_for_missing_fields():
+    messages = response_parser.reask_messages(MESSAGES, "{}", ["risk_score"])
+    assert messages[:1] == MESSAGES
+    assert messages[-1]["content"].startswith('Your JSON is missing: "risk_score".')
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMCache(path=str(tmp_path / "llm_cache.sqlite3"), enabled=True)
+    monkeypatch.setattr(underwriting_ai, "get_llm_cache", lambda: cache)
+    return cache
+
+
+def reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_reasked_result_replaces_the_cached_response(cache, monkeypatch):
+    sent = []
+
+    def create_completion(**kwargs):
+        sent.append(kwargs["messages"])
+        return reply(json.dumps({"recommendation": COMPLETE["recommendation"]}))
+
+    monkeypatch.setattr(underwriting_ai, "create_completion", create_completion)
+    key = make_key(underwriting_ai.MODEL, MESSAGES, 0)
+    raw = json.dumps({k: v for k, v in COMPLETE.items() if k != "recommendation"})
+    cache.set(key, raw)
+
+    result = underwriting_ai.parse_result(raw, MESSAGES)
+    assert result.model_dump() == COMPLETE
+    assert sent[0][:1] == MESSAGES
+
+    # A cache hit now parses cleanly, without another re-ask
+    cached = cache.get(key)
+    assert underwriting_ai.parse_result(cached, MESSAGES).model_dump() == COMPLETE
+    assert len(sent) == 1
+
+
+def test_unusable_response_is_dropped_from_the_cache(cache):
+    key = make_key(underwriting_ai.MODEL, MESSAGES, 0)
+    cache.set(key, "not json")
+    with pytest.raises(json.JSONDecodeError):
+        underwriting_ai.parse_result("not json", MESSAGES)
+    assert cache.get(key) is None
+
+
+def test_partial_result_returns_completed_values_and_open_summary_and_list():
+    buffer = '{"risk_level": "High", "risk_score": 72, "underwriting_summary": "Smoker with rec'
+    assert underwriting_ai.parse_partial_result(buffer) == {
+        "risk_level": "High", "risk_score": 72, "underwriting_summary": "Smoker with rec"
+    }
+    buffer = '{"key_risk_factors": ["Smoker", "Age ov'
+    assert underwriting_ai.parse_partial_result(buffer) == {"key_risk_factors": ["Smoker"]}
+    assert underwriting_ai.parse_partial_result('{"recommendation": "Decl') == {}
+
+
+def test_partial_result_is_clamped_and_normalized_like_the_final_one():
+    buffer = '{"risk_level": "high", "risk_score": 140, "underwriting_summary": "'
+    assert underwriting_ai.parse_partial_result(buffer) == {"risk_level": "High", "risk_score": 100}
+    assert underwriting_ai.parse_partial_result('{"risk_score": "-5",') == {"risk_score": 0}
+    assert underwriting_ai.parse_partial_result('{"risk_score": 72.6}') == {"risk_score": 73}
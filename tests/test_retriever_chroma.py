@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.documents import Document
+
+from rag import retriever_chroma
+
+
+class StubStore:
+    """
+    Returns chunks in a fixed similarity order, filtered like Chroma.
+    """
+
+    def __init__(self, ranked):
+        self.ranked = ranked
+        self.calls = []
+
+    def similarity_search_by_vector(self, vector, k, filter):
+        self.calls.append((k, filter))
+        quote_id = filter["quote_id"]
+        allowed = quote_id["$in"] if isinstance(quote_id, dict) else [quote_id]
+        return [doc for doc in self.ranked if doc.metadata["quote_id"] in allowed][:k]
+
+
+def chunks(*quote_ids):
+    return [
+        Document(page_content=f"{quote_id}-{i}", metadata={"quote_id": quote_id})
+        for i, quote_id in enumerate(quote_ids)
+    ]
+
+
+@pytest.fixture
+def use_store(monkeypatch):
+    monkeypatch.setattr(retriever_chroma, "MULTI_QUOTE_OVERFETCH", 2)
+
+    def use(store):
+        monkeypatch.setattr(retriever_chroma, "get_vectorstore", lambda: store)
+        return store
+    return use
+
+
+def texts(grouped):
+    return {quote_id: [doc.page_content for doc in docs] for quote_id, docs in grouped.items()}
+
+
+def test_one_search_grouped_by_quote(use_store):
+    store = use_store(StubStore(chunks("Q1", "Q2", "Q1", "Q2", "Q1", "Q2", "Q1", "Q2")))
+    grouped = retriever_chroma._dense_search([0.0], ["Q1", "Q2"], 2)
+    assert texts(grouped) == {"Q1": ["Q1-0", "Q1-2"], "Q2": ["Q2-1", "Q2-3"]}
+    assert store.calls == [(8, {"quote_id": {"$in": ["Q1", "Q2"]}})]
+
+
+def test_crowded_out_quote_gets_its_own_search(use_store):
+    store = use_store(StubStore(chunks("Q1", "Q1", "Q1", "Q1", "Q1", "Q1", "Q1", "Q1", "Q2", "Q2")))
+    grouped = retriever_chroma._dense_search([0.0], ["Q1", "Q2"], 2)
+    assert texts(grouped) == {"Q1": ["Q1-0", "Q1-1"], "Q2": ["Q2-8", "Q2-9"]}
+    assert store.calls[1:] == [(2, {"quote_id": "Q2"})]
+
+
+def test_short_result_list_means_nothing_more_to_fetch(use_store):
+    store = use_store(StubStore(chunks("Q1", "Q1", "Q1", "Q2")))
+    grouped = retriever_chroma._dense_search([0.0], ["Q1", "Q2", "Q3"], 2)
+    assert texts(grouped) == {"Q1": ["Q1-0", "Q1-1"], "Q2": ["Q2-3"], "Q3": []}
+    assert len(store.calls) == 1
+
+
+def test_single_quote_filters_directly(use_store):
+    store = use_store(StubStore(chunks("Q1", "Q2", "Q1")))
+    grouped = retriever_chroma._dense_search([0.0], ["Q2"], 4)
+    assert texts(grouped) == {"Q2": ["Q2-1"]}
+    assert store.calls == [(4, {"quote_id": "Q2"})]
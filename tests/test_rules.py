@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+
+import rules
+
+THRESHOLDS = {
+    "clean_credit_score": 750, "low_credit_score": 600, "claims_lookback_years": 3,
+    "high_claim_count": 3, "high_claim_total": 250000, "senior_age": 60
+}
+THIS_YEAR = date.today().year
+APPLICANT = {"age": 40}
+
+
+def claims(count, amount=1000, year=THIS_YEAR):
+    return [{"year": year, "claim_amount": amount} for _ in range(count)]
+
+
+def outcome(assessment):
+    if assessment.result is None:
+        return "refer"
+    return {"Low": "accept", "High": "decline"}[assessment.result.risk_level]
+
+
+@pytest.mark.parametrize("applicant, history, external, expected", [
+    # Clean credit score
+    (APPLICANT, [], {"credit_score": 750}, "accept"),
+    (APPLICANT, [], {"credit_score": 749}, "refer"),
+    (APPLICANT, [], {}, "refer"),
+    # Claims lookback
+    (APPLICANT, claims(1, year=THIS_YEAR - 4), {"credit_score": 800}, "accept"),
+    (APPLICANT, claims(1, year=THIS_YEAR - 3), {"credit_score": 800}, "refer"),
+    (APPLICANT, [{"year": "unknown", "claim_amount": 10}], {"credit_score": 800}, "refer"),
+    # Senior age
+    ({"age": 59}, [], {"credit_score": 800}, "accept"),
+    ({"age": 60}, [], {"credit_score": 800}, "refer"),
+    # High-risk zone
+    (APPLICANT, [], {"credit_score": 800, "high_risk_zone": True}, "refer"),
+    # Fraud flag, only when it is literally true
+    (APPLICANT, [], {"credit_score": 800, "fraud_flag": True}, "decline"),
+    (APPLICANT, claims(5), {"fraud_flag": True}, "decline"),
+    (APPLICANT, [], {"credit_score": 800, "fraud_flag": "yes"}, "accept"),
+    # Free-form or malformed input is left to the LLM
+    ("not json", [], {}, "refer"),
+    (APPLICANT, {"claims": []}, {"credit_score": 800}, "refer"),
+    (APPLICANT, [], '{"credit_score": 800}', "accept"),
+])
+def test_outcome_boundaries(applicant, history, external, expected):
+    assert outcome(rules.evaluate(applicant, history, external, THRESHOLDS)) == expected
+
+
+@pytest.mark.parametrize("applicant, history, external, finding, present", [
+    (APPLICANT, [], {"credit_score": 599}, "Credit score 599 below 600", True),
+    (APPLICANT, [], {"credit_score": 600}, "Credit score", False),
+    (APPLICANT, claims(3), {}, "Claim frequency at or above 3", True),
+    (APPLICANT, claims(2), {}, "Claim frequency", False),
+    (APPLICANT, claims(2, amount=125000), {}, "Recent claim amount at or above 250,000", True),
+    (APPLICANT, claims(1, amount=249999), {}, "Recent claim amount", False),
+    ({"age": 60}, [], {}, "Applicant age 60 at or above 60", True),
+    ({"age": 59}, [], {}, "Applicant age", False),
+    (APPLICANT, claims(2, amount=500), {}, "2 claim(s) in the last 3 years totalling 1,000", True),
+])
+def test_findings_boundaries(applicant, history, external, finding, present):
+    findings = rules.evaluate(applicant, history, external, THRESHOLDS).findings
+    assert any(f.startswith(finding) for f in findings) is present
+
+
+def test_rule_stats_counts_decided_assessments(monkeypatch):
+    monkeypatch.setattr(rules, "_counts", {"evaluated": 0, "decided": 0})
+    assert rules.rule_stats() == {"evaluated": 0, "decided": 0, "skip_rate": 0.0}
+
+    for external in ({"credit_score": 800}, {"fraud_flag": True}, {"credit_score": 700}, {}):
+        rules.evaluate(APPLICANT, [], external, THRESHOLDS)
+    assert rules.rule_stats() == {"evaluated": 4, "decided": 2, "skip_rate": 0.5}
@@ -0,0 +1,111 @@
+import math
+
+import pytest
+
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage, AIMessage
+
+from llm.semantic_cache import SemanticCache, context_key, is_follow_up
+
+# Unit vectors at a given angle, so similarities are known exactly
+ANGLES = {
+    "q": 0, "paraphrase": 20, "other": 60, "third": 90,
+    "Which quote is best for my family?": 0, "Which policy suits a family of three?": 20,
+    "Why?": 45, "Why is that?": 50
+}
+QUOTES = [{"quote_id": "Q1", "annual_premium": 12000, "sum_insured": 500000, "deductible": 5000}]
+PROFILE = {"family_size": 3}
+CLAUSES = {"Q1": [Document(id="c1", page_content="Room rent capped at 1%.")]}
+
+
+def embed(text):
+    angle = math.radians(ANGLES[text])
+    return [math.cos(angle), math.sin(angle)]
+
+
+def make_cache(**kwargs):
+    return SemanticCache(embed, **dict(dict(threshold=0.9, max_entries=8, path=""), **kwargs))
+
+
+def test_similar_question_in_same_context_hits():
+    cache = make_cache()
+    cache.store("q", "ctx", "Q1 is best", seconds=2.0)
+
+    hit = cache.lookup("paraphrase", "ctx")
+    assert hit.answer == "Q1 is best" and hit.question == "q"
+    assert hit.similarity >= 0.9
+    assert cache.lookup("other", "ctx") is None
+    assert cache.lookup("paraphrase", "other ctx") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "hit_rate": 0.3333, "saved_seconds": 2.0, "entries": 1}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.store("q", "ctx", "first", 1.0)
+    cache.store("other", "ctx", "second", 1.0)
+    assert cache.lookup("q", "ctx").answer == "first"
+
+    cache.store("third", "ctx", "third", 1.0)
+    assert cache.lookup("q", "ctx").answer == "first"
+    assert cache.lookup("other", "ctx") is None
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "semantic_cache.sqlite3")
+    make_cache(path=path).store("q", "ctx", "Q1 is best", 1.0)
+    assert make_cache(path=path).lookup("paraphrase", "ctx").answer == "Q1 is best"
+
+
+def test_follow_up_context_depends_on_conversation_history():
+    first = [HumanMessage(content="Which quote is best?"), AIMessage(content="Q1")]
+    second = [HumanMessage(content="Which quote is cheapest?"), AIMessage(content="Q2")]
+
+    fresh = context_key(QUOTES, PROFILE, CLAUSES, question="Why?")
+    assert fresh == context_key(QUOTES, PROFILE, CLAUSES, [], "Why?")
+    assert context_key(QUOTES, PROFILE, CLAUSES, first, "Why?") == context_key(QUOTES, PROFILE, CLAUSES, list(first), "Why?")
+    keys = {fresh, context_key(QUOTES, PROFILE, CLAUSES, first, "Why?"), context_key(QUOTES, PROFILE, CLAUSES, second, "Why?")}
+    assert len(keys) == 3
+
+    # Without a question the history is always part of the key
+    assert context_key(QUOTES, PROFILE, CLAUSES, first) != context_key(QUOTES, PROFILE, CLAUSES)
+
+
+def test_standalone_question_context_ignores_history():
+    history = [HumanMessage(content="Which quote is cheapest?"), AIMessage(content="Q1")]
+    question = "Which quote is best for my family?"
+    assert context_key(QUOTES, PROFILE, CLAUSES, history, question) == context_key(QUOTES, PROFILE, CLAUSES, [], question)
+    assert context_key(QUOTES, PROFILE, CLAUSES, history, question) != context_key(QUOTES, {"family_size": 4}, CLAUSES, history, question)
+
+
+def test_paraphrase_after_a_previous_turn_hits():
+    cache = make_cache()
+    question = "Which quote is best for my family?"
+    cache.store(question, context_key(QUOTES, PROFILE, CLAUSES, [], question), "Q1 is best", 2.0)
+
+    # Another session, one turn in, asks the same thing in other words
+    history = [HumanMessage(content="Which quote is cheapest?"), AIMessage(content="Q1")]
+    paraphrase = "Which policy suits a family of three?"
+    hit = cache.lookup(paraphrase, context_key(QUOTES, PROFILE, CLAUSES, history, paraphrase))
+    assert hit is not None and hit.answer == "Q1 is best"
+
+
+def test_follow_up_after_a_different_turn_misses():
+    cache = make_cache()
+    before = [HumanMessage(content="Which quote is best?"), AIMessage(content="Q1")]
+    cache.store("Why?", context_key(QUOTES, PROFILE, CLAUSES, before, "Why?"), "Lowest premium", 1.0)
+
+    after = [HumanMessage(content="Which quote covers maternity?"), AIMessage(content="Q2")]
+    assert cache.lookup("Why is that?", context_key(QUOTES, PROFILE, CLAUSES, before, "Why is that?")).answer == "Lowest premium"
+    assert cache.lookup("Why is that?", context_key(QUOTES, PROFILE, CLAUSES, after, "Why is that?")) is None
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Why?", True),
+    ("why is that", True),
+    ("What about maternity?", True),
+    ("Is it covered?", True),
+    ("Which quote is best for my family?", False),
+    ("Does Q2 cover maternity?", False),
+])
+def test_is_follow_up(question, expected):
+    assert is_follow_up(question) is expected
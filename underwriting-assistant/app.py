@@ -1,14 +1,31 @@
 import streamlit as st
+import os
+import sys
 import json
-from underwriting_ai import run_underwriting_analysis
-from schemas import UnderwritingResult
+import hashlib
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from underwriting_ai import (
+    prescreen, stream_underwriting_analysis, parse_partial_result, parse_result
+)
+from response_parser import parse_stats
+from rules import rule_stats
+from common import metrics
+from api import client as api
 from pydantic import ValidationError
+from schemas import UnderwritingResult
 
 st.set_page_config(
     page_title="Underwriting Assistant – GenAI Co-Pilot",
     layout="wide"
 )
 
+# Assessments kept per session for redisplay on rerun
+RESULT_HISTORY = 8
+
 st.title("🛡️ Underwriting Assistant – GenAI Co-Pilot")
 
 st.markdown("""
@@ -58,34 +75,117 @@ with st.expander("🌍 External Risk Data (JSON)", expanded=True):
 # Run Analysis
 # ------------------------------
 
-if st.button("🔍 Assess Underwriting Risk", use_container_width=True):
-    try:
-        result = run_underwriting_analysis(
-            applicant_data,
-            claims_data,
-            external_data
-        )
+# Assessments are kept per session, keyed by their inputs, so reruns
+# (or a second click) with unchanged data do not call the model again
+results = st.session_state.setdefault("underwriting_results", {})
+input_key = hashlib.sha256(
+    "\x1f".join([applicant_data, claims_data, external_data]).encode("utf-8")
+).hexdigest()
+validated = results.get(input_key)
 
-        parsed = json.loads(result)
-        validated = UnderwritingResult(**parsed)
+assess = st.button("🔍 Assess Underwriting Risk", use_container_width=True)
 
-        st.success("Underwriting Risk Assessment Completed")
+if assess or validated is not None:
+    try:
+        status = st.empty()
 
         col1, col2 = st.columns(2)
 
         with col1:
-            st.metric("Risk Level", validated.risk_level)
-            st.metric("Risk Score", validated.risk_score)
+            level_slot = st.empty()
+            score_slot = st.empty()
 
         with col2:
             st.markdown("### Recommendation")
-            st.write(validated.recommendation)
+            recommendation_slot = st.empty()
 
         st.markdown("### Key Risk Factors")
-        st.write(validated.key_risk_factors)
+        factors_slot = st.empty()
 
         st.markdown("### Underwriting Summary")
-        st.write(validated.underwriting_summary)
+        summary_slot = st.empty()
+
+        if validated is None:
+            status.info("Assessing underwriting risk…")
+
+            if api.API_URL:
+                # Thin client: the service runs the assessment
+                try:
+                    inputs = [json.loads(text) for text in (applicant_data, claims_data, external_data)]
+                except json.JSONDecodeError as e:
+                    status.error(f"Inputs must be valid JSON: {e}")
+                    st.stop()
+                try:
+                    validated = UnderwritingResult(**api.assess_underwriting(*inputs))
+                except api.ApiError as e:
+                    status.error(e.describe("Assessment"))
+                    st.stop()
+            else:
+                # Fields are shown as soon as they can be read from the stream
+                decided, messages = prescreen(applicant_data, claims_data, external_data)
+                chunks = []
+                shown = {}
+                stream = [decided] if decided is not None else stream_underwriting_analysis(messages)
+                for chunk in stream:
+                    chunks.append(chunk)
+                    partial = parse_partial_result("".join(chunks))
+                    if partial == shown:
+                        continue
+                    shown = partial
+                    if "risk_level" in partial:
+                        level_slot.metric("Risk Level", partial["risk_level"])
+                    if "risk_score" in partial:
+                        score_slot.metric("Risk Score", partial["risk_score"])
+                    if "key_risk_factors" in partial:
+                        factors_slot.write(partial["key_risk_factors"])
+                    if "underwriting_summary" in partial:
+                        summary_slot.write(partial["underwriting_summary"])
+                    if "recommendation" in partial:
+                        recommendation_slot.write(partial["recommendation"])
+
+                result = "".join(chunks)
+                validated = parse_result(result, messages)
+            results[input_key] = validated
+            while len(results) > RESULT_HISTORY:
+                results.pop(next(iter(results)))
+
+        status.success("Underwriting Risk Assessment Completed")
+
+        level_slot.metric("Risk Level", validated.risk_level)
+        score_slot.metric("Risk Score", validated.risk_score)
+        recommendation_slot.write(validated.recommendation)
+        factors_slot.write(validated.key_risk_factors)
+        summary_slot.write(validated.underwriting_summary)
+
+        ttft = metrics.summary("underwriting.ttft")
+        if ttft["count"]:
+            st.caption(
+                f"Time to first token: {ttft['last']:.2f}s "
+                f"(p50 {ttft['p50']:.2f}s over {ttft['count']} runs)"
+            )
+
+        # In thin-client mode the counters live in the service
+        try:
+            if api.API_URL:
+                service = api.service_metrics()
+                screened, parsing = service["rules"], service["parsing"]
+            else:
+                screened, parsing = rule_stats(), parse_stats()
+        except api.ApiError:
+            # The assessment itself is already shown
+            screened = parsing = None
+
+        if screened is not None:
+            st.caption(
+                f"Rule pre-screen resolved {screened['skip_rate']:.0%} of "
+                f"{screened['evaluated']} assessments without an LLM call"
+            )
+
+            st.caption(
+                f"Responses: {parsing['clean']} valid as returned, {parsing['repaired']} "
+                f"repaired locally, {parsing['reasked']} completed by follow-up, "
+                f"{parsing['failed']} unusable"
+            )
 
     except json.JSONDecodeError:
         st.error("Model did not return valid JSON.")
@@ -0,0 +1,229 @@
+"""
+Portfolio batch runner for underwriting risk assessment.
+
+    python batch_underwriting.py applicants.jsonl --output results.parquet
+    python batch_underwriting.py renewals.csv --output results.jsonl --concurrency 16
+
+Input is a JSONL file with one {"id", "applicant", "claims", "external"}
+object per line, or a CSV with the same columns holding JSON text.
+Every model response is validated against UnderwritingResult; records that
+fail are written to <output>.retry.jsonl, which can be fed back as input.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import argparse
+
+from underwriting_ai import run_underwriting_analysis_async, parse_result_async
+from response_parser import parse_stats
+from rules import rule_stats
+from common.metrics import percentile
+from common import azure_gateway
+
+PARQUET_ROW_GROUP = 1000
+INPUT_FIELDS = ("applicant", "claims", "external")
+
+
+# ------------------------------
+# Input
+# ------------------------------
+def _as_text(value):
+    # Same formatting as the JSON text areas in app.py
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, indent=2)
+
+
+def load_records(source):
+    if source.lower().endswith(".csv"):
+        with open(source, newline="", encoding="utf-8") as f:
+            for row_no, row in enumerate(csv.DictReader(f), 1):
+                row.setdefault("id", str(row_no))
+                yield row
+        return
+
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{source}, line {line_no}: invalid JSON ({e.msg})") from None
+            if not isinstance(record, dict):
+                raise ValueError(f"{source}, line {line_no}: expected a JSON object")
+            record.setdefault("id", str(line_no))
+            yield record
+
+
+# ------------------------------
+# Output
+# ------------------------------
+class JsonlWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """
+    Streams results to Parquet one row group at a time.
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([
+            ("id", pa.string()),
+            ("risk_level", pa.string()),
+            ("risk_score", pa.int64()),
+            ("key_risk_factors", pa.list_(pa.string())),
+            ("underwriting_summary", pa.string()),
+            ("recommendation", pa.string()),
+            ("seconds", pa.float64())
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._rows = []
+
+    def write(self, record):
+        self._rows.append(record)
+        if len(self._rows) >= PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            table = self._pa.Table.from_pylist(self._rows, schema=self._schema)
+            self._writer.write_table(table)
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_writer(path):
+    if path.endswith(".parquet"):
+        return ParquetWriter(path)
+    return JsonlWriter(path)
+
+
+# ------------------------------
+# Pipeline
+# ------------------------------
+async def assess(record):
+    missing = [name for name in INPUT_FIELDS if name not in record]
+    if missing:
+        raise ValueError(f"record is missing {', '.join(missing)}")
+    inputs = [_as_text(record[name]) for name in INPUT_FIELDS]
+    raw, messages = await run_underwriting_analysis_async(*inputs)
+    return await parse_result_async(raw, messages)
+
+
+async def run_batch(source, output, concurrency):
+    retry_path = os.path.splitext(output)[0] + ".retry.jsonl"
+    if os.path.abspath(source) == os.path.abspath(output):
+        raise ValueError("--output must not be the input file")
+
+    writer = open_writer(output)
+    # Failures go to a temporary file until the run completes, so the
+    # previous retry file can be this run's input
+    retry = JsonlWriter(retry_path + ".tmp")
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    latencies = []
+    counts = {"ok": 0, "failed": 0}
+
+    async def worker():
+        while True:
+            record = await queue.get()
+            if record is None:
+                return
+            started = time.monotonic()
+            try:
+                result = await assess(record)
+            except Exception as e:
+                counts["failed"] += 1
+                retry.write(dict(record, error=f"{type(e).__name__}: {e}"))
+                continue
+            seconds = time.monotonic() - started
+            latencies.append(seconds)
+            counts["ok"] += 1
+            writer.write(dict(
+                result.model_dump(), id=str(record["id"]), seconds=round(seconds, 3)
+            ))
+
+    started = time.monotonic()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        # Bounded queue: records are read as workers free up, not all at once
+        for record in load_records(source):
+            await queue.put(record)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        # If reading the input failed, the workers never get their None
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        writer.close()
+        retry.close()
+
+    elapsed = max(time.monotonic() - started, 1e-9)
+    latencies.sort()
+    print(f"Assessed {counts['ok']} applicants ({counts['failed']} failed) in {elapsed:.1f}s")
+    if latencies:
+        print(
+            f"Latency: p50 {percentile(latencies, 50):.2f}s, "
+            f"p95 {percentile(latencies, 95):.2f}s"
+        )
+    print(f"Throughput: {counts['ok'] / elapsed * 60:.1f} applicants/min")
+    print(f"Resolved by rule pre-screen: {rule_stats()['skip_rate']:.0%}")
+    gateway = azure_gateway.gateway_stats()
+    print(f"Throttled (429): {gateway['throttled']}, retries: {gateway['retries']}, "
+          f"coalesced: {gateway['coalesced']}")
+    parsing = parse_stats()
+    print(
+        f"Responses repaired locally: {parsing['repaired']}, "
+        f"completed by follow-up: {parsing['reasked']}, unusable: {parsing['failed']}"
+    )
+    if counts["failed"]:
+        os.replace(retry_path + ".tmp", retry_path)
+        print(f"Failed records written to {retry_path}")
+    else:
+        os.remove(retry_path + ".tmp")
+        # A retry file left by an earlier run is now out of date
+        if os.path.exists(retry_path) and os.path.abspath(source) != os.path.abspath(retry_path):
+            os.remove(retry_path)
+    return counts["failed"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch underwriting risk assessment")
+    parser.add_argument("source", help="JSONL or CSV of applicant, claims, external")
+    parser.add_argument("--output", default="underwriting_results.jsonl",
+                        help="Results file (.jsonl or .parquet)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Concurrent Azure OpenAI requests")
+    args = parser.parse_args(argv)
+
+    try:
+        failed = asyncio.run(run_batch(args.source, args.output, args.concurrency))
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import re
+import json
+import threading
+
+from pydantic import ValidationError
+
+from schemas import UnderwritingResult
+
+REQUIRED_FIELDS = list(UnderwritingResult.model_fields)
+RISK_LEVELS = {"low": "Low", "medium": "Medium", "high": "High"}
+
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_NUMBER = re.compile(r"-?\d+(\.\d+)?")
+
+# clean:    valid JSON that matched the schema as returned
+# repaired: fixed locally (fences, commas, types, ranges)
+# reasked:  missing fields fetched with a follow-up request
+# failed:   unusable; the underwriter has to re-run the request
+_counts = {"clean": 0, "repaired": 0, "reasked": 0, "failed": 0}
+_counts_lock = threading.Lock()
+
+
+def count(outcome):
+    with _counts_lock:
+        _counts[outcome] += 1
+
+
+def parse_stats():
+    with _counts_lock:
+        stats = dict(_counts)
+    total = sum(stats.values())
+    stats["retry_rate"] = stats["failed"] / total if total else 0.0
+    return stats
+
+
+# ------------------------------
+# Local repair
+# ------------------------------
+def load_json(raw):
+    """
+    Parses the model output, repairing common defects.
+    Returns (data, repaired); raises json.JSONDecodeError if unrecoverable.
+    """
+    try:
+        return json.loads(raw), False
+    except json.JSONDecodeError:
+        pass
+
+    text = _FENCE.sub("", raw.strip())
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    text = _TRAILING_COMMA.sub(r"\1", text)
+    return json.loads(text), True
+
+
+def coerce_fields(data):
+    """
+    Normalizes field types in place. Returns True if anything changed.
+    """
+    changed = False
+
+    score = data.get("risk_score")
+    if isinstance(score, str):
+        match = _NUMBER.search(score)
+        score = float(match.group()) if match else None
+        changed = True
+    if isinstance(score, float):
+        score = int(round(score))
+        changed = True
+    if isinstance(score, int) and not isinstance(score, bool):
+        clamped = min(100, max(0, score))
+        changed = changed or clamped != score
+        data["risk_score"] = clamped
+    elif "risk_score" in data:
+        del data["risk_score"]
+        changed = True
+
+    level = data.get("risk_level")
+    if isinstance(level, str) and level.strip().lower() in RISK_LEVELS:
+        normalized = RISK_LEVELS[level.strip().lower()]
+        changed = changed or normalized != level
+        data["risk_level"] = normalized
+
+    factors = data.get("key_risk_factors")
+    if isinstance(factors, str):
+        data["key_risk_factors"] = [factors] if factors.strip() else []
+        changed = True
+
+    # Empty strings are as good as missing
+    for name in ("risk_level", "underwriting_summary", "recommendation"):
+        if name in data and not str(data[name] or "").strip():
+            del data[name]
+            changed = True
+
+    return changed
+
+
+def missing_fields(data):
+    return [name for name in REQUIRED_FIELDS if name not in data]
+
+
+def parse_locally(raw):
+    """
+    (data, missing, repaired) after local repair, before any re-ask.
+    """
+    data, repaired = load_json(raw)
+    if not isinstance(data, dict):
+        raise json.JSONDecodeError("Expected a JSON object", raw, 0)
+    repaired = coerce_fields(data) or repaired
+    return data, missing_fields(data), repaired
+
+
+def finish(data, repaired, reasked):
+    try:
+        result = UnderwritingResult(**data)
+    except ValidationError:
+        count("failed")
+        raise
+    count("reasked" if reasked else "repaired" if repaired else "clean")
+    return result
+
+
+def reask_messages(messages, raw, missing):
+    """
+    Follow-up turn asking only for the fields that are still missing.
+    """
+    fields = ", ".join(f'"{name}"' for name in missing)
+    return messages + [
+        {"role": "assistant", "content": raw},
+        {"role": "user", "content": (
+            f"Your JSON is missing: {fields}. "
+            f"Return a JSON object containing ONLY these fields."
+        )}
+    ]
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import threading
+from datetime import date
+
+from schemas import UnderwritingResult
+from common import metrics
+
+# ------------------------------
+# Thresholds
+# ------------------------------
+RULE_THRESHOLDS = {
+    # Clean profile: at or above this credit score with no recent claims
+    "clean_credit_score": int(os.getenv("RULE_CLEAN_CREDIT_SCORE", "750")),
+    # Weak credit is reported as a finding for the LLM
+    "low_credit_score": int(os.getenv("RULE_LOW_CREDIT_SCORE", "600")),
+    # Claims within this many years count as recent
+    "claims_lookback_years": int(os.getenv("RULE_CLAIMS_LOOKBACK_YEARS", "3")),
+    "high_claim_count": int(os.getenv("RULE_HIGH_CLAIM_COUNT", "3")),
+    "high_claim_total": float(os.getenv("RULE_HIGH_CLAIM_TOTAL", "250000")),
+    "senior_age": int(os.getenv("RULE_SENIOR_AGE", "60"))
+}
+
+RULES_ENABLED = os.getenv("UNDERWRITING_RULES_ENABLED", "1") != "0"
+
+_counts = {"evaluated": 0, "decided": 0}
+_counts_lock = threading.Lock()
+
+
+class RuleAssessment:
+    """
+    Outcome of the local pre-screen.
+
+    result is an UnderwritingResult for clear-cut cases and None when the
+    case needs the LLM; findings are passed to the prompt in that case.
+    """
+
+    def __init__(self, result=None, findings=None):
+        self.result = result
+        self.findings = findings or []
+
+
+def _load(value, default):
+    if isinstance(value, str):
+        return json.loads(value) if value.strip() else default
+    return value if value is not None else default
+
+
+def _findings(applicant, claims, external, t):
+    findings = []
+    recent = [
+        c for c in claims
+        if not isinstance(c.get("year"), int)
+        or c["year"] >= date.today().year - t["claims_lookback_years"]
+    ]
+    total = sum(float(c.get("claim_amount") or 0) for c in recent)
+    credit = external.get("credit_score")
+
+    if recent:
+        findings.append(
+            f"{len(recent)} claim(s) in the last {t['claims_lookback_years']} years "
+            f"totalling {total:,.0f}"
+        )
+    if len(recent) >= t["high_claim_count"]:
+        findings.append(f"Claim frequency at or above {t['high_claim_count']}")
+    if total >= t["high_claim_total"]:
+        findings.append(f"Recent claim amount at or above {t['high_claim_total']:,.0f}")
+    if isinstance(credit, (int, float)) and credit < t["low_credit_score"]:
+        findings.append(f"Credit score {credit} below {t['low_credit_score']}")
+    if external.get("high_risk_zone"):
+        findings.append("Applicant located in a high-risk zone")
+    age = applicant.get("age")
+    if isinstance(age, (int, float)) and age >= t["senior_age"]:
+        findings.append(f"Applicant age {age} at or above {t['senior_age']}")
+
+    return findings, recent, credit
+
+
+def evaluate(applicant, claims, external, thresholds=None):
+    """
+    Deterministic pre-screen of the applicant, claims and external data
+    (dicts or the JSON text from the app).
+    """
+    started = time.monotonic()
+    assessment = _evaluate(applicant, claims, external, thresholds)
+    _record(assessment, started)
+    return assessment
+
+
+def _evaluate(applicant, claims, external, thresholds):
+    t = dict(RULE_THRESHOLDS, **(thresholds or {}))
+
+    try:
+        applicant = _load(applicant, {})
+        claims = _load(claims, [])
+        external = _load(external, {})
+        if not isinstance(applicant, dict) or not isinstance(external, dict) \
+                or not isinstance(claims, list):
+            raise ValueError("unexpected input shape")
+        findings, recent, credit = _findings(applicant, claims, external, t)
+    except (ValueError, TypeError, AttributeError):
+        # Free-form input: leave it entirely to the LLM
+        return RuleAssessment()
+
+    if external.get("fraud_flag") is True:
+        return RuleAssessment(UnderwritingResult(
+            risk_level="High",
+            risk_score=95,
+            key_risk_factors=["Fraud flag raised by external risk data"] + findings,
+            underwriting_summary=(
+                "External risk data carries an active fraud flag. "
+                "The application cannot be assessed on standard terms until "
+                "the flag has been investigated."
+            ),
+            recommendation="Refer to the fraud investigation team before any underwriting review."
+        ), findings)
+
+    clean = (
+        not recent
+        and isinstance(credit, (int, float))
+        and credit >= t["clean_credit_score"]
+        and not external.get("high_risk_zone")
+        and not findings
+    )
+    if clean:
+        return RuleAssessment(UnderwritingResult(
+            risk_level="Low",
+            risk_score=15,
+            key_risk_factors=[],
+            underwriting_summary=(
+                f"No claims in the last {t['claims_lookback_years']} years, "
+                f"credit score {credit} and no external risk flags."
+            ),
+            recommendation="Proceed with standard underwriting review."
+        ), findings)
+
+    return RuleAssessment(findings=findings)
+
+
+def _record(assessment, started):
+    metrics.observe("underwriting.rules", time.monotonic() - started)
+    with _counts_lock:
+        _counts["evaluated"] += 1
+        if assessment.result is not None:
+            _counts["decided"] += 1
+
+
+def rule_stats():
+    with _counts_lock:
+        evaluated, decided = _counts["evaluated"], _counts["decided"]
+    return {
+        "evaluated": evaluated,
+        "decided": decided,
+        "skip_rate": decided / evaluated if evaluated else 0.0
+    }
@@ -1,22 +1,31 @@
 import os
+import re
+import sys
+import json
+import time
 from dotenv import load_dotenv
-from openai import AzureOpenAI
+from openai import BadRequestError
 
-load_dotenv()
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+from common import metrics
+from common.llm_cache import get_llm_cache, make_key
+from common import azure_gateway
+from common import tracing
+import rules
+import response_parser
 
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-)
+load_dotenv()
 
 MODEL = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
+# JSON mode is requested until the deployment rejects it
+_json_mode = os.getenv("UNDERWRITING_JSON_MODE", "1") != "0"
 
-def run_underwriting_analysis(applicant, claims, external):
-    """
-    Core GenAI underwriting logic
-    """
+
+def build_messages(applicant, claims, external, findings=None):
 
     system_prompt = """
     You are an insurance underwriting assistant.
@@ -46,7 +55,7 @@ def run_underwriting_analysis(applicant, claims, external):
     4. Provide clear justification
     5. Recommend next step
 
-    Output JSON format:
+    {_findings_block(findings)}Output JSON format:
     {{
         "risk_level": "",
         "risk_score": 0,
@@ -56,13 +65,281 @@ def run_underwriting_analysis(applicant, claims, external):
     }}
     """
 
-    response = client.chat.completions.create(
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _findings_block(findings):
+    if not findings:
+        return ""
+    lines = "\n".join(f"    - {f}" for f in findings)
+    return f"Rule-based pre-screen findings (verified facts):\n{lines}\n\n    "
+
+
+def prescreen(applicant, claims, external):
+    """
+    Runs the local rule engine. Returns (result_json, messages): result_json
+    is set for clear-cut cases, otherwise messages carry the rule findings.
+    """
+    if not rules.RULES_ENABLED:
+        return None, build_messages(applicant, claims, external)
+    assessment = rules.evaluate(applicant, claims, external)
+    if assessment.result is not None:
+        return assessment.result.model_dump_json(), None
+    return None, build_messages(applicant, claims, external, assessment.findings)
+
+
+def _json_mode_unsupported(error):
+    global _json_mode
+    if "response_format" not in str(error):
+        return False
+    _json_mode = False
+    return True
+
+
+def create_completion(**kwargs):
+    if _json_mode:
+        try:
+            return azure_gateway.chat_completion(
+                response_format={"type": "json_object"}, **kwargs
+            )
+        except BadRequestError as e:
+            if not _json_mode_unsupported(e):
+                raise
+    return azure_gateway.chat_completion(**kwargs)
+
+
+async def create_completion_async(**kwargs):
+    if _json_mode:
+        try:
+            return await azure_gateway.chat_completion_async(
+                response_format={"type": "json_object"}, **kwargs
+            )
+        except BadRequestError as e:
+            if not _json_mode_unsupported(e):
+                raise
+    return await azure_gateway.chat_completion_async(**kwargs)
+
+
+@tracing.traced("underwriting_analysis")
+def run_underwriting_analysis(applicant, claims, external, bypass_cache=False):
+    """
+    Core GenAI underwriting logic. Returns (raw, messages) for parse_result;
+    messages is None when the rule engine decided the case.
+    """
+    decided, messages = prescreen(applicant, claims, external)
+    if decided is not None:
+        tracing.record(rule_decided=True)
+        return decided, None
+
+    cache = get_llm_cache()
+    key = make_key(MODEL, messages, 0)
+    cached = cache.get(key, bypass=bypass_cache)
+    if cached is not None:
+        tracing.record(cache_hits=1)
+        return cached, messages
+
+    response = create_completion(
+        model=MODEL,
+        messages=messages,
+        temperature=0,
+    )
+
+    tracing.record_usage(response.usage)
+    content = response.choices[0].message.content
+    cache.set(key, content)
+    return content, messages
+
+
+async def run_underwriting_analysis_async(applicant, claims, external, bypass_cache=False):
+    """
+    Async variant of run_underwriting_analysis for batch runs
+    """
+    decided, messages = prescreen(applicant, claims, external)
+    if decided is not None:
+        return decided, None
+
+    cache = get_llm_cache()
+    key = make_key(MODEL, messages, 0)
+    cached = cache.get(key, bypass=bypass_cache)
+    if cached is not None:
+        return cached, messages
+
+    response = await create_completion_async(
+        model=MODEL,
+        messages=messages,
+        temperature=0,
+    )
+
+    content = response.choices[0].message.content
+    cache.set(key, content)
+    return content, messages
+
+
+def stream_underwriting_analysis(messages, bypass_cache=False):
+    """
+    Yields the raw JSON response to the prescreen messages in chunks as the
+    model generates it. Time to first token is recorded as the
+    underwriting.ttft metric.
+    """
+    cache = get_llm_cache()
+    key = make_key(MODEL, messages, 0)
+    cached = cache.get(key, bypass=bypass_cache)
+    if cached is not None:
+        yield cached
+        return
+
+    started = time.monotonic()
+    first = True
+    parts = []
+
+    stream = create_completion(
         model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
+        messages=messages,
         temperature=0,
+        stream=True
     )
+    try:
+        for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            if first:
+                metrics.observe("underwriting.ttft", time.monotonic() - started)
+                first = False
+            parts.append(chunk.choices[0].delta.content)
+            yield parts[-1]
+    finally:
+        stream.close()
+
+    cache.set(key, "".join(parts))
+
+
+# ---------------- RESULT PARSING ----------------
+def _parse_locally(raw, messages):
+    try:
+        return response_parser.parse_locally(raw)
+    except json.JSONDecodeError:
+        response_parser.count("failed")
+        _forget(messages)
+        raise
+
+
+def _merge(data, missing, reply):
+    try:
+        extra, _, _ = response_parser.parse_locally(reply)
+    except json.JSONDecodeError:
+        return
+    for name in missing:
+        if name in extra:
+            data[name] = extra[name]
+
+
+def _finish(data, repaired, reasked, messages):
+    try:
+        return response_parser.finish(data, repaired, reasked)
+    except Exception:
+        _forget(messages)
+        raise
+
+
+def _forget(messages):
+    # An unusable response must not be served from the cache on re-run
+    if messages is not None:
+        get_llm_cache().delete(make_key(MODEL, messages, 0))
+
+
+def _remember(messages, result):
+    # Cache hits then parse cleanly instead of repeating the repair or re-ask
+    if messages is not None:
+        get_llm_cache().set(make_key(MODEL, messages, 0), result.model_dump_json())
+
+
+def parse_result(raw, messages):
+    """
+    Validated UnderwritingResult from the raw model output to messages
+    (None for rule-decided results).
+
+    Common defects are repaired locally; missing fields are requested
+    with one follow-up call as a last resort.
+    """
+    data, missing, repaired = _parse_locally(raw, messages)
+
+    if missing and messages is not None:
+        response = create_completion(
+            model=MODEL,
+            messages=response_parser.reask_messages(messages, raw, missing),
+            temperature=0,
+        )
+        _merge(data, missing, response.choices[0].message.content)
+
+    result = _finish(data, repaired, bool(missing and messages), messages)
+    if repaired or missing:
+        _remember(messages, result)
+    return result
+
+
+async def parse_result_async(raw, messages):
+    """
+    Async variant of parse_result for batch runs
+    """
+    data, missing, repaired = _parse_locally(raw, messages)
+
+    if missing and messages is not None:
+        response = await create_completion_async(
+            model=MODEL,
+            messages=response_parser.reask_messages(messages, raw, missing),
+            temperature=0,
+        )
+        _merge(data, missing, response.choices[0].message.content)
+
+    result = _finish(data, repaired, bool(missing and messages), messages)
+    if repaired or missing:
+        _remember(messages, result)
+    return result
+
+
+# ---------------- INCREMENTAL PARSING ----------------
+_STRING_FIELD = r'"{}"\s*:\s*"((?:[^"\\]|\\.)*)(")?'
+_NUMBER_FIELD = r'"{}"\s*:\s*"?(-?\d+(?:\.\d+)?)"?\s*[,}}\n]'
+_LIST_FIELD = r'"{}"\s*:\s*\[(.*?)(\]|$)'
+
+
+def _unescape(value):
+    try:
+        return json.loads(f'"{value}"')
+    except json.JSONDecodeError:
+        return value.replace('\\"', '"')
+
+
+def parse_partial_result(buffer):
+    """
+    Fields readable from an incomplete JSON response.
+
+    Only completed values are returned, with two exceptions while they are
+    still being generated: the summary is returned with its text so far,
+    and key_risk_factors with the items completed so far. Values are
+    clamped and normalized as in the final result (coerce_fields).
+    """
+    fields = {}
+
+    for name in ("risk_level", "underwriting_summary", "recommendation"):
+        match = re.search(_STRING_FIELD.format(name), buffer, re.S)
+        if match and (match.group(2) or name == "underwriting_summary"):
+            fields[name] = _unescape(match.group(1))
+
+    match = re.search(_NUMBER_FIELD.format("risk_score"), buffer)
+    if match:
+        fields["risk_score"] = float(match.group(1))
+
+    match = re.search(_LIST_FIELD.format("key_risk_factors"), buffer, re.S)
+    if match:
+        fields["key_risk_factors"] = [
+            _unescape(item) for item in re.findall(
+                r'"((?:[^"\\]|\\.)*)"', match.group(1)
+            )
+        ]
 
-    return response.choices[0].message.content
+    response_parser.coerce_fields(fields)
+    return fields